@@ -1,12 +1,19 @@
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from playwright.async_api import TimeoutError as PLTimeout
 import pandas as pd
 import asyncio
 import logging
 import re
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 from time import time
 
+import perfil
+from checkpoint_store import CheckpointStore
+from crawler_listagem import concatenar_em_ordem, processar_paginas
+from esperas import rolar_ate_estavel
+from extracao_cards import extrair_cards
+from politica_rede import PoliticaRede
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -17,12 +24,16 @@ for i in range(1, 41)
 
 ARQUIVO_PKL_DADOS = "Implementos.pkl"
 ARQUIVO_EXCEL_DADOS = "Implementos.xlsx"
-ARQUIVO_CHECKPOINT = "checkpoint_trucadao.pkl" 
+ARQUIVO_CHECKPOINT = "checkpoints.implementos.sqlite"  # um arquivo por scraper: nada de disputa pelo lock
+NAMESPACE_CHECKPOINT = "implementos_trucadao"
 ARQUIVO_LINKS_CACHE = "links_trucadao.pkl"
 
 TIMEOUT = 30000
 MAX_BOTOES_POR_PAGINA = 9999 # processa todos os "Ver anúncio" da página
 ANCHOR_DETALHE = "div.produtoVendedor" 
+MAX_PAGINAS_CONCORRENTES = 4  # páginas de listagem abertas ao mesmo tempo
+HEADLESS = True
+HOSTS_PERMITIDOS = ["trucadao.com.br"]  # nunca bloqueados pela política de rede
 
 def formatar_preco(preco_raw: str) -> str:
     try:
@@ -120,113 +131,97 @@ async def tentar_extrair_revenda(pagina) -> str:
         logger.warning(f"Erro ao extrair localização: {e}")
     return "Não informado"
 
+# cards de implementos
+# se preferir, pode restringir aos que estão dentro do container principal:
+# CARD_SELECTOR = "div.produtoCard div.productCard.columns"
+CARD_SELECTOR = "div.productCard.columns"
+INFO_SELECTOR = "div.infoProduct.columns"
+
+CAMPOS_CARD = {
+    "Título": [f"{INFO_SELECTOR} h4", "h4"],  # h4 solto como fallback
+    "Preço_raw": {"seletores": [f"{INFO_SELECTOR} p.price", "p.price"], "padrao": ""},
+    "Imagem_alt": {"seletores": ["div.product-img-container.columns img"], "attr": "alt", "padrao": ""},
+    "Imagem_src": {"seletores": ["div.product-img-container.columns img"], "attr": "src", "padrao": ""},
+    # (Opcional) Link se existir no card — não clica, só guarda
+    "href": {"seletores": ["a[href]"], "attr": "href", "padrao": ""},
+}
+
 async def extrair_da_listagem(pagina) -> List[Dict]:
     dados_coletados: List[Dict] = []
 
-    # força carregar mais itens (lazy load)
-    for _ in range(12):
-        await pagina.evaluate("window.scrollBy(0, 1200)")
-        await asyncio.sleep(0.15)
-
-    # cards de implementos
-    CARD_SELECTOR = "div.productCard.columns"
-    INFO_SELECTOR = "div.infoProduct.columns"
-
-    # se preferir, pode restringir aos que estão dentro do container principal:
-    # CARD_SELECTOR = "div.produtoCard div.productCard.columns"
-
-    await pagina.wait_for_selector(CARD_SELECTOR, timeout=TIMEOUT)
-    cards = pagina.locator(CARD_SELECTOR)
-    total = await cards.count()
-    logger.info(f"{total} cards encontrados na listagem.")
-
-    for i in range(total):
-        card = cards.nth(i)
-
-        # Título (h4)
-        titulo = "Não informado"
-        try:
-            loc_titulo = card.locator(f"{INFO_SELECTOR} h4")
-            if await loc_titulo.count() == 0:
-                loc_titulo = card.locator("h4")  # fallback
-            if await loc_titulo.count() > 0:
-                titulo = (await loc_titulo.first.inner_text()).strip()
-        except Exception:
-            pass
-
-        # Preço (p.price)
-        preco_raw = ""
-        try:
-            loc_preco = card.locator(f"{INFO_SELECTOR} p.price")
-            if await loc_preco.count() == 0:
-                loc_preco = card.locator("p.price")  # fallback
-            if await loc_preco.count() > 0:
-                preco_raw = (await loc_preco.first.inner_text()).strip()
-        except Exception:
-            pass
-
-        preco = formatar_preco(preco_raw)
-        
-        # Imagem (alt + src) dentro do card
-        alt_img, src_img = "", ""
-        try:
-            img_loc = card.locator("div.product-img-container.columns img")
-            if await img_loc.count() > 0:
-                el = img_loc.first
-                alt_img = (await el.get_attribute("alt")) or ""
-                src_img = (await el.get_attribute("src")) or ""
-        except Exception:
-            pass
-
-        # (Opcional) Link se existir no card — não clica, só guarda
+    with perfil.etapa("listagem.espera_cards"):
+        await pagina.wait_for_selector(CARD_SELECTOR, timeout=TIMEOUT)
+
+    # lazy load: rola até a quantidade de cards parar de crescer
+    with perfil.etapa("listagem.rolagem"):
+        await rolar_ate_estavel(pagina, CARD_SELECTOR)
+
+    # todos os campos de todos os cards numa única ida ao navegador
+    with perfil.etapa("listagem.cards"):
+        itens = await extrair_cards(pagina, CARD_SELECTOR, CAMPOS_CARD)
+    logger.info(f"{len(itens)} cards encontrados na listagem.")
+
+    for item in itens:
+        href = item["href"]
         url = ""
-        try:
-            a = card.locator('a[href]')
-            if await a.count() > 0:
-                href = await a.first.get_attribute("href")
-                if href:
-                    url = "https://www.trucadao.com.br" + href if href.startswith("/") else href
-        except Exception:
-            pass
+        if href:
+            url = "https://www.trucadao.com.br" + href if href.startswith("/") else href
 
         dados_coletados.append({
-            "Título": titulo,
-            "Preço_raw": preco_raw,
-            "Preço": preco,
-            "Imagem_alt": alt_img,
-            "Imagem_src": src_img, 
+            "Título": item["Título"],
+            "Preço_raw": item["Preço_raw"],
+            "Preço": formatar_preco(item["Preço_raw"]),
+            "Imagem_alt": item["Imagem_alt"],
+            "Imagem_src": item["Imagem_src"], 
             "URL": url,
         })
 
     return dados_coletados
 
-async def processar_todas_as_paginas() -> List[Dict]:
-    dados_total: List[Dict] = []
+async def processar_todas_as_paginas(concorrencia: int = MAX_PAGINAS_CONCORRENTES,
+                                     headless: bool = HEADLESS, navegador=None,
+                                     ao_registros: Optional[Callable[[List[Dict]], None]] = None) -> List[Dict]:
     inicio = time()
+    politica = PoliticaRede(hosts_permitidos=HOSTS_PERMITIDOS)
+
+    with CheckpointStore(NAMESPACE_CHECKPOINT, ARQUIVO_CHECKPOINT, lote=1) as checkpoint:
+        # páginas já salvas num run anterior não são baixadas de novo
+        feitas = checkpoint.chaves()
+        pendentes = [url for url in PAGE_URLS if url not in feitas]
+        if feitas:
+            logger.info(f"Checkpoint: {len(PAGE_URLS) - len(pendentes)} páginas prontas, {len(pendentes)} restantes.")
+
+        def _salvar_checkpoint(idx: int, resultados: List) -> None:
+            # checkpoint a cada página processada: só a página nova é gravada
+            checkpoint.adicionar(pendentes[idx], {"registros": resultados[idx]})
+            logger.info(f"Checkpoint salvo (página {PAGE_URLS.index(pendentes[idx]) + 1})")
+            if ao_registros:
+                # ex.: o orquestrador grava a página na base sem esperar o fim da listagem
+                ao_registros(resultados[idx])
+
+        await processar_paginas(
+            pendentes,
+            extrair_da_listagem,
+            concorrencia=concorrencia,
+            headless=headless,
+            ao_concluir=_salvar_checkpoint,
+            politica=politica,
+            navegador=navegador,
+        )
+
+        # ordem final = ordem de PAGE_URLS, juntando as páginas do checkpoint
+        por_pagina = [(checkpoint.obter(url) or {}).get("registros") for url in PAGE_URLS]
+        faltando = sum(p is None for p in por_pagina)
+        if faltando:
+            logger.warning(f"{faltando} páginas falharam; rode de novo para completar pelo checkpoint.")
+        else:
+            # listagem completa: o próximo run começa do zero
+            checkpoint.limpar()
+    dados_total = concatenar_em_ordem(por_pagina)
+    logger.info(politica.resumo())
 
-    async with async_playwright() as p:
-        navegador = await p.chromium.launch(headless=False)
-        pagina = await navegador.new_page()
-        try:
-            for idx, url in enumerate(PAGE_URLS, start=1):
-                logger.info(f"===== Página {idx}/{len(PAGE_URLS)} =====")
-                await pagina.goto(url, timeout=80000)
-                await pagina.wait_for_load_state("domcontentloaded")
-
-                dados = await extrair_da_listagem(pagina)
-                dados_total.extend(dados)
-
-                # checkpoint a cada página processada
-                try:
-                    pd.DataFrame(dados_total).to_pickle(ARQUIVO_CHECKPOINT)
-                    logger.info(f"Checkpoint salvo ({len(dados_total)} regs)")
-                except Exception as e:
-                    logger.warning(f"Falha ao salvar checkpoint: {e}")
-        finally:
-            await navegador.close()
-
-        logger.info(f"Concluído em {time() - inicio:.1f}s com {len(dados_total)} registros")
-        return dados_total
+    logger.info(f"Concluído em {time() - inicio:.1f}s com {len(dados_total)} registros")
+    return dados_total
 
 async def salvar_dados(dados: List[Dict]):
     if not dados:
@@ -249,6 +244,7 @@ async def salvar_dados(dados: List[Dict]):
 async def main():
     dados = await processar_todas_as_paginas()
     await salvar_dados(dados)
+    perfil.salvar_relatorio("implementos_trucadao")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,11 +1,21 @@
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from playwright.async_api import TimeoutError as PLTimeout
 import pandas as pd
 import asyncio
 import logging
 import re
-from typing import Dict, List
+from typing import Dict, List, Optional
 from time import time
+from urllib.parse import urljoin
+
+import perfil
+from captura_respostas import CapturaRespostas, formatar_brl
+from checkpoint_store import CheckpointStore
+from crawler_listagem import concatenar_em_ordem, processar_paginas
+from esperas import rolar_ate_estavel
+from extracao_cards import extrair_cards
+from incremental import impressao
+from politica_rede import PoliticaRede
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -17,14 +27,23 @@ for i in range(1, 27)
 
 ARQUIVO_PKL_DADOS = "CaminhoesTruncadao.pkl"
 ARQUIVO_EXCEL_DADOS = "Links_Truncadao.xlsx"
-ARQUIVO_CHECKPOINT = "checkpoint_CaminhoesTruncadao.pkl" 
+ARQUIVO_CHECKPOINT = "checkpoints.links.sqlite"  # um arquivo por scraper: nada de disputa pelo lock
+NAMESPACE_CHECKPOINT = "links_caminhoes_trucadao"
 ARQUIVO_LINKS_CACHE = "links_trucadao.pkl"
 
+BASE_URL = "https://www.trucadao.com.br"
+
 TIMEOUT = 60000
+TIMEOUT_ROTA = 15000     # espera pela troca de rota após um clique
+MAX_ABAS_RESOLUCAO = 4   # abas de fundo simultâneas para cards sem href
+MAX_PAGINAS_CONCORRENTES = 4  # páginas de listagem abertas ao mesmo tempo
+HEADLESS = True
+HOSTS_PERMITIDOS = ["trucadao.com.br"]  # nunca bloqueados pela política de rede
+CAPTURA_REDE = True  # cards a partir do JSON da API; o DOM fica como fallback
+FILTRO_API = r"trucadao"  # respostas JSON avaliadas (só contam as que trazem lista de anúncios)
 MAX_BOTOES_POR_PAGINA = 9999 
 ANCHOR_DETALHE = "div.produtoVendedor" 
 DETAIL_SELECTOR = ANCHOR_DETALHE
-LIST_URL_PART = "/venda/implementos" 
 
 def formatar_preco(preco_raw: str) -> str:
     try:
@@ -42,11 +61,8 @@ def formatar_preco(preco_raw: str) -> str:
         return "Não informado"
     
 async def _ensure_card_loaded_and_visible(pagina, index: int, CARD_SELECTOR: str):
-    tentativas, max_tentativas = 0, 60  # aumentei um pouco
-    while await pagina.locator(CARD_SELECTOR).count() <= index and tentativas < max_tentativas:
-        await pagina.evaluate("window.scrollBy(0, 1000)")
-        await asyncio.sleep(0.10)
-        tentativas += 1
+    # rola dentro da página até existir o card `index` (ou a listagem acabar), num await só
+    await rolar_ate_estavel(pagina, CARD_SELECTOR, minimo=index + 1)
 
     card = pagina.locator(CARD_SELECTOR).nth(index)
     await card.scroll_into_view_if_needed()
@@ -54,20 +70,17 @@ async def _ensure_card_loaded_and_visible(pagina, index: int, CARD_SELECTOR: str
     return card
 
 async def _obter_url_por_clique(pagina, card, idx: int, CARD_SELECTOR: str) -> str:
+    # último recurso: sai da listagem e volta (lento, sequencial)
     url_detalhe = ""
     try:
+        url_lista = pagina.url
         # salva a posição vertical do card para voltar ao mesmo ponto depois
         y = await card.evaluate("el => el.getBoundingClientRect().top + window.scrollY")
 
         await card.click(timeout=TIMEOUT, force=True)
 
         # saiu da listagem? (SPA -> não há full reload)
-        try:
-            await pagina.wait_for_function(
-                "() => !location.pathname.includes(arguments[0])", LIST_URL_PART, timeout=TIMEOUT
-            )
-        except:
-            pass
+        await pagina.wait_for_url(lambda u: u != url_lista, timeout=TIMEOUT_ROTA)
 
         # espera conteúdo do detalhe
         await pagina.wait_for_selector(DETAIL_SELECTOR, timeout=TIMEOUT)
@@ -75,20 +88,11 @@ async def _obter_url_por_clique(pagina, card, idx: int, CARD_SELECTOR: str) -> s
 
         # voltar para a listagem
         await pagina.go_back()
-
-        # garantir que voltou para a URL/lista certa e DOM presente
-        try:
-            await pagina.wait_for_function(
-                "() => location.pathname.includes(arguments[0])", LIST_URL_PART, timeout=TIMEOUT
-            )
-        except:
-            pass
-
+        await pagina.wait_for_url(url_lista, timeout=TIMEOUT_ROTA)
         await pagina.wait_for_selector(CARD_SELECTOR, timeout=TIMEOUT)
-        await pagina.wait_for_load_state("networkidle")
+
         # rola até perto de onde estávamos (um offsetzinho pra cima ajuda)
         await pagina.evaluate("y => window.scrollTo(0, Math.max(0, y - 200))", y)
-        await asyncio.sleep(0.2)
 
         # garante que o card idx exista/esteja visível de novo
         await _ensure_card_loaded_and_visible(pagina, idx, CARD_SELECTOR)
@@ -96,6 +100,189 @@ async def _obter_url_por_clique(pagina, card, idx: int, CARD_SELECTOR: str) -> s
     except Exception as e:
         logger.warning(f"Falha ao capturar URL por clique (card {idx}): {e}")
     return url_detalhe
+
+def _url_absoluta(href: str) -> str:
+    if not href:
+        return ""
+    return urljoin(BASE_URL, href)
+
+# lê a rota do próprio card: <a>, data-* ou props do React (sem clicar)
+JS_ROTAS_POR_ATRIBUTOS = """
+(cards) => cards.map(card => {
+    const a = card.querySelector('a[href]') || card.closest('a[href]');
+    if (a && a.getAttribute('href')) return a.getAttribute('href');
+
+    const ATTRS = ['data-href', 'data-url', 'data-link', 'data-route'];
+    const PROPS = ['href', 'as', 'url', 'link'];
+    for (const el of [card, ...card.querySelectorAll('*')]) {
+        for (const attr of ATTRS) {
+            const v = el.getAttribute(attr);
+            if (v) return v;
+        }
+        const chave = Object.keys(el).find(k => k.startsWith('__reactProps$'));
+        const props = chave ? (el[chave] || {}) : {};
+        for (const p of PROPS) {
+            if (typeof props[p] === 'string' && props[p]) return props[p];
+        }
+    }
+
+    // sobe a árvore de fibers procurando props de rota (Link/Router)
+    const chaveFiber = Object.keys(card).find(k => k.startsWith('__reactFiber$'));
+    let fiber = chaveFiber ? card[chaveFiber] : null;
+    for (let passos = 0; fiber && passos < 15; passos++, fiber = fiber.return) {
+        const props = fiber.memoizedProps || {};
+        for (const p of PROPS) {
+            if (typeof props[p] === 'string' && props[p]) return props[p];
+        }
+    }
+    return '';
+})
+"""
+
+# intercepta router.push (Next.js) para capturar a rota sem sair da listagem. O clique
+# acontece na página viva: a navegação padrão de <a> é cancelada (listener em bolha, depois
+# do onClick do React), pushState/window.open só registram a rota, e location.assign é
+# barrado do lado do Python (resolver_urls_cards aborta navegações do frame principal)
+JS_ROTAS_POR_ROUTER = """
+async ({sel, indices}) => {
+    const router = window.next && window.next.router;
+    if (!router || typeof router.push !== 'function') return {};
+
+    const original = router.push;
+    const pushState = history.pushState;
+    const abrir = window.open;
+    const urlLista = location.href;
+    let capturada = null;
+    const registrar = (alvo) => {
+        if (typeof alvo === 'string' && alvo) {
+            capturada = alvo;
+        } else if (alvo && alvo.pathname) {
+            const query = alvo.query ? new URLSearchParams(alvo.query).toString() : '';
+            capturada = alvo.pathname + (query ? '?' + query : '');
+        } else if (alvo && alvo.href) {
+            capturada = String(alvo.href);
+        }
+    };
+    router.push = (url, as) => {
+        registrar((typeof as === 'string' && as) ? as : url);
+        return Promise.resolve(true);
+    };
+    history.pushState = (estado, titulo, url) => registrar(url);
+    window.open = (url) => { registrar(url); return null; };
+    const semNavegar = (ev) => ev.preventDefault();
+    window.addEventListener('click', semNavegar);
+
+    // clica no elemento que realmente tem o onClick (pode ser um filho do card)
+    const alvoClique = (card) => [card, ...card.querySelectorAll('*')].find(el => {
+        const chave = Object.keys(el).find(k => k.startsWith('__reactProps$'));
+        return chave && el[chave] && typeof el[chave].onClick === 'function';
+    }) || card;
+
+    const cards = document.querySelectorAll(sel);
+    const rotas = {};
+    try {
+        for (const i of indices) {
+            const card = cards[i];
+            if (!card) continue;
+            capturada = null;
+            alvoClique(card).click();
+            await new Promise(r => setTimeout(r, 0));
+            if (capturada) rotas[i] = capturada;
+        }
+        // deixa sair (e ser abortada) alguma navegação agendada pelo último clique
+        await new Promise(r => setTimeout(r, 50));
+    } finally {
+        router.push = original;
+        history.pushState = pushState;
+        window.open = abrir;
+        window.removeEventListener('click', semNavegar);
+        if (location.href !== urlLista) history.replaceState(history.state, '', urlLista);
+    }
+    return rotas;
+}
+"""
+
+async def _url_por_aba(pagina, idx: int, CARD_SELECTOR: str, sem: asyncio.Semaphore) -> str:
+    # abre a listagem numa aba de fundo e clica lá; a aba principal não sai do lugar
+    async with sem:
+        aba = await pagina.context.new_page()
+        try:
+            await aba.goto(pagina.url, timeout=TIMEOUT, wait_until="domcontentloaded")
+            url_lista = aba.url
+            card = await _ensure_card_loaded_and_visible(aba, idx, CARD_SELECTOR)
+            await card.click(timeout=TIMEOUT, force=True)
+            await aba.wait_for_url(lambda u: u != url_lista, timeout=TIMEOUT_ROTA)
+            return aba.url
+        except Exception as e:
+            logger.warning(f"Falha ao resolver URL em aba de fundo (card {idx}): {e}")
+            return ""
+        finally:
+            await aba.close()
+
+async def resolver_urls_cards(pagina, indices: List[int], CARD_SELECTOR: str) -> Dict[int, str]:
+    """Resolve a URL de detalhe dos cards sem <a href>, sem sair da listagem.
+
+    Ordem: atributos/props do card -> router.push interceptado -> abas de fundo
+    em paralelo -> clique + go_back (último recurso).
+    """
+    urls: Dict[int, str] = {}
+    pendentes = list(indices)
+    if not pendentes:
+        return urls
+
+    try:
+        rotas = await pagina.eval_on_selector_all(CARD_SELECTOR, JS_ROTAS_POR_ATRIBUTOS)
+        for i in pendentes:
+            if i < len(rotas) and rotas[i]:
+                urls[i] = _url_absoluta(rotas[i])
+    except Exception as e:
+        logger.warning(f"Falha ao ler rotas dos atributos dos cards: {e}")
+    pendentes = [i for i in pendentes if i not in urls]
+
+    if pendentes:
+        async def _barrar_navegacao(route):
+            # os cliques não podem tirar a listagem do lugar (ex.: location.assign no onClick)
+            req = route.request
+            if req.is_navigation_request() and req.frame == pagina.main_frame:
+                await route.abort()
+            else:
+                await route.fallback()
+
+        await pagina.route("**/*", _barrar_navegacao)
+        try:
+            rotas = await pagina.evaluate(JS_ROTAS_POR_ROUTER, {"sel": CARD_SELECTOR, "indices": pendentes})
+            for i, rota in (rotas or {}).items():
+                if rota:
+                    urls[int(i)] = _url_absoluta(rota)
+        except Exception as e:
+            logger.warning(f"Falha ao interceptar o router: {e}")
+        finally:
+            await pagina.unroute("**/*", _barrar_navegacao)
+        pendentes = [i for i in pendentes if i not in urls]
+
+    if pendentes:
+        sem = asyncio.Semaphore(MAX_ABAS_RESOLUCAO)
+        resultados = await asyncio.gather(
+            *(_url_por_aba(pagina, i, CARD_SELECTOR, sem) for i in pendentes)
+        )
+        for i, url in zip(pendentes, resultados):
+            if url:
+                urls[i] = url
+        pendentes = [i for i in pendentes if i not in urls]
+
+    for i in pendentes:
+        logger.info(f"Card {i}: usando clique + go_back como último recurso.")
+        try:
+            card = await _ensure_card_loaded_and_visible(pagina, i, CARD_SELECTOR)
+        except Exception as e:
+            logger.warning(f"Não consegui tornar visível o card {i}: {e}")
+            continue
+        url = await _obter_url_por_clique(pagina, card, i, CARD_SELECTOR)
+        if url:
+            urls[i] = url
+
+    logger.info(f"{len(urls)}/{len(indices)} URLs resolvidas sem href.")
+    return urls
     
 async def tentar_extrair_dados_tecnicos(pagina) -> Dict[str, str]:
     campos = {
@@ -178,118 +365,129 @@ async def tentar_extrair_revenda(pagina) -> str:
         logger.warning(f"Erro ao extrair localização: {e}")
     return "Não informado"
 
-async def extrair_da_listagem(pagina) -> List[Dict]:
-    dados_coletados: List[Dict] = []
-
-    # força carregar mais itens (lazy load)
-    for _ in range(12):
-        await pagina.evaluate("window.scrollBy(0, 1200)")
-        await asyncio.sleep(0.15)
-
-    CARD_SELECTOR = "div.productCard.columns"
-    INFO_SELECTOR = "div.infoProduct.columns"
-
-    await pagina.wait_for_selector(CARD_SELECTOR, timeout=TIMEOUT)
-    cards = pagina.locator(CARD_SELECTOR)
-    total = await cards.count()
-    logger.info(f"{total} cards encontrados na listagem.")
+CARD_SELECTOR = "div.productCard.columns"
+INFO_SELECTOR = "div.infoProduct.columns"
+
+CAMPOS_CARD = {
+    "Título": [f"{INFO_SELECTOR} h4", "h4"],
+    "Preço_raw": {"seletores": [f"{INFO_SELECTOR} p.price", "p.price"], "padrao": ""},
+    "Imagem_alt": {"seletores": ["div.product-img-container.columns img"], "attr": "alt", "padrao": ""},
+    "Imagem_src": {"seletores": ["div.product-img-container.columns img"], "attr": "src", "padrao": ""},
+    "href": {"seletores": ["a[href]"], "attr": "href", "padrao": ""},
+}
+
+def _item_de_json(campos: Dict[str, str]) -> Dict[str, str]:
+    """Campos de um anúncio da API no formato que `extrair_cards` devolve para CAMPOS_CARD."""
+    titulo = campos.get("Título") or " ".join(
+        v for v in (campos.get("Marca"), campos.get("Modelo"), campos.get("Versão")) if v
+    )
+    return {
+        "Título": titulo or "Não informado",
+        "Preço_raw": formatar_brl(campos["Preço"]) if campos.get("Preço") else "",
+        "Imagem_alt": titulo,
+        "Imagem_src": campos.get("Imagem", ""),
+        "href": campos.get("Link", ""),
+    }
 
-    for i in range(total):
-        try:
-            card = await _ensure_card_loaded_and_visible(pagina, i, CARD_SELECTOR)
-        except Exception as e:
-            logger.warning(f"Não consegui tornar visível o card {i}: {e}")
-            continue
+async def _itens_da_captura(pagina, captura: CapturaRespostas) -> List[Dict[str, str]]:
+    """Cards da página vindos do JSON, ou [] se o JSON não cobre todos os cards com link."""
+    await captura.concluir()
+    itens = [_item_de_json(c) for c in captura.retirar(pagina)]
+    if not itens or not all(i["href"].startswith(("/", "http")) for i in itens):
+        return []
+    if len(itens) < await pagina.locator(CARD_SELECTOR).count():
+        return []
+    return itens
+
+async def extrair_da_listagem(pagina, captura: Optional[CapturaRespostas] = None) -> List[Dict]:
+    dados_coletados: List[Dict] = []
 
-        # Título
-        titulo = "Não informado"
-        try:
-            loc_titulo = card.locator(f"{INFO_SELECTOR} h4")
-            if await loc_titulo.count() == 0:
-                loc_titulo = card.locator("h4")
-            if await loc_titulo.count() > 0:
-                titulo = (await loc_titulo.first.inner_text()).strip()
-        except Exception:
-            pass
-
-        # Preço
-        preco_raw = ""
-        try:
-            loc_preco = card.locator(f"{INFO_SELECTOR} p.price")
-            if await loc_preco.count() == 0:
-                loc_preco = card.locator("p.price")
-            if await loc_preco.count() > 0:
-                preco_raw = (await loc_preco.first.inner_text()).strip()
-        except Exception:
-            pass
-
-        preco = formatar_preco(preco_raw)
-
-        # Imagem
-        alt_img, src_img = "", ""
-        try:
-            img_loc = card.locator("div.product-img-container.columns img")
-            if await img_loc.count() > 0:
-                el = img_loc.first
-                alt_img = (await el.get_attribute("alt")) or ""
-                src_img = (await el.get_attribute("src")) or ""
-        except Exception:
-            pass
-
-        # URL: tenta href; se não existir, clica e captura page.url
-        url = ""
-        try:
-            a = card.locator('a[href]')
-            if await a.count() > 0:
-                href = await a.first.get_attribute("href")
-                if href:
-                    url = "https://www.trucadao.com.br" + href if href.startswith("/") else href
+    with perfil.etapa("listagem.espera_cards"):
+        await pagina.wait_for_selector(CARD_SELECTOR, timeout=TIMEOUT)
 
-            if not url:
-                # alguns cards não têm <a>, navegam via onClick/Router
-                url = await _obter_url_por_clique(pagina, card, i, CARD_SELECTOR)
+    # lazy load: rola até a quantidade de cards parar de crescer
+    with perfil.etapa("listagem.rolagem"):
+        await rolar_ate_estavel(pagina, CARD_SELECTOR)
 
-        except Exception as e:
-            logger.warning(f"Não foi possível obter URL do card {i}: {e}")
+    itens = await _itens_da_captura(pagina, captura) if captura else []
+    if itens:
+        logger.info(f"{len(itens)} cards lidos do JSON da listagem.")
+    else:
+        # todos os campos de todos os cards numa única ida ao navegador
+        with perfil.etapa("listagem.cards"):
+            itens = await extrair_cards(pagina, CARD_SELECTOR, CAMPOS_CARD)
+        logger.info(f"{len(itens)} cards encontrados na listagem.")
 
+    for item in itens:
         dados_coletados.append({
-            "Título": titulo,
-            "Preço_raw": preco_raw,
-            "Preço": preco,
-            "Imagem_alt": alt_img,
-            "Imagem_src": src_img,
-            "URL": url,  
+            "Título": item["Título"],
+            "Preço_raw": item["Preço_raw"],
+            "Preço": formatar_preco(item["Preço_raw"]),
+            "Imagem_alt": item["Imagem_alt"],
+            "Imagem_src": item["Imagem_src"],
+            "URL": _url_absoluta(item["href"]),
+            # o Scraping_Truncadao compara com o run anterior para pular detalhes inalterados
+            "Impressão": impressao(item),
         })
 
+    # cards sem <a> (onClick/Router) são resolvidos em lote
+    sem_href = [i for i, d in enumerate(dados_coletados) if not d["URL"]]
+    if sem_href:
+        with perfil.etapa("listagem.resolver_urls"):
+            urls = await resolver_urls_cards(pagina, sem_href, CARD_SELECTOR)
+        for i in sem_href:
+            dados_coletados[i]["URL"] = urls.get(i, "")
+
     return dados_coletados
 
-async def processar_todas_as_paginas() -> List[Dict]:
-    dados_total: List[Dict] = []
+async def processar_todas_as_paginas(concorrencia: int = MAX_PAGINAS_CONCORRENTES,
+                                     headless: bool = HEADLESS, rede: bool = CAPTURA_REDE,
+                                     navegador=None) -> List[Dict]:
     inicio = time()
+    politica = PoliticaRede(hosts_permitidos=HOSTS_PERMITIDOS)
+    captura = CapturaRespostas(FILTRO_API) if rede else None
+
+    async def extrair(pagina):
+        return await extrair_da_listagem(pagina, captura)
+
+    with CheckpointStore(NAMESPACE_CHECKPOINT, ARQUIVO_CHECKPOINT, lote=1) as checkpoint:
+        # páginas já salvas num run anterior não são baixadas de novo
+        feitas = checkpoint.chaves()
+        pendentes = [url for url in PAGE_URLS if url not in feitas]
+        if feitas:
+            logger.info(f"Checkpoint: {len(PAGE_URLS) - len(pendentes)} páginas prontas, {len(pendentes)} restantes.")
+
+        def _salvar_checkpoint(idx: int, resultados: List) -> None:
+            # checkpoint a cada página processada: só a página nova é gravada
+            checkpoint.adicionar(pendentes[idx], {"registros": resultados[idx]})
+            logger.info(f"Checkpoint salvo (página {PAGE_URLS.index(pendentes[idx]) + 1})")
+
+        await processar_paginas(
+            pendentes,
+            extrair,
+            concorrencia=concorrencia,
+            headless=headless,
+            ao_concluir=_salvar_checkpoint,
+            politica=politica,
+            preparar_contexto=captura.aplicar if captura else None,
+            navegador=navegador,
+        )
 
-    async with async_playwright() as p:
-        navegador = await p.chromium.launch(headless=False)
-        pagina = await navegador.new_page()
-        try:
-            for idx, url in enumerate(PAGE_URLS, start=1):
-                logger.info(f"===== Página {idx}/{len(PAGE_URLS)} =====")
-                await pagina.goto(url, timeout=80000)
-                await pagina.wait_for_load_state("domcontentloaded")
-
-                dados = await extrair_da_listagem(pagina)
-                dados_total.extend(dados)
-
-                # checkpoint a cada página processada
-                try:
-                    pd.DataFrame(dados_total).to_pickle(ARQUIVO_CHECKPOINT)
-                    logger.info(f"Checkpoint salvo ({len(dados_total)} regs)")
-                except Exception as e:
-                    logger.warning(f"Falha ao salvar checkpoint: {e}")
-        finally:
-            await navegador.close()
-
-        logger.info(f"Concluído em {time() - inicio:.1f}s com {len(dados_total)} registros")
-        return dados_total
+        # ordem final = ordem de PAGE_URLS, juntando as páginas do checkpoint
+        por_pagina = [(checkpoint.obter(url) or {}).get("registros") for url in PAGE_URLS]
+        faltando = sum(p is None for p in por_pagina)
+        if faltando:
+            logger.warning(f"{faltando} páginas falharam; rode de novo para completar pelo checkpoint.")
+        else:
+            # listagem completa: o próximo run começa do zero
+            checkpoint.limpar()
+    dados_total = concatenar_em_ordem(por_pagina)
+    logger.info(politica.resumo())
+    if captura:
+        logger.info(captura.resumo())
+
+    logger.info(f"Concluído em {time() - inicio:.1f}s com {len(dados_total)} registros")
+    return dados_total
 
 async def salvar_dados(dados: List[Dict]):
     if not dados:
@@ -312,6 +510,7 @@ async def salvar_dados(dados: List[Dict]):
 async def main():
     dados = await processar_todas_as_paginas()
     await salvar_dados(dados)
+    perfil.salvar_relatorio("links_trucadao")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,5 +1,14 @@
 from playwright.sync_api import sync_playwright
-import re, time, random, pandas as pd
+import asyncio, re, time, random, pandas as pd
+
+import cache_rede
+import marcas
+import perfil
+from captura_respostas import CapturaRespostas, formatar_brl
+from crawler_listagem import processar_indices, url_com_parametro
+from esperas import rolar_ate_estavel, rolar_ate_estavel_sync
+from extracao_cards import extrair_cards, extrair_cards_sync
+from politica_rede import PoliticaRede
 
 NBSP = "\xa0"
 
@@ -7,30 +16,6 @@ URL_QUEROTRUCK = "https://querotruck.com.br/anuncios/pesquisa-veiculos?categoria
 
 def jitter(a=0.5, b=1.2): time.sleep(random.uniform(a,b))
 
-def inner_text_or_default(locator, timeout=2500, default="Não informado"):
-    try:
-        t = locator.inner_text(timeout=timeout)
-        return (t or "").replace(NBSP, " ").strip() or default
-    except Exception:
-        return default
-
-def first_non_empty(card, selectors, timeout=2500, attr=None):
-    for sel in selectors:
-        try:
-            loc = card.locator(sel)
-            if loc.count() == 0:
-                continue
-            if attr:
-                val = loc.first.get_attribute(attr)
-                if val and val.strip():
-                    return val.strip()
-            else:
-                txt = loc.first.inner_text(timeout=timeout)
-                if txt and txt.strip():
-                    return txt.replace(NBSP, " ").strip()
-        except Exception:
-            pass
-    return "Não informado"
 
 def normalize_price(s):
     if not s or s == "Não informado": return s
@@ -103,36 +88,48 @@ SEL = {
     ]
 }
 
-SCROLL_STEPS = 3
 HEADLESS = False
-
-def extrair_card(card):
-    # garantir que o card esteja visível no viewport
-    try:
-        card.scroll_into_view_if_needed(timeout=2500)
-    except Exception:
-        pass
-
-    titulo = first_non_empty(card, SEL["marca_modelo"])
-    preco = normalize_price(first_non_empty(card, SEL["preco"]))
-    km = normalize_km(first_non_empty(card, SEL["km"]))
-    ano_txt = first_non_empty(card, SEL["ano"])
+MAX_ABAS = 4              # páginas (pageIndex) abertas ao mesmo tempo no modo por índice
+TIMEOUT_CARDS = 15000     # página sem card nesse prazo = depois da última
+PARAMETRO_PAGINA = "pageIndex"
+CAPTURA_REDE = True       # registros do JSON da API; o DOM fica como fallback
+# respostas JSON avaliadas: só a API de busca de anúncios (destaques, recomendações e facetas
+# também trazem listas de veículos). Se o site mudar a rota, conferir em DevTools > Network > Fetch/XHR
+FILTRO_API = r"(?:api\.querotruck\.com\.br/|querotruck\.com\.br/api/)(?:[^?]*/)?(?:anuncios?|veiculos?|pesquisa|search)"
+# pageSize pedido no modo rede; None = o do site. Se o site devolver menos que o pedido, o
+# deslocamento do pageIndex pode ser calculado sobre o pedido e pular anúncios: aí volta ao do site
+TAMANHO_PAGINA_REDE = None
+HOSTS_PERMITIDOS = ["querotruck.com.br"]  # nunca bloqueados pela política de rede
+
+# campos do card avaliados no navegador, na ordem de fallback do SEL
+CAMPOS_CARD = {campo: SEL[campo] for campo in ("marca_modelo", "preco", "km", "ano", "anunciante", "local")}
+
+def _marca_e_modelo(titulo):
+    """Marca canônica e o resto do h2 (modelo + versão); marcas compostas e apelidos via `marcas`."""
+    if not titulo or titulo == "Não informado":
+        return "Não informado", "Não informado"
+    marca, modelo, versao = marcas.separar_titulo(titulo)
+    resto = " ".join(p for p in (modelo, versao) if p)
+    # marca desconhecida: o h2 inteiro continua no Modelo, como antes
+    return (marca, resto or titulo) if marca else ("Não informado", titulo)
+
+def extrair_card(valores):
+    """Monta o registro a partir dos valores brutos de um card (ver extrair_cards_sync)."""
+    titulo = valores["marca_modelo"]
+    preco = normalize_price(valores["preco"])
+    km = normalize_km(valores["km"])
+    ano_txt = valores["ano"]
     m_ano = re.search(r"\b(19|20)\d{2}(?:/(19|20)\d{2})?\b", ano_txt) if ano_txt != "Não informado" else None
     ano = m_ano.group(0) if m_ano else (ano_txt or "Não informado")
 
-    anunciante = first_non_empty(card, SEL["anunciante"])
-    local = first_non_empty(card, SEL["local"])
+    anunciante = valores["anunciante"]
+    local = valores["local"]
 
-    # marca e modelo direto do h2 (não tento dividir por ora para evitar erro com marcas compostas)
-    marca = "Não informado"
-    modelo = "Não informado"
-    if titulo != "Não informado":
-        # se você tiver uma lista de marcas, dá pra separar certinho; por enquanto mantenho como bloco único no Modelo
-        modelo = titulo
+    marca, modelo = _marca_e_modelo(titulo)
 
     # fallback bruto lendo todo o texto do card se algo ficar "Não informado"
     if any(v == "Não informado" for v in [preco, km, ano, local]):
-        raw = inner_text_or_default(card)
+        raw = valores.get("_texto") or "Não informado"
         if preco == "Não informado":
             preco = normalize_price(raw)
         if km == "Não informado":
@@ -145,8 +142,8 @@ def extrair_card(card):
             if mloc: local = mloc.group(0).strip()
 
     return {
-        "Marca": marca,               # opcionalmente, mais tarde, você separa a marca do h2 usando dicionário de marcas
-        "Modelo": modelo,             # aqui deixo Modelo = "Marca + Modelo" do h2
+        "Marca": marca,
+        "Modelo": modelo,
         "Preço": preco,
         "Quilometragem": km,
         "Ano": ano,
@@ -155,46 +152,198 @@ def extrair_card(card):
         "Fonte": "QueroTruck"
     }
 
+def registro_de_json(campos):
+    """Registro no formato de `extrair_card` a partir dos campos de um anúncio da API."""
+    modelo = " ".join(v for v in (campos.get("Modelo"), campos.get("Versão")) if v)
+    marca = campos.get("Marca")
+    if marca:
+        marca = marcas.canonizar_marca(marca) or marca
+    if not modelo or not marca:
+        marca_titulo, modelo_titulo = _marca_e_modelo(campos.get("Título") or modelo)
+        marca = marca or (marca_titulo if marca_titulo != "Não informado" else None)
+        modelo = modelo or modelo_titulo
+    km = campos.get("Quilometragem")
+    local = campos.get("Localização") or " - ".join(v for v in (campos.get("Cidade"), campos.get("UF")) if v)
+    return {
+        "Marca": marca or "Não informado",
+        "Modelo": modelo,
+        "Preço": formatar_brl(campos["Preço"]) if campos.get("Preço") else "Não informado",
+        "Quilometragem": normalize_km(km if "km" in km.lower() else f"{km} km") if km else "Não informado",
+        "Ano": campos.get("Ano") or "Não informado",
+        "Anunciante": campos.get("Anunciante") or "Não informado",
+        "Localização": local or "Não informado",
+        "Fonte": "QueroTruck"
+    }
+
+JS_CARDS_NA_PAGINA = "() => document.querySelectorAll('app-truck-card').length"
+
+# total de páginas do paginador PrimeNG: "... de N" / cards por página, ou o maior número de página visível
+JS_TOTAL_PAGINAS = """
+(porPaginaUrl) => {
+    // o site pode limitar o pageSize pedido: vale quantos cards vieram de fato
+    const porPagina = document.querySelectorAll('app-truck-card').length || porPaginaUrl;
+    const atual = document.querySelector('.p-paginator-current');
+    const m = atual && atual.textContent.match(/de\\s+([\\d.]+)/i);
+    if (m && porPagina) return Math.ceil(parseInt(m[1].replace(/\\./g, ''), 10) / porPagina);
+    const numeros = Array.from(document.querySelectorAll('.p-paginator-pages .p-paginator-page'))
+        .map(b => parseInt(b.textContent, 10)).filter(n => !isNaN(n));
+    return numeros.length ? Math.max(...numeros) : null;
+}
+"""
+
+async def _esperar_cards(page) -> bool:
+    with perfil.etapa("querotruck.espera_cards"):
+        try:
+            await page.wait_for_selector(SEL["card"][-1], timeout=TIMEOUT_CARDS, state="attached")
+            return True
+        except Exception:
+            return False
+
+async def _rolar(page):
+    # lazy load: rola até a quantidade de cards parar de crescer
+    with perfil.etapa("querotruck.rolagem"):
+        await rolar_ate_estavel(page, SEL["card"][-1])
+
+async def _extrair_pagina(page, esperar=True):
+    """Registros de uma página de resultados já aberta ([] se ela não tem cards).
+
+    Com `esperar=False`, quem chama já esperou os cards e rolou a página.
+    """
+    if esperar:
+        if not await _esperar_cards(page):
+            return []
+        await _rolar(page)
+    with perfil.etapa("querotruck.cards"):
+        itens = await extrair_cards(page, SEL["card"], CAMPOS_CARD, incluir_texto=True)
+    resultados = []
+    for i, valores in enumerate(itens):
+        try:
+            resultados.append(extrair_card(valores))
+        except Exception as e:
+            print(f"[QueroTruck] Erro ao extrair card {i}: {e}")
+    print(f"[QueroTruck] {page.url}: {len(resultados)} cards")
+    return resultados
+
+async def _extrair_pagina_rede(page, captura):
+    """Registros da página a partir do JSON capturado; sem JSON que cubra os cards, lê o DOM.
+
+    Página sem cards é vazia mesmo que algum JSON tenha sido capturado (destaques etc.).
+    """
+    pronta = await _esperar_cards(page)
+    if pronta:
+        # os lotes seguintes só são pedidos à API quando a rolagem chega neles
+        await _rolar(page)
+    await captura.concluir()
+    campos = captura.retirar(page)
+    if not pronta:
+        return []
+    if campos and len(campos) >= await page.evaluate(JS_CARDS_NA_PAGINA):
+        print(f"[QueroTruck] {page.url}: {len(campos)} anúncios do JSON")
+        return [registro_de_json(c) for c in campos]
+    return await _extrair_pagina(page, esperar=False)
+
+async def coletar_querotruck_async(url=URL_QUEROTRUCK, concorrencia=MAX_ABAS, headless=HEADLESS,
+                                   rede=CAPTURA_REDE, tamanho_pagina=TAMANHO_PAGINA_REDE,
+                                   navegador=None, ao_extrair=None):
+    """Abre as páginas direto pelo pageIndex, em várias abas, em vez de clicar em "próxima".
+
+    Com `rede=True` os registros saem das respostas JSON da API e o DOM só é
+    lido se nada for capturado. Com `tamanho_pagina`, pede esse pageSize; se a
+    página 1 vier com menos cards que o pedido (o site limitou) e houver mais
+    páginas, a coleta recomeça com o tamanho do site, para não pular anúncios.
+    `navegador` e `ao_extrair` seguem para `processar_indices` (uso no orquestrador).
+    """
+    url_original = url
+    captura = None
+    if rede:
+        captura = CapturaRespostas(FILTRO_API)
+    if tamanho_pagina:
+        url = url_com_parametro(url, "pageSize", tamanho_pagina)
+    m = re.search(r"pageSize=(\d+)", url)
+    por_pagina = int(m.group(1)) if m else None
+    limitado = False
+
+    async def contar(page):
+        nonlocal limitado
+        total = await page.evaluate(JS_TOTAL_PAGINAS, por_pagina)
+        if tamanho_pagina and total and total > 1:
+            vieram = await page.evaluate(JS_CARDS_NA_PAGINA)
+            if vieram < tamanho_pagina:
+                limitado = True
+                return 1  # não abre as outras páginas com o pageSize pedido
+        return total
+
+    async def extrair(page):
+        return await (_extrair_pagina_rede(page, captura) if captura else _extrair_pagina(page))
+
+    politica = PoliticaRede(hosts_permitidos=HOSTS_PERMITIDOS)
+    resultados = await processar_indices(
+        lambda i: url_com_parametro(url, PARAMETRO_PAGINA, i),
+        extrair,
+        contar_paginas=contar,
+        concorrencia=concorrencia,
+        headless=headless,
+        timeout_goto=320000,
+        politica=politica,
+        preparar_contexto=captura.aplicar if captura else None,
+        navegador=navegador,
+        ao_extrair=ao_extrair,
+    )
+    print(f"[QueroTruck] {len(resultados)} registros; {politica.resumo()}")
+    if captura:
+        print(f"[QueroTruck] {captura.resumo()}")
+    if limitado:
+        print(f"[QueroTruck] O site não aceitou pageSize={tamanho_pagina}; recomeçando com o tamanho do site.")
+        return await coletar_querotruck_async(url_original, concorrencia, headless, rede, None,
+                                              navegador=navegador, ao_extrair=ao_extrair)
+    return resultados
+
 def coletar_querotruck(url=URL_QUEROTRUCK):
     resultados = []
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=HEADLESS)
-        page = browser.new_page(viewport={"width": 1366, "height": 900})
-        page.goto(url, timeout=320000)
-        page.wait_for_load_state("domcontentloaded", timeout=320000)
+        context = browser.new_context(viewport={"width": 1366, "height": 900})
+        cache = cache_rede.do_ambiente()
+        if cache:
+            cache.aplicar_sync(context)
+        politica = PoliticaRede(hosts_permitidos=HOSTS_PERMITIDOS)
+        politica.aplicar_sync(context)
+        page = context.new_page()
+        with perfil.etapa("querotruck.goto"):
+            page.goto(url, timeout=320000)
+            page.wait_for_load_state("domcontentloaded", timeout=320000)
 
         page_idx = 1
         while True:
             print(f"[QueroTruck] Página {page_idx} — carregando cards…")
 
-            # lazy-load/scroll
-            for _ in range(SCROLL_STEPS):
-                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                jitter(0.6, 1.2)
-
             # achar cards
-            cards = None
-            for sel in SEL["card"]:
-                try:
-                    page.wait_for_selector(sel, timeout=15000, state="attached")
-                    loc = page.locator(sel)
-                    if loc.count() > 0:
-                        cards = loc
+            encontrou = None
+            with perfil.etapa("querotruck.espera_cards"):
+                for sel in SEL["card"]:
+                    try:
+                        page.wait_for_selector(sel, timeout=15000, state="attached")
+                        encontrou = sel
                         break
-                except Exception:
-                    continue
+                    except Exception:
+                        continue
 
-            if cards is None:
+            if not encontrou:
                 print("[QueroTruck] Nenhum card encontrado.")
                 break
 
-            total = cards.count()
-            print(f"[QueroTruck] {total} cards encontrados")
+            # lazy load: rola até a quantidade de cards parar de crescer
+            with perfil.etapa("querotruck.rolagem"):
+                rolar_ate_estavel_sync(page, encontrou)
+
+            # todos os cards da página numa única ida ao navegador
+            with perfil.etapa("querotruck.cards"):
+                itens = extrair_cards_sync(page, SEL["card"], CAMPOS_CARD, incluir_texto=True)
+            print(f"[QueroTruck] {len(itens)} cards encontrados")
 
-            for i in range(total):
-                card = cards.nth(i)
+            for i, valores in enumerate(itens):
                 try:
-                    item = extrair_card(card)
+                    item = extrair_card(valores)
                     resultados.append(item)
                 except Exception as e:
                     print(f"[QueroTruck] Erro ao extrair card {i}: {e}")
@@ -214,9 +363,10 @@ def coletar_querotruck(url=URL_QUEROTRUCK):
                     if (not disabled) and ("p-disabled" not in klass):
                         print(f"[QueroTruck] Próxima página via: {sel_next}")
                         el.scroll_into_view_if_needed(timeout=3000)
-                        el.click()
-                        page.wait_for_load_state("domcontentloaded", timeout=320000)
-                        jitter(0.7, 1.4)
+                        with perfil.etapa("querotruck.proxima"):
+                            el.click()
+                            page.wait_for_load_state("domcontentloaded", timeout=320000)
+                            jitter(0.7, 1.4)
                         page_idx += 1
                         avancou = True
                         break
@@ -228,10 +378,12 @@ def coletar_querotruck(url=URL_QUEROTRUCK):
                 break
 
         browser.close()
+        print(f"[QueroTruck] {politica.resumo()}")
     return resultados
 
 if __name__ == "__main__":
-    dados = coletar_querotruck()
+    dados = asyncio.run(coletar_querotruck_async())
     df = pd.DataFrame(dados)
     df.to_excel("querotruck.xlsx", index=False)
     print("Exportado: querotruck.xlsx")
+    perfil.salvar_relatorio("querotruck")
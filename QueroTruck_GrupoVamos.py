@@ -1,96 +1,83 @@
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
-import time
+import asyncio
 import pandas as pd
 import re
 
-def extracaoDadosQueroTrck(pagina, xpath, site):
-    dados_extraidos = []
-    itens = pagina.locator(xpath)
+import cache_rede
+import marcas
+import perfil
+from captura_respostas import CapturaRespostas, formatar_brl
+from crawler_listagem import processar_indices, url_com_parametro
+from esperas import (assinatura_cards_sync, esperar_cards_prontos_sync, esperar_troca_cards_sync,
+                     rolar_ate_estavel, rolar_ate_estavel_sync)
+from extracao_cards import extrair_cards, extrair_cards_sync
+from politica_rede import PoliticaRede
+
+HOSTS_PERMITIDOS = ["vamos.com.br", "querotruck.com.br"]  # nunca bloqueados pela política de rede
+MAX_ABAS = 4              # páginas abertas ao mesmo tempo no modo por índice
+TIMEOUT_CARDS = 15000     # página sem card nesse prazo = depois da última
+TIMEOUT_NAVEGACAO = 60000
+TIMEOUT_TROCA_CARDS = 30000  # limite rígido para a listagem trocar depois de "próxima"
+PARAMETRO_PAGINA = "page"  # paginador da Vamos é endereçável por ?page=N
+CAPTURA_REDE = True        # registros do JSON da API; o DOM fica como fallback
+# respostas JSON avaliadas: só a API de ofertas de seminovos (vitrines e filtros também trazem
+# listas). Se o site mudar a rota, conferir em DevTools > Network > Fetch/XHR
+FILTRO_API = r"(?:api\.[a-z.]*vamos\.com\.br/|vamos\.com\.br/api/)(?:[^?]*/)?(?:seminovos|ofertas?|veiculos?|estoque|search)"
 
-    for i in range(1, itens.count() + 1):
-        try:
-            xpath_item = f"({xpath})[{i}]"
-            informacoes = pagina.locator(f'xpath={xpath_item}').inner_text()
-            print(f'Informações {i}: {informacoes}')  
-            dados = separar_informacoes_querotruck(informacoes)
-            dados_extraidos.append(dados)
-        except Exception as e:
-            print(f"Erro ao extrair informações do item {i}: {e}")
-
-    return dados_extraidos
+def extracaoDadosQueroTrck(pagina, xpath, site):
+    # texto de todos os itens numa única ida ao navegador (um locator por item reavaliava o XPath inteiro)
+    try:
+        textos = pagina.locator(f"xpath={xpath}").all_inner_texts()
+    except Exception as e:
+        print(f"Erro ao extrair informações dos itens: {e}")
+        return []
+    print(f"Total de itens encontrados: {len(textos)}")
+    return separar_informacoes_querotruck_lote(textos)
+
+# cada informação do card Vamos é uma linha com ícone (img alt) + <p>
+INFO_VAMOS = "div.flex.flex-items-center"
+
+CAMPOS_GRUPOVAMOS = {
+    "Modelo": ["h2"],
+    "Marca": ["p.ejs-paragraph.cor-black.s4.fw500.upc.mbauto"],
+    "Localização": [f'{INFO_VAMOS}:has(img[alt="ico-location.svg"]) p'],
+    "Quilometragem": [f'{INFO_VAMOS}:has(img[alt="ico-km.svg"]) p'],
+    "Ano": [f'{INFO_VAMOS}:has(img[alt="ico-data.svg"]) p'],
+    "Preço": ["strong.cor-black.s10.fw600.mtauto"],
+}
 
 def extracaoDadosGrupoVamos(pagina, xpath_card, site=None):
     dados_extraidos = []
-    cards = pagina.locator(xpath_card)
 
-    total = cards.count()
-    print(f"Total de cards encontrados: {total}")
+    try:
+        # todos os cards da página numa única ida ao navegador
+        cards = extrair_cards_sync(pagina, xpath_card, CAMPOS_GRUPOVAMOS)
+    except Exception as e:
+        print(f"Erro ao extrair cards: {e}")
+        return dados_extraidos
 
-    for i in range(total):
-        try:
-            card = cards.nth(i)
+    print(f"Total de cards encontrados: {len(cards)}")
 
-            try:
-                modelo = card.locator("h2").inner_text(timeout=2000)
-            except:
-                modelo = "Não informado"
+    for card in cards:
+        dados_extraidos.append(_registro_grupovamos(card))
 
-            try:
-                marca = card.locator("p.ejs-paragraph.cor-black.s4.fw500.upc.mbauto").inner_text(timeout=2000)
-            except:
-                marca = "Não informado"
-
-            info_divs = card.locator('div.flex.flex-items-center')
-
-            local = km = ano = "Não informado"
-
-            for j in range(info_divs.count()):
-                div = info_divs.nth(j)
-                try:
-                    img = div.locator("img")
-                    if img.count() > 0:
-                        alt = img.get_attribute("alt")  # ← isso vai conter: ico-location.svg, ico-km.svg, ico-data.svg
-                        texto = div.locator("p").inner_text().strip()
-
-                        if alt == "ico-location.svg":
-                            local = texto
-                        elif alt == "ico-km.svg":
-                            km = texto
-                        elif alt == "ico-data.svg":
-                            ano = texto
-                except:
-                    continue
+    return dados_extraidos
 
-            try:
-                preco_raw = card.locator("strong.cor-black.s10.fw600.mtauto").inner_text(timeout=2000)
-                preco = preco_raw.replace("\xa0", " ").strip()
-            except:
-                preco = "Não informado"
-
-            dados = {
-                "Modelo": modelo.strip(),
-                "Marca": marca.strip(),
-                "Localização": local,
-                "Quilometragem": km,
-                "Ano": ano,
-                "Preço": preco.strip(),
-                "Anunciante": "Grupo Vamos"
-            }
-            dados_extraidos.append(dados)
-
-        except Exception as e:
-            print(f"Erro ao extrair card {i}: {e}")
-            dados_extraidos.append({
-                "Modelo": "Erro",
-                "Marca": "Erro",
-                "Localização": "Erro",
-                "Quilometragem": "Erro",
-                "Ano": "Erro",
-                "Preço": "Erro",
-                "Anunciante": "Erro"
-            })
+def _registro_grupovamos(card):
+    return {
+        "Modelo": card["Modelo"],
+        "Marca": card["Marca"],
+        "Localização": card["Localização"],
+        "Quilometragem": card["Quilometragem"],
+        "Ano": card["Ano"],
+        "Preço": card["Preço"],
+        "Anunciante": "Grupo Vamos"
+    }
 
-    return dados_extraidos
+RE_KM_QUEROTRUCK = re.compile(r"([\d\.]+)")
+RE_ANO_QUEROTRUCK = re.compile(r"\d{4}(?:/\d{4})?")
+RE_CIDADE_UF = re.compile(r"[A-Za-zÀ-ÿ\s]+[-–]\s?[A-Z]{2}$")
+RE_SO_CIDADE = re.compile(r"^[A-Za-zÀ-ÿ\s]+$")
 
 def separar_informacoes_querotruck(informacoes):
     dados = {
@@ -107,37 +94,43 @@ def separar_informacoes_querotruck(informacoes):
         linhas = [linha.strip() for linha in informacoes.split('\n') if linha.strip()]
 
         if len(linhas) >= 2:
-            # Primeira linha: Marca e Modelo
-            marca_modelo = linhas[0].split(" ", 1)
-            dados["Marca"] = marca_modelo[0]
-            dados["Modelo"] = marca_modelo[1] if len(marca_modelo) > 1 else "Não informado"
+            # Primeira linha: Marca e Modelo (marcas compostas e apelidos pela trie de `marcas`)
+            marca, modelo, versao = marcas.separar_titulo(linhas[0])
+            if marca:
+                dados["Marca"] = marca
+                dados["Modelo"] = " ".join(p for p in (modelo, versao) if p) or "Não informado"
+            else:
+                marca_modelo = linhas[0].split(" ", 1)
+                dados["Marca"] = marca_modelo[0]
+                dados["Modelo"] = marca_modelo[1] if len(marca_modelo) > 1 else "Não informado"
 
             # Segunda linha: Preço
             dados["Preço"] = linhas[1] if "R$" in linhas[1] else "Não informado"
 
+        # uma passada só: rótulos olham a linha seguinte; a localização é a última
+        # linha "Cidade - UF" ou, sem nenhuma, a última que pareça uma cidade isolada
+        local_uf = local_cidade = None
         for i, linha in enumerate(linhas):
-            if "ODÔMETRO" in linha.upper() and i + 1 < len(linhas):
-                km = re.search(r"([\d\.]+)", linhas[i + 1])
+            rotulo = linha.upper()
+            proxima = linhas[i + 1] if i + 1 < len(linhas) else None
+            if "ODÔMETRO" in rotulo and proxima is not None:
+                km = RE_KM_QUEROTRUCK.search(proxima)
                 dados["Quilometragem"] = km.group(1).replace('.', '') + " km" if km else "Não informado"
 
-            elif "ANO" in linha.upper() and i + 1 < len(linhas):
-                ano = re.search(r"\d{4}(?:/\d{4})?", linhas[i + 1])
+            elif "ANO" in rotulo and proxima is not None:
+                ano = RE_ANO_QUEROTRUCK.search(proxima)
                 dados["Ano"] = ano.group(0) if ano else "Não informado"
 
-            elif "ANUNCIANTE" in linha.upper() and i + 1 < len(linhas):
-                dados["Anunciante"] = linhas[i + 1].strip()
+            elif "ANUNCIANTE" in rotulo and proxima is not None:
+                dados["Anunciante"] = proxima.strip()
 
-            # Tenta encontrar uma linha com formato "Cidade - UF"
-            for linha in reversed(linhas):
-                if re.search(r"[A-Za-zÀ-ÿ\s]+[-–]\s?[A-Z]{2}$", linha):
-                    dados["Localização"] = linha.strip()
-                    break
-            # Caso não encontre, tenta capturar a última linha que seja uma cidade isolada (sem "- UF")
-            if dados["Localização"] == "Não informado":
-                for linha in reversed(linhas):
-                    if re.match(r"^[A-Za-zÀ-ÿ\s]+$", linha) and len(linha.split()) <= 4:
-                        dados["Localização"] = linha.strip()
-                        break
+            if RE_CIDADE_UF.search(linha):
+                local_uf = linha
+            elif RE_SO_CIDADE.match(linha) and len(linha.split()) <= 4:
+                local_cidade = linha
+
+        if local_uf or local_cidade:
+            dados["Localização"] = local_uf or local_cidade
 
     except Exception as e:
         print(f"Erro ao separar informações do QueroTruck: {e}")
@@ -153,6 +146,10 @@ def separar_informacoes_querotruck(informacoes):
 
     return dados
 
+def separar_informacoes_querotruck_lote(textos):
+    """Um registro por texto de card (ex.: a lista de all_inner_texts de uma página)."""
+    return [separar_informacoes_querotruck(texto) for texto in textos]
+
 def separar_informacoes_grupovamos(informacoes):
     dados = {
         "Modelo": "Não informado",
@@ -200,22 +197,31 @@ def separar_informacoes_grupovamos(informacoes):
 def coletar_dados(url, xpath, seletor_proxima_pagina, func_extracao, site):
     with sync_playwright() as p:
         navegador = p.chromium.launch()
-        pagina = navegador.new_page()
-        pagina.goto(url, timeout=320000)
-        pagina.wait_for_load_state('load', timeout=320000)
+        contexto = navegador.new_context()
+        cache = cache_rede.do_ambiente()
+        if cache:
+            cache.aplicar_sync(contexto)
+        politica = PoliticaRede(hosts_permitidos=HOSTS_PERMITIDOS)
+        politica.aplicar_sync(contexto)
+        pagina = contexto.new_page()
+        with perfil.etapa(f"{site}.goto"):
+            pagina.goto(url, timeout=TIMEOUT_NAVEGACAO, wait_until="domcontentloaded")
 
         todos_os_dados = []
 
         while True:
             print("Coletando dados da página...")
+            # cards presentes e contagem estável
+            with perfil.etapa(f"{site}.espera_cards"):
+                assinatura = esperar_cards_prontos_sync(pagina, xpath, timeout=TIMEOUT_TROCA_CARDS)
             if site == "grupovamos":
-                pagina.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                time.sleep(3)
-
-            pagina.wait_for_selector(xpath, timeout=320000)
-            dados_atual = func_extracao(pagina, xpath, site)
+                # lazy load: rola até a contagem parar de crescer; a assinatura passa a incluir o que carregou
+                with perfil.etapa(f"{site}.rolagem"):
+                    rolar_ate_estavel_sync(pagina, xpath)
+                    assinatura = assinatura_cards_sync(pagina, xpath)
+            with perfil.etapa(f"{site}.extrair"):
+                dados_atual = func_extracao(pagina, xpath, site)
             todos_os_dados.extend(dados_atual)
-            time.sleep(5)
 
             try:
                 # Timeout diferente para cada site (mais seguro para a Vamos)
@@ -228,21 +234,13 @@ def coletar_dados(url, xpath, seletor_proxima_pagina, func_extracao, site):
                     classe_botao = proxima_pagina.get_attribute("class")
 
                     if not desativado and (classe_botao is None or "p-disabled" not in classe_botao):
-                        
-                        if site == "querotruck":
-                            print("Indo para a próxima página (QueroTruck)...")
-                            proxima_pagina.scroll_into_view_if_needed()
+                        print(f"Indo para a próxima página ({site})...")
+                        with perfil.etapa(f"{site}.proxima"):
+                            if site == "querotruck":
+                                proxima_pagina.scroll_into_view_if_needed()
                             proxima_pagina.click()
-
-                            # Espera robusta após o clique → espera os cards recarregarem
-                            pagina.wait_for_selector(xpath, timeout=30000)
-                            time.sleep(2)
-                        else:  # grupo vamos
-                            print("Indo para a próxima página (GrupoVamos)...")
-                            proxima_pagina.click()
-                            pagina.wait_for_load_state('load', timeout=320000)
-                            time.sleep(2)
-                        
+                            # volta assim que a listagem trocou (SPA ou navegação completa)
+                            esperar_troca_cards_sync(pagina, xpath, assinatura, timeout=TIMEOUT_TROCA_CARDS)
                     else:
                         print("Última página alcançada (botão desativado).")
                         break
@@ -253,24 +251,113 @@ def coletar_dados(url, xpath, seletor_proxima_pagina, func_extracao, site):
                 print(f"Erro ao verificar/acionar botão de próxima página: {e}")
                 break
 
+        print(politica.resumo())
         return todos_os_dados
 
+# maior número do paginador ngx-pagination (os <li> de "anterior"/"próxima" não são números)
+JS_TOTAL_PAGINAS_VAMOS = """
+() => {
+    const numeros = Array.from(document.querySelectorAll('#paginador li'))
+        .map(li => parseInt(li.textContent.trim(), 10)).filter(n => !isNaN(n));
+    return numeros.length ? Math.max(...numeros) : null;
+}
+"""
+
+def registro_de_json_grupovamos(campos):
+    """Registro no formato de `_registro_grupovamos` a partir de uma oferta da API."""
+    km = campos.get("Quilometragem")
+    local = campos.get("Localização") or " - ".join(v for v in (campos.get("Cidade"), campos.get("UF")) if v)
+    return {
+        "Modelo": " ".join(v for v in (campos.get("Modelo"), campos.get("Versão")) if v) or "Não informado",
+        "Marca": campos.get("Marca") or "Não informado",
+        "Localização": local or "Não informado",
+        "Quilometragem": (km if "km" in km.lower() else f"{km} km") if km else "Não informado",
+        "Ano": campos.get("Ano") or "Não informado",
+        "Preço": formatar_brl(campos["Preço"]) if campos.get("Preço") else "Não informado",
+        "Anunciante": "Grupo Vamos"
+    }
+
+async def _esperar_cards(pagina, xpath_card):
+    with perfil.etapa("grupovamos.espera_cards"):
+        try:
+            await pagina.wait_for_selector(xpath_card, timeout=TIMEOUT_CARDS, state="attached")
+            return True
+        except Exception:
+            return False
+
+async def extrair_pagina_grupovamos(pagina, xpath_card, captura=None):
+    """Registros de uma página de seminovos já aberta ([] se ela não tem cards).
+
+    Com `captura`, usa as ofertas do JSON da API quando elas cobrem os cards da
+    página; senão (ou se nada foi capturado) lê o DOM.
+    """
+    pronta = await _esperar_cards(pagina, xpath_card)
+    if pronta:
+        # lazy load: a rolagem também dispara os pedidos à API dos lotes seguintes
+        with perfil.etapa("grupovamos.rolagem"):
+            await rolar_ate_estavel(pagina, xpath_card)
+    campos = []
+    if captura:
+        await captura.concluir()
+        campos = captura.retirar(pagina)
+    if not pronta:
+        return []  # JSON de vitrine numa página sem cards não a torna não vazia
+    if campos and len(campos) >= await pagina.locator(xpath_card).count():
+        print(f"{pagina.url}: {len(campos)} ofertas do JSON")
+        return [registro_de_json_grupovamos(c) for c in campos]
+    with perfil.etapa("grupovamos.extrair"):
+        cards = await extrair_cards(pagina, xpath_card, CAMPOS_GRUPOVAMOS)
+    print(f"{pagina.url}: {len(cards)} cards")
+    return [_registro_grupovamos(card) for card in cards]
+
+async def coletar_dados_async(url, xpath, concorrencia=MAX_ABAS, headless=True, rede=CAPTURA_REDE,
+                              navegador=None, ao_extrair=None):
+    """Abre as páginas direto por ?page=N, em várias abas, em vez de clicar no li[13].
+
+    `navegador` e `ao_extrair` seguem para `processar_indices` (uso no orquestrador).
+    """
+    captura = CapturaRespostas(FILTRO_API) if rede else None
+
+    async def contar(pagina):
+        return await pagina.evaluate(JS_TOTAL_PAGINAS_VAMOS)
+
+    async def extrair(pagina):
+        return await extrair_pagina_grupovamos(pagina, xpath, captura)
+
+    politica = PoliticaRede(hosts_permitidos=HOSTS_PERMITIDOS)
+    dados = await processar_indices(
+        lambda i: url_com_parametro(url, PARAMETRO_PAGINA, i),
+        extrair,
+        contar_paginas=contar,
+        concorrencia=concorrencia,
+        headless=headless,
+        timeout_goto=TIMEOUT_NAVEGACAO,
+        politica=politica,
+        preparar_contexto=captura.aplicar if captura else None,
+        navegador=navegador,
+        ao_extrair=ao_extrair,
+    )
+    print(politica.resumo())
+    if captura:
+        print(captura.resumo())
+    return dados
+
 url_seminovos = "https://vamos.com.br/seminovos/cavalo-mecanico"
 xpath_seminovos = "//app-offer-card"
 seletor_proxima_pagina_seminovos = 'xpath=//*[@id="paginador"]/pagination-template/nav/ul/li[13]/a'
 
-# Grupo Vamos
-dados_seminovos = coletar_dados(
-    url_seminovos,
-    xpath_seminovos,
-    seletor_proxima_pagina_seminovos,
-    func_extracao=extracaoDadosGrupoVamos,
-    site="grupovamos"
-)
+def main():
+    # Grupo Vamos (coletar_dados, página a página pelo botão, segue disponível)
+    dados_seminovos = asyncio.run(coletar_dados_async(url_seminovos, xpath_seminovos))
+
+    df_seminovos = pd.DataFrame(dados_seminovos)
 
-df_seminovos = pd.DataFrame(dados_seminovos)
+    with pd.ExcelWriter('dados_Vamos.xlsx') as writer:
+        df_seminovos.to_excel(writer, sheet_name='GrupoVamos', index=False)
 
-with pd.ExcelWriter('dados_Vamos.xlsx') as writer:
-    df_seminovos.to_excel(writer, sheet_name='GrupoVamos', index=False)
+    print("Dados exportados para 'dados_Vamos.xlsx' com abas separadas")
+    perfil.salvar_relatorio("grupovamos")
 
-print("Dados exportados para 'dados_Vamos.xlsx' com abas separadas")
\ No newline at end of file
+# a coleta só roda como script: importar o módulo (benchmarks, orquestrador) não abre navegador
+if __name__ == "__main__":
+    main()
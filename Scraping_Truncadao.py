@@ -1,9 +1,23 @@
-import os, sys, re, asyncio, logging, unicodedata
-from time import time
-from typing import Dict, List, Any, Optional
+import os, sys, re, asyncio, contextlib, logging, unicodedata, zlib
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+from time import monotonic, time
+from typing import Callable, Dict, Iterable, List, Any, Optional
 import pandas as pd
 from tqdm import tqdm
-from playwright.async_api import async_playwright, TimeoutError as PLTimeout
+from playwright.async_api import TimeoutError as PLTimeout
+
+import base_colunar
+import cache_rede
+import detalhe_http
+import incremental
+import perfil
+from checkpoint_store import CheckpointStore
+from concorrencia_adaptativa import ControladorAIMD
+from crawler_listagem import abrir_navegador
+from politica_rede import PoliticaRede
+from pool_paginas import PoolPaginas
+from ranking_seletores import RankingSeletores
 
 sys.stdout.reconfigure(encoding="utf-8")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -12,12 +26,26 @@ logger = logging.getLogger("trucadao-por-links")
 ARQUIVO_EXCEL_LINKS   = "Links_Truncadao.xlsx"      
 ARQUIVO_PKL_DADOS     = "trucadao.pkl"
 ARQUIVO_EXCEL_DADOS   = "trucadao.xlsx"
-ARQUIVO_CHECKPOINT    = "checkpoint_trucadao.pkl"
+ARQUIVO_CHECKPOINT    = "checkpoints.sqlite"
+NAMESPACE_CHECKPOINT  = "detalhes_trucadao"
+ARQUIVO_RANKING       = "ranking_seletores.json"  # acertos/erros por seletor, entre runs
+FONTE_BASE            = "trucadao"   # partição na base colunar
+EXPORTAR_EXCEL        = True         # trucadao.xlsx é só uma exportação da base
+SHARDS                = 1            # >1: um processo (navegador + event loop) por shard
+INCREMENTAL           = True         # só visita o detalhe se o card da listagem mudou
 
 TIMEOUT = 30000
 RETRIES = 3
-MAX_CONCURRENT = 12
+MAX_CONCURRENT = 12    # ponto de partida; o controlador AIMD ajusta entre MIN e MAX
+MIN_CONCURRENT = 2
+MAX_CONCURRENT_LIMITE = 32
+LATENCIA_ALVO_P95 = 10.0  # segundos por carregamento de detalhe
+MAX_USOS_PAGINA = 50   # a página do pool é recriada depois de N links
 HEADLESS = True
+MODO_DETALHE = "browser"  # "http": tenta HTTP + parser primeiro e manda ao navegador só o que faltar
+MAX_CONCURRENT_HTTP = 24
+CAMPOS_OBRIGATORIOS_HTTP = ("Título", "Preço_raw", "Marca", "Modelo", "Ano")
+HOSTS_PERMITIDOS = ["trucadao.com.br"]  # nunca bloqueados pela política de rede
 
 DETAIL_SELECTOR = "div.produtoVendedor"
 
@@ -102,32 +130,42 @@ def split_cidade_uf(txt: str):
         return "-".join(ped[:-1]).strip(), ped[-1].strip()
     return txt.strip(), ""
 
-async def extrair_primeiro_texto(page, seletores: List[str], default="Não informado") -> str:
-    for sel in seletores:
-        try:
-            loc = page.locator(f"xpath={sel}" if sel.strip().startswith("//") else sel).first
-            if await loc.count() > 0:
-                txt = await loc.text_content(timeout=TIMEOUT)
-                if txt and txt.strip():
-                    return txt.strip()
-        except Exception:
-            continue
-    return default
+RANKING = RankingSeletores(ARQUIVO_RANKING)
 
-async def carregar_links(arquivo: str) -> List[str]:
+async def extrair_primeiro_texto(page, seletores: List[str], default="Não informado",
+                                 campo: Optional[str] = None) -> str:
+    # uma sondagem por campo, sem esperar elemento; o seletor que mais acerta é testado primeiro
+    return await RANKING.primeiro_texto(page, campo or seletores[0], seletores, default)
+
+async def carregar_listagem(arquivo: str) -> Dict[str, str]:
+    """{link: impressão do card} na ordem da planilha ("" se não der para calcular)."""
     if not os.path.exists(arquivo):
         logger.error(f"Arquivo {arquivo} não encontrado.")
-        return []
+        return {}
     df = await asyncio.to_thread(pd.read_excel, arquivo)
-    # coluna 'link' (case-insensitive)
+    # coluna 'link' ou 'url' (case-insensitive; o Links_Truncadao grava 'URL')
     cols = {c.lower(): c for c in df.columns}
-    if "link" not in cols:
-        logger.error("Coluna 'link' não encontrada.")
-        return []
-    col = cols["link"]
-    links = df[col].dropna().astype(str).str.strip().unique().tolist()
-    logger.info(f"{len(links)} links únicos carregados de {arquivo}.")
-    return links
+    col = cols.get("link") or cols.get("url")
+    if not col:
+        logger.error("Coluna 'link'/'url' não encontrada.")
+        return {}
+    df = df[df[col].notna()]
+    df = df.assign(**{col: df[col].astype(str).str.strip()}).drop_duplicates(subset=[col])
+
+    if "Impressão" in df.columns:
+        impressoes = df["Impressão"].fillna("").astype(str)
+    elif all(c in df.columns for c in incremental.CAMPOS_IMPRESSAO):
+        # planilha de antes da coluna Impressão: calcula a partir do card
+        impressoes = df.apply(incremental.impressao, axis=1)
+    else:
+        impressoes = pd.Series("", index=df.index)
+
+    listagem = dict(zip(df[col], impressoes))
+    logger.info(f"{len(listagem)} links únicos carregados de {arquivo}.")
+    return listagem
+
+async def carregar_links(arquivo: str) -> List[str]:
+    return list(await carregar_listagem(arquivo))
 
 ROTULOS_MAP = {
     "marca": "Marca",
@@ -167,105 +205,327 @@ async def extrair_grid_por_rotulo(page) -> Dict[str, str]:
 async def extrair_por_seletores(page) -> Dict[str, str]:
     out = {k: "Não informado" for k in SELETORES_DIRETOS.keys()}
     for campo, sels in SELETORES_DIRETOS.items():
-        out[campo] = await extrair_primeiro_texto(page, sels)
+        out[campo] = await extrair_primeiro_texto(page, sels, campo=campo)
     return out
 
-async def extrair_detalhe(context, link: str, sem: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
-    async with sem:
-        page = await context.new_page()
-        try:
-            for tentativa in range(1, RETRIES + 1):
-                try:
+def montar_registro(link: str, titulo: str, preco_raw: str, loc_raw: str,
+                    tecnicos: Dict[str, str], cidade: str = "", uf: str = "") -> Dict[str, Any]:
+    if not (cidade or uf):
+        cidade, uf = split_cidade_uf(loc_raw)
+    return {
+        "Link": link,
+        "Título": titulo,
+        "Preço_raw": preco_raw,
+        "Preço": formatar_preco(preco_raw),
+        "Localização": loc_raw,
+        "Cidade": cidade,
+        "UF": uf,
+        **tecnicos,
+    }
+
+def registro_de_campos_http(link: str, campos: Dict[str, str]) -> Dict[str, Any]:
+    tecnicos = {k: campos.get(k) or "Não informado" for k in SELETORES_DIRETOS}
+    loc_raw = campos.get("Localização") or " - ".join(v for v in (campos.get("Cidade"), campos.get("UF")) if v)
+    return montar_registro(
+        link,
+        campos.get("Título") or "Não informado",
+        campos.get("Preço_raw") or "Não informado",
+        loc_raw or "Não informado",
+        tecnicos,
+        cidade=campos.get("Cidade", ""),
+        uf=campos.get("UF", ""),
+    )
+
+async def extrair_detalhe(pool: PoolPaginas, link: str, sem: Optional[asyncio.Semaphore] = None,
+                          controlador: Optional[ControladorAIMD] = None) -> Optional[Dict[str, Any]]:
+    async with sem or contextlib.nullcontext(), pool.pagina() as page:
+        for tentativa in range(1, RETRIES + 1):
+            t0, status, medido = monotonic(), None, False
+            try:
+                with perfil.etapa("detalhe.goto"):
                     resp = await page.goto(link, timeout=TIMEOUT, wait_until="domcontentloaded")
-                    if not resp or resp.status >= 400:
-                        raise RuntimeError(f"HTTP {resp.status if resp else 'N/A'}")
+                status = resp.status if resp else None
+                if not resp or resp.status >= 400:
+                    raise RuntimeError(f"HTTP {resp.status if resp else 'N/A'}")
 
-                    # garante o detalhe e tenta rolar até o painel técnico
+                # garante o detalhe e tenta rolar até o painel técnico
+                with perfil.etapa("detalhe.espera_seletor"):
                     await page.wait_for_selector(DETAIL_SELECTOR, timeout=TIMEOUT)
+                if controlador:
+                    controlador.registrar(monotonic() - t0, status)
+                medido = True
+                with perfil.etapa("detalhe.rolagem"):
                     await page.evaluate("window.scrollBy(0, 800)")
                     await asyncio.sleep(0.2)
 
-                    # Cabeçalho
-                    titulo = await extrair_primeiro_texto(page, SELECTORES_CABECALHO["Título"])
-                    preco_raw = await extrair_primeiro_texto(page, SELECTORES_CABECALHO["Preço"])
-                    loc_raw   = await extrair_primeiro_texto(page, SELECTORES_CABECALHO["Localização"])
-                    cidade, uf = split_cidade_uf(loc_raw)
+                # Cabeçalho
+                with perfil.etapa("detalhe.cabecalho"):
+                    titulo = await extrair_primeiro_texto(page, SELECTORES_CABECALHO["Título"], campo="Título")
+                    preco_raw = await extrair_primeiro_texto(page, SELECTORES_CABECALHO["Preço"], campo="Preço")
+                    loc_raw   = await extrair_primeiro_texto(page, SELECTORES_CABECALHO["Localização"], campo="Localização")
 
-                    # Técnicos: tenta 1) diretos; se falhar algo, 2) por rótulo
+                # Técnicos: tenta 1) diretos; se falhar algo, 2) por rótulo
+                with perfil.etapa("detalhe.seletores_diretos"):
                     tecnicos = await extrair_por_seletores(page)
-                    faltando = [k for k, v in tecnicos.items() if not v or v == "Não informado"]
-                    if faltando:
+                faltando = [k for k, v in tecnicos.items() if not v or v == "Não informado"]
+                if faltando:
+                    with perfil.etapa("detalhe.grid_rotulo"):
                         tecnicos2 = await extrair_grid_por_rotulo(page)
-                        for k in tecnicos:
-                            if tecnicos[k] == "Não informado" and tecnicos2.get(k) and tecnicos2[k] != "Não informado":
-                                tecnicos[k] = tecnicos2[k]
-
-                    dados = {
-                        "Link": link,
-                        "Título": titulo,
-                        "Preço_raw": preco_raw,
-                        "Preço": formatar_preco(preco_raw),
-                        "Localização": loc_raw,
-                        "Cidade": cidade,
-                        "UF": uf,
-                        **tecnicos,
-                    }
-                    return dados
-
-                except Exception as e:
-                    logger.warning(f"Tentativa {tentativa}/{RETRIES} falhou para {link}: {e}")
-                    await asyncio.sleep(0.7)
-            return None
-        finally:
-            await page.close()
-
-async def processar_links(links: List[str]) -> List[Dict[str, Any]]:
+                    for k in tecnicos:
+                        if tecnicos[k] == "Não informado" and tecnicos2.get(k) and tecnicos2[k] != "Não informado":
+                            tecnicos[k] = tecnicos2[k]
+
+                return montar_registro(link, titulo, preco_raw, loc_raw, tecnicos)
+
+            except Exception as e:
+                if controlador and not medido:
+                    controlador.registrar(monotonic() - t0, status, timeout=isinstance(e, PLTimeout))
+                logger.warning(f"Tentativa {tentativa}/{RETRIES} falhou para {link}: {e}")
+                await asyncio.sleep(0.7)
+        # página possivelmente em estado ruim: o pool recria
+        pool.marcar_erro(page)
+        return None
+
+_FIM = object()
+
+AoRegistro = Callable[[Dict[str, Any]], None]
+
+async def _worker_detalhe(pool: PoolPaginas, controlador: ControladorAIMD,
+                          fila_links: asyncio.Queue, fila_resultados: asyncio.Queue):
+    while True:
+        # só processa quando o controlador libera uma vaga (limite adaptativo)
+        async with controlador.vaga():
+            try:
+                link = fila_links.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                res = await extrair_detalhe(pool, link, controlador=controlador)
+            except Exception as e:
+                logger.error(f"Erro em tarefa ({link}): {e}")
+                res = None
+        await fila_resultados.put(res)
+
+async def _gravar_resultados(fila_resultados: asyncio.Queue, fila_links: asyncio.Queue,
+                             checkpoint: CheckpointStore, total: int, controlador: ControladorAIMD,
+                             impressoes: Optional[Dict[str, str]] = None,
+                             ao_registro: Optional[AoRegistro] = None):
     inicio = time()
-    coletados: List[Dict[str, Any]] = []
-    ja = set()
+    feitos = falhas = 0
+    with tqdm(total=total, desc="Detalhes") as barra:
+        while True:
+            res = await fila_resultados.get()
+            if res is _FIM:
+                break
+            feitos += 1
+            if res:
+                with perfil.etapa("checkpoint.adicionar"):
+                    checkpoint.adicionar(res["Link"], _carimbar(res, impressoes))
+                if ao_registro:
+                    ao_registro(res)
+            else:
+                falhas += 1
+            decorrido = max(time() - inicio, 1e-9)
+            barra.update(1)
+            barra.set_postfix(taxa=f"{feitos / decorrido:.2f}/s", fila=fila_links.qsize(),
+                              conc=controlador.limite, falhas=falhas, refresh=False)
+    logger.info(f"Navegador: {feitos} links em {time() - inicio:.1f}s ({falhas} falhas).")
 
-    if os.path.exists(ARQUIVO_CHECKPOINT):
-        try:
-            prev = pd.read_pickle(ARQUIVO_CHECKPOINT)
-            if isinstance(prev, pd.DataFrame):
-                prev = prev.to_dict("records")
-            coletados.extend(prev or [])
-            ja = {d.get("Link") for d in coletados if d.get("Link")}
-            links = [lk for lk in links if lk not in ja]
-            logger.info(f"Checkpoint: {len(coletados)} prontos, {len(links)} restantes.")
-        except Exception as e:
-            logger.error(f"Erro ao carregar checkpoint: {e}")
+async def processar_links(links: List[str], modo: str = MODO_DETALHE, namespace: str = NAMESPACE_CHECKPOINT,
+                          arquivo_checkpoint: str = ARQUIVO_CHECKPOINT,
+                          concorrencia: int = MAX_CONCURRENT,
+                          impressoes: Optional[Dict[str, str]] = None, navegador=None,
+                          limite: int = MAX_CONCURRENT_LIMITE,
+                          ao_registro: Optional[AoRegistro] = None) -> List[Dict[str, Any]]:
+    """Coleta os detalhes de `links` e devolve os registros do checkpoint desses links.
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=HEADLESS)
-        context = await browser.new_context()
-        sem = asyncio.Semaphore(MAX_CONCURRENT)
-
-        for i in range(0, len(links), MAX_CONCURRENT):
-            lote = links[i:i+MAX_CONCURRENT]
-            tarefas = [extrair_detalhe(context, lk, sem) for lk in lote]
-            for coro in tqdm(asyncio.as_completed(tarefas), total=len(tarefas), desc=f"Lote {i//MAX_CONCURRENT+1}"):
-                try:
-                    res = await coro
-                    if res:
-                        coletados.append(res)
-                        if len(coletados) % 200 == 0:
-                            pd.DataFrame(coletados).to_pickle(ARQUIVO_CHECKPOINT)
-                            logger.info(f"{len(coletados)} regs salvos no checkpoint.")
-                except Exception as e:
-                    logger.error(f"Erro em tarefa: {e}")
-            await asyncio.sleep(0.25)
+    `navegador` (compartilhado, ex.: o do orquestrador) evita lançar um Chromium
+    próprio; `limite` é o teto de páginas abertas que o AIMD pode alcançar e
+    `ao_registro` recebe cada registro novo assim que ele chega.
+    """
+    inicio = time()
+    pedidos = list(links)
+    # cada registro vai para o checkpoint assim que chega (commit em lotes)
+    with CheckpointStore(namespace, arquivo_checkpoint) as checkpoint:
+        ja = checkpoint.chaves()
+        if ja and impressoes:
+            # registro do checkpoint cujo card mudou desde a coleta é refeito
+            ja = {r["Link"] for r in checkpoint.registros()
+                  if r.get(incremental.COLUNA_IMPRESSAO, "") == impressoes.get(r["Link"], "")}
+        if ja:
+            links = [lk for lk in links if lk not in ja]
+            logger.info(f"Checkpoint [{namespace}]: {len(ja)} prontos, {len(links)} restantes.")
 
-        await context.close()
-        await browser.close()
+        await _coletar(links, modo, checkpoint, min(concorrencia, limite), impressoes, navegador, limite,
+                       ao_registro)
+        coletados = da_listagem(checkpoint.registros(), pedidos, impressoes)
 
     logger.info(f"Finalizado em {time()-inicio:.1f}s com {len(coletados)} registros.")
     return coletados
 
-async def salvar(dados: List[Dict[str, Any]]):
+# ----------------------------- shards (multi-processo) -----------------------------
+
+def shard_do_link(link: str, total: int) -> int:
+    # hash estável: o mesmo link cai sempre no mesmo shard, mesmo se a planilha mudar de ordem
+    return zlib.crc32(link.encode("utf-8")) % total
+
+def checkpoint_do_shard(indice: int) -> tuple:
+    """(namespace, arquivo) do checkpoint de um shard; um arquivo por shard evita disputa pelo lock do SQLite."""
+    raiz, ext = os.path.splitext(ARQUIVO_CHECKPOINT)
+    return f"{NAMESPACE_CHECKPOINT}.shard{indice}", f"{raiz}.shard{indice}{ext}"
+
+def _executar_shard(indice: int, total: int, links: List[str], modo: str,
+                    impressoes: Optional[Dict[str, str]] = None) -> int:
+    namespace, arquivo = checkpoint_do_shard(indice)
+    meus = [lk for lk in links if shard_do_link(lk, total) == indice]
+    if impressoes is not None:
+        impressoes = {lk: impressoes.get(lk, "") for lk in meus}
+    logger.info(f"Shard {indice}/{total}: {len(meus)} links (pid {os.getpid()}).")
+    # o orçamento inicial de páginas é dividido; cada AIMD ajusta o seu a partir daí
+    concorrencia = max(MIN_CONCURRENT, MAX_CONCURRENT // total)
+    dados = asyncio.run(processar_links(meus, modo, namespace, arquivo, concorrencia, impressoes))
+    perfil.salvar_relatorio(f"trucadao.shard{indice}")
+    return len(dados)
+
+def juntar_shards(total: int) -> List[Dict[str, Any]]:
+    """Junta os checkpoints dos shards num resultado só, sem duplicados por Link."""
+    por_link: Dict[str, Dict[str, Any]] = {}
+    for i in range(total):
+        namespace, arquivo = checkpoint_do_shard(i)
+        if not os.path.exists(arquivo):
+            logger.warning(f"Shard {i}: checkpoint {arquivo} não encontrado.")
+            continue
+        with CheckpointStore(namespace, arquivo) as checkpoint:
+            for reg in checkpoint.registros():
+                por_link[reg["Link"]] = reg
+    return list(por_link.values())
+
+def processar_links_em_shards(links: List[str], total: int, modo: str = MODO_DETALHE,
+                              apenas: Optional[int] = None,
+                              impressoes: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """Distribui os links em `total` processos e junta o resultado.
+
+    Com `apenas`, roda só aquele shard (ex.: retomar um shard que caiu) e
+    devolve só os registros dele.
+    """
+    inicio = time()
+    indices = [apenas] if apenas is not None else list(range(total))
+    # spawn: o Playwright não se dá bem com fork de um processo que já tem threads
+    with ProcessPoolExecutor(max_workers=len(indices), mp_context=mp.get_context("spawn")) as executor:
+        futuros = {i: executor.submit(_executar_shard, i, total, links, modo, impressoes) for i in indices}
+        for i, futuro in futuros.items():
+            try:
+                logger.info(f"Shard {i}: {futuro.result()} registros no checkpoint.")
+            except Exception as e:
+                logger.error(f"Shard {i} falhou (rode de novo com --shard {i}): {e}")
+
+    if apenas is not None:
+        namespace, arquivo = checkpoint_do_shard(apenas)
+        with CheckpointStore(namespace, arquivo) as checkpoint:
+            return da_listagem(checkpoint.registros(), links, impressoes)
+
+    dados = da_listagem(juntar_shards(total), links, impressoes)
+    logger.info(f"Shards: {len(dados)} registros únicos em {time() - inicio:.1f}s.")
+    return dados
+
+def da_listagem(registros: Iterable[Dict[str, Any]], links: Iterable[str],
+                impressoes: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """Só os registros de `links` e, com `impressoes`, coletados a partir do card atual.
+
+    O checkpoint guarda também links de runs anteriores que saíram da
+    listagem (ou cujo card mudou); esses não voltam para a base.
+    """
+    validos = set(links)
+    return [r for r in registros if r.get("Link") in validos
+            and (impressoes is None or r.get(incremental.COLUNA_IMPRESSAO, "") == impressoes.get(r["Link"], ""))]
+
+def limpar_checkpoints(shards: int = 1, arquivo: Optional[str] = None):
+    """Apaga o checkpoint de detalhes (e o de cada shard) depois que o run foi salvo na base."""
+    if shards > 1:
+        alvos = [checkpoint_do_shard(i) for i in range(shards)]
+    else:
+        alvos = [(NAMESPACE_CHECKPOINT, arquivo or ARQUIVO_CHECKPOINT)]
+    for namespace, caminho in alvos:
+        if os.path.exists(caminho):
+            with CheckpointStore(namespace, caminho) as checkpoint:
+                checkpoint.limpar()
+
+def _carimbar(registro: Dict[str, Any], impressoes: Optional[Dict[str, str]]) -> Dict[str, Any]:
+    # guarda com o detalhe a impressão do card que o originou (base do próximo run incremental)
+    if impressoes is not None:
+        registro[incremental.COLUNA_IMPRESSAO] = impressoes.get(registro["Link"], "")
+    return registro
+
+async def _coletar(links: List[str], modo: str, checkpoint: CheckpointStore, concorrencia: int = MAX_CONCURRENT,
+                   impressoes: Optional[Dict[str, str]] = None, navegador=None,
+                   limite: int = MAX_CONCURRENT_LIMITE, ao_registro: Optional[AoRegistro] = None):
+    if modo == "http" and links:
+        if not detalhe_http.DISPONIVEL:
+            logger.warning("httpx/selectolax não instalados; usando só o navegador.")
+        else:
+            extraidos, links = await detalhe_http.extrair_detalhes_http(
+                links,
+                CAMPOS_OBRIGATORIOS_HTTP,
+                concorrencia=MAX_CONCURRENT_HTTP,
+                timeout=TIMEOUT / 1000,
+                seletores_cabecalho=SELECTORES_CABECALHO,
+                seletores_diretos=SELETORES_DIRETOS,
+                grid_css=GRID_ITEMS_CSS,
+                rotulos=ROTULOS_MAP,
+            )
+            for link, campos in extraidos.items():
+                registro = _carimbar(registro_de_campos_http(link, campos), impressoes)
+                checkpoint.adicionar(link, registro)
+                if ao_registro:
+                    ao_registro(registro)
+            logger.info(f"Modo HTTP: {len(extraidos)} via HTTP, {len(links)} seguem para o navegador.")
+
+    if not links:
+        return
+
+    async with abrir_navegador(navegador, HEADLESS) as browser:
+        context = await browser.new_context()
+        cache = cache_rede.do_ambiente()
+        if cache:
+            # antes da política: as rotas registradas depois rodam antes do cache
+            await cache.aplicar(context)
+        politica = PoliticaRede(hosts_permitidos=HOSTS_PERMITIDOS)
+        await politica.aplicar(context)
+        controlador = ControladorAIMD(concorrencia, minimo=min(MIN_CONCURRENT, limite), maximo=limite,
+                                      latencia_alvo_p95=LATENCIA_ALVO_P95)
+        # o pool cresce sob demanda até o limite máximo do controlador
+        pool = PoolPaginas(context, tamanho=limite, max_usos=MAX_USOS_PAGINA)
+        await pool.iniciar(controlador.limite)
+
+        # fila contínua: N workers de vida longa, sem barreira entre lotes
+        fila_links: asyncio.Queue = asyncio.Queue()
+        for lk in links:
+            fila_links.put_nowait(lk)
+        # fila de resultados limitada: se o checkpoint atrasar, os workers esperam
+        fila_resultados: asyncio.Queue = asyncio.Queue(maxsize=limite * 2)
+
+        gravador = asyncio.create_task(
+            _gravar_resultados(fila_resultados, fila_links, checkpoint, len(links), controlador, impressoes,
+                               ao_registro)
+        )
+        await asyncio.gather(*(
+            _worker_detalhe(pool, controlador, fila_links, fila_resultados)
+            for _ in range(limite)
+        ))
+        await fila_resultados.put(_FIM)
+        await gravador
+
+        RANKING.salvar()
+        await pool.fechar()
+        logger.info(f"Concorrência final: {controlador.limite} ({controlador.mudancas} ajustes).")
+        await context.close()
+        logger.info(politica.resumo())
+
+async def salvar(dados: List[Dict[str, Any]], exportar_excel: bool = EXPORTAR_EXCEL) -> bool:
+    """Grava na base (e exporta); True se os registros chegaram à base."""
     if not dados:
         logger.warning("Nenhum dado para salvar.")
-        return
+        return False
     df = pd.DataFrame(dados)
     try:
         df.to_pickle(ARQUIVO_PKL_DADOS)
@@ -273,22 +533,62 @@ async def salvar(dados: List[Dict[str, Any]]):
     except Exception as e:
         logger.error(f"Erro ao salvar PKL: {e}")
     try:
-        if os.path.exists(ARQUIVO_EXCEL_DADOS):
-            df_exist = await asyncio.to_thread(pd.read_excel, ARQUIVO_EXCEL_DADOS, engine="openpyxl")
-            df_final = pd.concat([df_exist, df], ignore_index=True)
-        else:
-            df_final = df
-        await asyncio.to_thread(df_final.to_excel, ARQUIVO_EXCEL_DADOS, index=False, engine="openpyxl")
-        logger.info(f"Excel salvo: {ARQUIVO_EXCEL_DADOS}")
+        # base colunar é a fonte da verdade: upsert por Link na partição do dia
+        await asyncio.to_thread(base_colunar.upsert, df, FONTE_BASE)
     except Exception as e:
-        logger.error(f"Erro ao salvar Excel: {e}")
+        logger.error(f"Erro ao gravar na base: {e}")
+        return False
+    if exportar_excel:
+        try:
+            await asyncio.to_thread(base_colunar.exportar_excel, ARQUIVO_EXCEL_DADOS, FONTE_BASE)
+        except Exception as e:
+            logger.error(f"Erro ao salvar Excel: {e}")
+    return True
 
-async def main():
-    links = await carregar_links(ARQUIVO_EXCEL_LINKS)
-    if not links:
+async def main(modo: str = MODO_DETALHE, exportar_excel: bool = EXPORTAR_EXCEL,
+               shards: int = SHARDS, shard: Optional[int] = None, so_alterados: bool = INCREMENTAL):
+    listagem = await carregar_listagem(ARQUIVO_EXCEL_LINKS)
+    if not listagem:
         return
-    dados = await processar_links(links)
-    await salvar(dados)
+    links, mantidos = list(listagem), []
+    if so_alterados:
+        # inalterados desde o último run saem da base; só o resto vai para o navegador
+        links, mantidos = await asyncio.to_thread(incremental.separar_alterados, listagem, FONTE_BASE)
+
+    if shards > 1:
+        dados = await asyncio.to_thread(processar_links_em_shards, links, shards, modo, shard, listagem)
+        if shard is not None:
+            # um shard isolado só atualiza o próprio checkpoint; o merge sai no run completo
+            logger.info(f"Shard {shard} concluído com {len(dados)} registros.")
+            return
+    else:
+        dados = await processar_links(links, modo=modo, impressoes=listagem)
+
+    # registro coletado agora prevalece sobre a versão mantida da base
+    coletados = {r["Link"] for r in dados}
+    dados = dados + [r for r in mantidos if r["Link"] not in coletados]
+    if await salvar(dados, exportar_excel=exportar_excel):
+        # run salvo na base: o próximo começa do zero, sem reaproveitar registros velhos do checkpoint
+        await asyncio.to_thread(limpar_checkpoints, shards)
+    perfil.salvar_relatorio("trucadao")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Scraping das páginas de detalhe do Trucadão.")
+    parser.add_argument("--modo", choices=("browser", "http"), default=MODO_DETALHE,
+                        help="http: busca via HTTP e usa o navegador só como fallback")
+    parser.add_argument("--sem-excel", action="store_true", help="não exporta o trucadao.xlsx")
+    parser.add_argument("--shards", type=int, default=SHARDS,
+                        help="divide os links entre N processos (um navegador por processo)")
+    parser.add_argument("--shard", type=int, help="roda só este shard (0..N-1), para retomar um shard")
+    parser.add_argument("--completo", action="store_true",
+                        help="ignora o modo incremental e visita todos os detalhes")
+    parser.add_argument("--sem-perfil", action="store_true", help="desliga a medição de tempo por etapa")
+    args = parser.parse_args()
+    if args.sem_perfil:
+        os.environ["PERFIL"] = "0"  # herdado pelos processos dos shards
+        perfil.ativar(False)
+    if args.shard is not None and not 0 <= args.shard < args.shards:
+        parser.error("--shard deve estar entre 0 e --shards - 1")
+    asyncio.run(main(modo=args.modo, exportar_excel=not args.sem_excel, shards=args.shards, shard=args.shard,
+                     so_alterados=not args.completo))
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""Base colunar (Parquet) dos scrapers, particionada por fonte e data do run.
+
+    base/fonte=trucadao/data=2025-08-26/dados.parquet
+
+- `upsert` grava os registros de um run na partição do dia, substituindo os
+  que já existirem com a mesma chave (o link do anúncio). Só a partição do
+  dia é lida/reescrita, nunca a base inteira.
+- `ler` devolve a visão atual (a versão mais recente de cada chave) lendo só
+  as colunas pedidas.
+- O Excel deixa de ser a fonte da verdade: `exportar_excel` gera a planilha
+  sob demanda a partir da base.
+
+    python base_colunar.py exportar --fonte trucadao --saida trucadao.xlsx
+"""
+import logging
+import os
+from datetime import date
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+RAIZ_BASE = "base"
+ARQUIVO_PARTICAO = "dados.parquet"
+CHAVE_PADRAO = "Link"
+
+def _caminho_particao(raiz: Union[str, Path], fonte: str, data: str) -> Path:
+    return Path(raiz) / f"fonte={fonte}" / f"data={data}" / ARQUIVO_PARTICAO
+
+def _preparar(df: pd.DataFrame) -> pd.DataFrame:
+    # colunas de texto misto (str/None/números vindos de JSON) viram string
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].map(lambda v: None if v is None or (isinstance(v, float) and pd.isna(v)) else str(v))
+            df[col] = df[col].astype("string")
+    return df
+
+def upsert(registros: Union[pd.DataFrame, Iterable[dict]], fonte: str, data: Optional[str] = None,
+           chave: str = CHAVE_PADRAO, raiz: Union[str, Path] = RAIZ_BASE) -> int:
+    """Grava os registros na partição (fonte, data); a mesma chave é sobrescrita.
+
+    Retorna quantas linhas a partição passou a ter.
+    """
+    df = registros if isinstance(registros, pd.DataFrame) else pd.DataFrame(list(registros))
+    if df.empty:
+        return 0
+    if chave not in df.columns:
+        raise KeyError(f"Coluna-chave '{chave}' ausente nos registros de {fonte}.")
+
+    data = data or date.today().isoformat()
+    destino = _caminho_particao(raiz, fonte, data)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+
+    df = _preparar(df[df[chave].notna() & (df[chave].astype(str).str.strip() != "")])
+    if destino.exists():
+        df = pd.concat([pd.read_parquet(destino), df], ignore_index=True)
+    df = df.drop_duplicates(subset=[chave], keep="last").reset_index(drop=True)
+
+    # escrita atômica: um crash no meio não corrompe a partição
+    tmp = destino.with_suffix(".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, destino)
+    logger.info(f"Base [{fonte}/{data}]: {len(df)} registros.")
+    return len(df)
+
+def _arquivos(raiz: Union[str, Path], fonte: Optional[str], desde: Optional[str]) -> List[Path]:
+    padrao = f"fonte={fonte}" if fonte else "fonte=*"
+    arquivos = sorted(Path(raiz).glob(f"{padrao}/data=*/{ARQUIVO_PARTICAO}"))
+    if desde:
+        arquivos = [a for a in arquivos if a.parent.name.split("=", 1)[1] >= desde]
+    return arquivos
+
+def ler(fonte: Optional[str] = None, colunas: Optional[List[str]] = None, chave: str = CHAVE_PADRAO,
+        raiz: Union[str, Path] = RAIZ_BASE, desde: Optional[str] = None,
+        historico: bool = False) -> pd.DataFrame:
+    """Lê a base (uma fonte ou todas) só com as `colunas` pedidas.
+
+    Por padrão devolve a versão mais recente de cada chave; com `historico=True`
+    devolve todas as versões. As colunas `fonte` e `data` vêm das partições e
+    só são incluídas se `colunas` não for informado (ou se forem pedidas).
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    arquivos = _arquivos(raiz, fonte, desde)
+    if not arquivos:
+        return pd.DataFrame(columns=colunas or [])
+
+    # partições de runs diferentes podem ter colunas diferentes
+    schema_particoes = pa.schema([("fonte", pa.string()), ("data", pa.string())])
+    schema = pa.unify_schemas([pq.read_schema(a) for a in arquivos] + [schema_particoes])
+    particoes = ds.partitioning(schema_particoes, flavor="hive")
+    dataset = ds.dataset([str(a) for a in arquivos], schema=schema, format="parquet",
+                         partitioning=particoes, partition_base_dir=str(raiz))
+
+    existentes = set(dataset.schema.names)
+    pedidas = list(dict.fromkeys((colunas or [n for n in dataset.schema.names if n not in ("fonte", "data")])))
+    leitura = [c for c in dict.fromkeys(pedidas + [chave, "fonte", "data"]) if c in existentes]
+    df = dataset.to_table(columns=leitura).to_pandas()
+
+    if not historico and chave in df.columns:
+        df = (df.sort_values("data", kind="stable")
+                .drop_duplicates(subset=["fonte", chave], keep="last")
+                .reset_index(drop=True))
+
+    if colunas is not None:
+        df = df[[c for c in pedidas if c in df.columns]]
+    return df
+
+def exportar_excel(saida: str, fonte: Optional[str] = None, colunas: Optional[List[str]] = None,
+                   raiz: Union[str, Path] = RAIZ_BASE) -> int:
+    """Gera a planilha a partir da base (visão atual, sem duplicados por chave)."""
+    df = ler(fonte, colunas=colunas, raiz=raiz)
+    df.to_excel(saida, index=False, engine="openpyxl")
+    logger.info(f"Excel exportado: {saida} ({len(df)} linhas)")
+    return len(df)
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Base colunar dos scrapers.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    exp = sub.add_parser("exportar", help="exporta a visão atual para Excel")
+    exp.add_argument("--fonte")
+    exp.add_argument("--saida", required=True)
+    exp.add_argument("--colunas", nargs="*")
+    exp.add_argument("--raiz", default=RAIZ_BASE)
+    args = parser.parse_args()
+
+    if args.comando == "exportar":
+        exportar_excel(args.saida, fonte=args.fonte, colunas=args.colunas, raiz=args.raiz)
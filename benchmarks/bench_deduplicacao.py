@@ -0,0 +1,103 @@
+"""Tempo da deduplicação por blocos (deduplicacao.py) numa base sintética.
+
+Gera caminhões "reais" e anuncia parte deles em mais de uma fonte, com o
+modelo escrito de outro jeito e o km um pouco diferente; mede o agrupamento
+completo, a inserção incremental de um run e a qualidade (precisão/recall
+dos pares ligados):
+
+    python benchmarks/bench_deduplicacao.py --linhas 300000
+"""
+import argparse
+import random
+import sys
+from itertools import combinations
+from pathlib import Path
+from time import perf_counter
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import deduplicacao  # noqa: E402
+
+MARCAS = {
+    "Scania": ["R450", "R440", "G420", "P360", "R500", "S500"],
+    "Volvo": ["FH 540", "FH 460", "FM 370", "VM 270", "FH 500"],
+    "Mercedes-Benz": ["Actros 2651", "Actros 2546", "Axor 2544", "Atego 2430", "Accelo 1016"],
+    "Volkswagen": ["Constellation 24.280", "Constellation 25.420", "Meteor 28.460", "Delivery 11.180"],
+    "DAF": ["XF 530", "XF 480", "CF 410"],
+    "Iveco": ["Stralis 480", "Tector 240E30", "S-Way 540"],
+}
+VERSOES = ["6x2", "6x4", "4x2", "Highline", "Globetrotter", "Streamline", "Teto Alto", ""]
+UFS = ["SP", "PR", "SC", "RS", "MG", "GO", "MT", "MS", "BA", "PE"]
+FONTES = ["trucadao", "querotruck", "grupovamos"]
+
+def _escrita(rnd: random.Random, marca: str, modelo: str, versao: str) -> str:
+    # cada site escreve o modelo do seu jeito
+    modelo = modelo.replace(" ", "") if rnd.random() < 0.3 else modelo
+    texto = f"{modelo} {versao}".strip()
+    return f"{marca} {texto}" if rnd.random() < 0.3 else texto
+
+def _base(linhas: int, fracao_repetidos: float, semente: int = 42) -> pd.DataFrame:
+    rnd = random.Random(semente)
+    registros, verdade = [], []
+    caminhao = 0
+    while len(registros) < linhas:
+        marca = rnd.choice(list(MARCAS))
+        modelo, versao = rnd.choice(MARCAS[marca]), rnd.choice(VERSOES)
+        ano, uf, km = rnd.randint(2010, 2024), rnd.choice(UFS), rnd.randint(0, 1_200_000)
+        fontes = rnd.sample(FONTES, rnd.randint(2, 3)) if rnd.random() < fracao_repetidos else [rnd.choice(FONTES)]
+        for fonte in fontes:
+            registros.append({
+                "fonte": fonte,
+                "Marca": marca if fonte != "querotruck" else "Não informado",
+                "Modelo": _escrita(rnd, marca, modelo, versao),
+                "Ano": f"{ano - 1}/{ano}",
+                "Quilometragem": f"{km + rnd.randint(0, 3000):,} km".replace(",", "."),
+                "Localização": f"Cidade {rnd.randint(1, 50)} - {uf}",
+            })
+            verdade.append(caminhao)
+        caminhao += 1
+    df = pd.DataFrame(registros[:linhas])
+    df["_caminhao"] = verdade[:linhas]
+    return df
+
+def _pares(grupos: pd.Series) -> set:
+    pares = set()
+    for membros in grupos.groupby(grupos).groups.values():
+        if len(membros) > 1:
+            pares.update(combinations(sorted(membros), 2))
+    return pares
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=300_000)
+    parser.add_argument("--repetidos", type=float, default=0.3, help="fração de caminhões em mais de uma fonte")
+    parser.add_argument("--incremental", type=float, default=0.1, help="fração da base que chega como run novo")
+    args = parser.parse_args()
+
+    print(f"Gerando {args.linhas} linhas...")
+    df = _base(args.linhas, args.repetidos)
+
+    inicio = perf_counter()
+    agrupado = deduplicacao.agrupar(df)
+    seg = perf_counter() - inicio
+    print(f"agrupar: {seg:.2f}s ({len(df) / seg / 1e3:.0f} mil linhas/s), "
+          f"{agrupado['Cluster'].nunique()} clusters")
+
+    corte = int(len(df) * (1 - args.incremental))
+    indice = deduplicacao.IndiceDuplicados()
+    indice.adicionar(df.iloc[:corte])
+    inicio = perf_counter()
+    indice.adicionar(df.iloc[corte:])
+    seg = perf_counter() - inicio
+    print(f"incremental: {len(df) - corte} linhas novas em {seg:.2f}s")
+
+    previstos = _pares(agrupado["Cluster"])
+    reais = _pares(df["_caminhao"])
+    acertos = len(previstos & reais)
+    print(f"pares ligados: {len(previstos)}  precisão {acertos / max(len(previstos), 1):.3f}  "
+          f"recall {acertos / max(len(reais), 1):.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compara o motor HTTP com o Playwright nas páginas de detalhe do Trucadão.
+
+Roda contra o servidor local de fixtures, sem tocar no site:
+
+    python benchmarks/bench_detalhe_http.py --links 500
+    python benchmarks/bench_detalhe_http.py --links 200 --navegador
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import Scraping_Truncadao as st  # noqa: E402
+import detalhe_http  # noqa: E402
+from servidor_fixtures import ServidorFixtures  # noqa: E402
+
+# preço esperado por fixture: HTML renderizado e JSON embutido com preço numérico (489900.5)
+PRECO_ESPERADO = {"scania-r450": "R$ 489.900,00", "volvo-fh540-json": "R$ 489.900,50"}
+
+def _links(srv: ServidorFixtures, n: int):
+    slugs = list(PRECO_ESPERADO)
+    return [srv.url(f"/venda/caminhoes-usados/{slugs[i % len(slugs)]}/{i}") for i in range(1, n + 1)]
+
+def _precos_errados(registros) -> int:
+    return sum(1 for r in registros if r["Preço"] != PRECO_ESPERADO[r["Link"].rsplit("/", 2)[-2]])
+
+async def _http(links):
+    inicio = perf_counter()
+    extraidos, pendentes = await detalhe_http.extrair_detalhes_http(
+        links,
+        st.CAMPOS_OBRIGATORIOS_HTTP,
+        concorrencia=st.MAX_CONCURRENT_HTTP,
+        seletores_cabecalho=st.SELECTORES_CABECALHO,
+        seletores_diretos=st.SELETORES_DIRETOS,
+        grid_css=st.GRID_ITEMS_CSS,
+        rotulos=st.ROTULOS_MAP,
+    )
+    registros = [st.registro_de_campos_http(lk, c) for lk, c in extraidos.items()]
+    return registros, pendentes, perf_counter() - inicio
+
+async def _navegador(links):
+    from playwright.async_api import async_playwright
+
+    inicio = perf_counter()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        pool = st.PoolPaginas(context, tamanho=st.MAX_CONCURRENT, max_usos=st.MAX_USOS_PAGINA)
+        await pool.iniciar()
+        sem = asyncio.Semaphore(st.MAX_CONCURRENT)
+        registros = await asyncio.gather(*(st.extrair_detalhe(pool, lk, sem) for lk in links))
+        await pool.fechar()
+        await browser.close()
+    return [r for r in registros if r], perf_counter() - inicio
+
+def _relatorio(nome, registros, segundos, total):
+    print(f"{nome:>10}: {len(registros)}/{total} registros em {segundos:.2f}s "
+          f"({total / segundos:.1f} páginas/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=300)
+    parser.add_argument("--navegador", action="store_true", help="mede também o caminho Playwright")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if not detalhe_http.DISPONIVEL:
+        sys.exit("httpx/selectolax não instalados.")
+
+    with ServidorFixtures() as srv:
+        links = _links(srv, args.links)
+        registros, pendentes, seg = asyncio.run(_http(links))
+        _relatorio("http", registros, seg, len(links))
+        if pendentes:
+            print(f"{len(pendentes)} links iriam para o navegador.")
+        errados = _precos_errados(registros)
+        if errados:
+            print(f"{errados} registros com preço diferente do da fixture.")
+        if registros:
+            print("exemplo:", registros[0])
+        if args.navegador:
+            registros_nav, seg_nav = asyncio.run(_navegador(links))
+            _relatorio("navegador", registros_nav, seg_nav, len(links))
+            print(f"speedup: {seg_nav / seg:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Vazão da normalização vetorizada (normalizacao.py) contra o caminho linha a linha.
+
+Gera uma base sintética no formato dos scrapers e mede cada função:
+
+    python benchmarks/bench_normalizacao.py --linhas 1000000
+    python benchmarks/bench_normalizacao.py --linhas 1000000 --unicos 0.9   # quase tudo distinto
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import normalizacao  # noqa: E402
+
+CIDADES = ["Curitiba - PR", "Campinas - SP", "Sorocaba/SP", "Belo Horizonte – MG", "Goiânia - GO",
+           "Cuiabá - MT", "Não informado", "Chapecó - SC", "Recife"]
+
+def _base(linhas: int, fracao_unicos: float, semente: int = 42) -> pd.DataFrame:
+    rnd = random.Random(semente)
+    distintos = max(1, int(linhas * fracao_unicos))
+
+    def preco(i):
+        v = 150_000 + (i * 7919) % 900_000
+        return "Não informado" if i % 97 == 0 else f"R$ {v:,}".replace(",", ".") + (",00" if i % 2 else "")
+
+    def quilometragem(i):
+        return f"{(i * 104729) % 1_200_000:,} km".replace(",", ".")
+
+    def ano(i):
+        a = 2008 + i % 17
+        return f"{a}/{a + 1}" if i % 3 else (f"{a % 100:02d}/{(a + 1) % 100:02d}" if i % 2 else str(a))
+
+    ids = [rnd.randrange(distintos) for _ in range(linhas)]
+    return pd.DataFrame({
+        "Preço": [preco(i) for i in ids],
+        "Quilometragem": [quilometragem(i) for i in ids],
+        "Ano": [ano(i) for i in ids],
+        "Localização": [CIDADES[i % len(CIDADES)] for i in ids],
+    })
+
+def _linha_a_linha(df: pd.DataFrame) -> pd.DataFrame:
+    # como hoje: formatar/limpar por célula com apply (referência, não é usado pelos scrapers)
+    def preco(txt):
+        try:
+            return int(round(float(txt.replace("R$", "").replace(".", "").replace(",", ".").strip()) * 100))
+        except ValueError:
+            return pd.NA
+
+    def km(txt):
+        digitos = "".join(c for c in txt if c.isdigit())
+        return int(digitos) if digitos else pd.NA
+
+    return pd.DataFrame({
+        "preco": df["Preço"].apply(preco),
+        "km": df["Quilometragem"].apply(km),
+        "ano": df["Ano"].apply(lambda a: int(a.split("/")[0])),
+        "uf": df["Localização"].apply(lambda t: t.split("-")[-1].strip() if "-" in t else pd.NA),
+    })
+
+def _medir(nome: str, func, linhas: int):
+    inicio = perf_counter()
+    func()
+    seg = perf_counter() - inicio
+    print(f"{nome:>16}: {seg:7.2f}s  {linhas / seg / 1e6:6.2f} M linhas/s")
+    return seg
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--unicos", type=float, default=0.3, help="fração de linhas distintas")
+    parser.add_argument("--sem-referencia", action="store_true", help="não mede o caminho linha a linha")
+    args = parser.parse_args()
+
+    print(f"Gerando {args.linhas} linhas ({args.unicos:.0%} distintas)...")
+    df = _base(args.linhas, args.unicos)
+
+    _medir("preco_centavos", lambda: normalizacao.preco_centavos(df["Preço"]), args.linhas)
+    _medir("km", lambda: normalizacao.km(df["Quilometragem"]), args.linhas)
+    _medir("anos", lambda: normalizacao.anos(df["Ano"]), args.linhas)
+    _medir("cidade_uf", lambda: normalizacao.cidade_uf(df["Localização"]), args.linhas)
+    vetorizado = _medir("normalizar", lambda: normalizacao.normalizar(df), args.linhas)
+    if not args.sem_referencia:
+        referencia = _medir("linha a linha", lambda: _linha_a_linha(df), args.linhas)
+        print(f"speedup: {referencia / vetorizado:.1f}x")
+
+if __name__ == "__main__":
+    main()
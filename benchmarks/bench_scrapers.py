@@ -0,0 +1,266 @@
+"""Benchmark offline de todos os scrapers contra as fixtures gravadas.
+
+Cada scraper roda de verdade (navegador, política de rede, checkpoint),
+apontado para o servidor local de fixtures em vez do site:
+
+    python benchmarks/bench_scrapers.py                    # compara com o baseline
+    python benchmarks/bench_scrapers.py --so querotruck grupovamos
+    python benchmarks/bench_scrapers.py --salvar-baseline  # grava as medidas atuais
+
+Mede páginas/s (páginas HTML servidas), registros/s, pico de RSS do processo
+Python e pico de memória dos processos do navegador (psutil, opcional). Sai
+com código 1 se alguma medida piorar além da tolerância em relação ao baseline,
+ou se não houver baseline (do arquivo ou do scraper) para comparar.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    import psutil
+except ImportError:  # dependência opcional: sem ela, só o ru_maxrss do processo
+    psutil = None
+
+from servidor_fixtures import ServidorFixtures  # noqa: E402
+
+ARQUIVO_BASELINE = Path(__file__).resolve().parent / "baseline_scrapers.json"
+TOLERANCIA = 0.25
+INTERVALO_AMOSTRA = 0.2  # segundos entre leituras de memória
+
+# medida -> True se maior é melhor
+MEDIDAS = {
+    "paginas_s": True,
+    "registros_s": True,
+    "pico_rss_mb": False,
+    "pico_navegador_mb": False,
+}
+
+class MedidorMemoria:
+    """Amostra numa thread o RSS do processo e a soma dos filhos (o navegador)."""
+
+    def __init__(self, intervalo: float = INTERVALO_AMOSTRA):
+        self.intervalo = intervalo
+        self.pico_rss = 0
+        self.pico_navegador = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+
+    def _ler(self):
+        processo = psutil.Process()
+        self.pico_rss = max(self.pico_rss, processo.memory_info().rss)
+        filhos = 0
+        for filho in processo.children(recursive=True):
+            try:
+                filhos += filho.memory_info().rss
+            except psutil.Error:  # processo do navegador terminou entre a listagem e a leitura
+                continue
+        self.pico_navegador = max(self.pico_navegador, filhos)
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            self._ler()
+
+    def __enter__(self):
+        if psutil:
+            self._ler()
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if psutil:
+            self._parar.set()
+            self._thread.join()
+            self._ler()
+        else:
+            # ru_maxrss é o pico do processo inteiro (em KB no Linux), não só deste scraper
+            self.pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# ----------------------------- um runner por scraper -----------------------------
+# cada runner recebe (servidor, args, pasta temporária) e devolve os registros
+
+def _urls_listagem(srv: ServidorFixtures, secao: str, paginas: int) -> List[str]:
+    return [srv.url(f"/venda/{secao}?page={i}") for i in range(1, paginas + 1)]
+
+def _links_truncadao(srv, args, tmp: Path) -> List[Dict]:
+    import Links_Truncadao as lt
+
+    lt.PAGE_URLS = _urls_listagem(srv, "caminhoes-usados", args.paginas)
+    lt.BASE_URL = srv.base
+    lt.ARQUIVO_CHECKPOINT = str(tmp / "links.sqlite")
+    return asyncio.run(lt.processar_todas_as_paginas())
+
+def _implementos_truncadao(srv, args, tmp: Path) -> List[Dict]:
+    import Implementos_Tuncadao as it
+
+    it.PAGE_URLS = _urls_listagem(srv, "implementos", args.paginas)
+    it.ARQUIVO_CHECKPOINT = str(tmp / "implementos.sqlite")
+    return asyncio.run(it.processar_todas_as_paginas())
+
+def _scraping_truncadao(srv, args, tmp: Path) -> List[Dict]:
+    import Scraping_Truncadao as st
+    from ranking_seletores import RankingSeletores
+
+    st.RANKING = RankingSeletores(None)  # não mistura o ranking do benchmark com o dos runs reais
+    links = [srv.url(f"/venda/caminhoes-usados/scania-r450/{i}") for i in range(1, args.links + 1)]
+    return asyncio.run(st.processar_links(links, modo="browser", arquivo_checkpoint=str(tmp / "detalhes.sqlite")))
+
+def _querotruck(srv, args, tmp: Path) -> List[Dict]:
+    import QueroTruck as qt
+
+    qt.HEADLESS = True
+    return qt.coletar_querotruck(srv.url("/anuncios/pesquisa-veiculos?pageSize=40&pageIndex=1"))
+
+def _querotruck_indices(srv, args, tmp: Path) -> List[Dict]:
+    import QueroTruck as qt
+
+    url = srv.url("/anuncios/pesquisa-veiculos?pageSize=40&pageIndex=1")
+    return asyncio.run(qt.coletar_querotruck_async(url, headless=True))
+
+def _grupovamos(srv, args, tmp: Path) -> List[Dict]:
+    import QueroTruck_GrupoVamos as qgv
+
+    return qgv.coletar_dados(
+        srv.url("/seminovos/cavalo-mecanico"),
+        qgv.xpath_seminovos,
+        qgv.seletor_proxima_pagina_seminovos,
+        func_extracao=qgv.extracaoDadosGrupoVamos,
+        site="grupovamos",
+    )
+
+def _grupovamos_indices(srv, args, tmp: Path) -> List[Dict]:
+    import QueroTruck_GrupoVamos as qgv
+
+    return asyncio.run(qgv.coletar_dados_async(srv.url("/seminovos/cavalo-mecanico"), qgv.xpath_seminovos))
+
+def _orquestrador(srv, args, tmp: Path) -> List[Dict]:
+    # todas as fontes num event loop só; o tempo deve ficar perto do da fonte mais lenta
+    import base_colunar
+    import Implementos_Tuncadao as it
+    import Links_Truncadao as lt
+    import orquestrador
+    import QueroTruck as qt
+    import QueroTruck_GrupoVamos as qgv
+    import Scraping_Truncadao as st
+    from ranking_seletores import RankingSeletores
+
+    lt.PAGE_URLS = _urls_listagem(srv, "caminhoes-usados", args.paginas)
+    lt.BASE_URL = srv.base
+    lt.ARQUIVO_CHECKPOINT = str(tmp / "checkpoints.links.sqlite")
+    it.ARQUIVO_CHECKPOINT = str(tmp / "checkpoints.implementos.sqlite")
+    st.ARQUIVO_CHECKPOINT = str(tmp / "checkpoints.sqlite")
+    lt.ARQUIVO_PKL_DADOS, lt.ARQUIVO_EXCEL_DADOS = str(tmp / "links.pkl"), str(tmp / "links.xlsx")
+    st.RANKING = RankingSeletores(None)
+    it.PAGE_URLS = _urls_listagem(srv, "implementos", args.paginas)
+    qt.URL_QUEROTRUCK = srv.url("/anuncios/pesquisa-veiculos?pageSize=40&pageIndex=1")
+    qgv.url_seminovos = srv.url("/seminovos/cavalo-mecanico")
+
+    raiz = tmp / "base"
+    asyncio.run(orquestrador.executar(raiz=raiz))
+    return [r for fonte, chave in orquestrador.CHAVES.items()
+            for r in base_colunar.ler(fonte, chave=chave, raiz=raiz).to_dict("records")]
+
+RUNNERS: Dict[str, Callable] = {
+    "links_trucadao": _links_truncadao,
+    "implementos_trucadao": _implementos_truncadao,
+    "scraping_trucadao": _scraping_truncadao,
+    "querotruck": _querotruck,
+    "querotruck_indices": _querotruck_indices,
+    "grupovamos": _grupovamos,
+    "grupovamos_indices": _grupovamos_indices,
+    "orquestrador": _orquestrador,
+}
+
+def medir(nome: str, srv: ServidorFixtures, args) -> Dict[str, Optional[float]]:
+    servidas_antes = srv.paginas_servidas()
+    with tempfile.TemporaryDirectory(prefix=f"bench_{nome}_") as tmp, MedidorMemoria() as memoria:
+        inicio = perf_counter()
+        registros = RUNNERS[nome](srv, args, Path(tmp))
+        segundos = max(perf_counter() - inicio, 1e-9)
+    paginas = srv.paginas_servidas() - servidas_antes
+    return {
+        "segundos": round(segundos, 2),
+        "paginas": paginas,
+        "registros": len(registros or []),
+        "paginas_s": round(paginas / segundos, 2),
+        "registros_s": round(len(registros or []) / segundos, 2),
+        "pico_rss_mb": round(memoria.pico_rss / 1e6, 1),
+        "pico_navegador_mb": round(memoria.pico_navegador / 1e6, 1) if psutil else None,
+    }
+
+def regressoes(atual: Dict[str, Dict], baseline: Dict[str, Dict], tolerancia: float) -> List[str]:
+    """Medidas que pioraram mais que `tolerancia` (fração) em relação ao baseline."""
+    saida = []
+    for nome, medidas in atual.items():
+        base = baseline.get(nome)
+        if not base:
+            saida.append(f"{nome}: sem baseline; rode com --salvar-baseline para criar.")
+            continue
+        if medidas["registros"] < base.get("registros", 0):
+            saida.append(f"{nome}: {medidas['registros']} registros (baseline {base['registros']})")
+        for medida, maior_melhor in MEDIDAS.items():
+            valor, ref = medidas.get(medida), base.get(medida)
+            if valor is None or not ref:
+                continue
+            piorou = valor < ref * (1 - tolerancia) if maior_melhor else valor > ref * (1 + tolerancia)
+            if piorou:
+                saida.append(f"{nome}: {medida} {valor} (baseline {ref}, tolerância {tolerancia:.0%})")
+    return saida
+
+def _imprimir(resultados: Dict[str, Dict]):
+    print(f"{'scraper':>22} {'seg':>8} {'págs':>6} {'regs':>6} {'págs/s':>8} {'regs/s':>8} "
+          f"{'RSS MB':>8} {'naveg. MB':>10}")
+    for nome, r in resultados.items():
+        navegador = "-" if r["pico_navegador_mb"] is None else f"{r['pico_navegador_mb']:.1f}"
+        print(f"{nome:>22} {r['segundos']:>8.2f} {r['paginas']:>6} {r['registros']:>6} {r['paginas_s']:>8.2f} "
+              f"{r['registros_s']:>8.2f} {r['pico_rss_mb']:>8.1f} {navegador:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--so", nargs="*", choices=list(RUNNERS), help="roda só estes scrapers")
+    parser.add_argument("--paginas", type=int, default=5, help="páginas de listagem do Trucadão")
+    parser.add_argument("--links", type=int, default=100, help="páginas de detalhe do Trucadão")
+    parser.add_argument("--baseline", type=Path, default=ARQUIVO_BASELINE)
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA,
+                        help="piora máxima aceita em relação ao baseline (fração)")
+    parser.add_argument("--salvar-baseline", action="store_true", help="grava as medidas atuais como baseline")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    if not args.salvar_baseline and not args.baseline.exists():
+        # sem baseline o portão de regressão não tem com o que comparar: falha em vez de passar
+        sys.exit(f"Sem baseline em {args.baseline}; rode com --salvar-baseline para criar.")
+    if not psutil:
+        print("psutil não instalado: sem memória do navegador; RSS é o pico do processo inteiro.")
+
+    resultados: Dict[str, Dict] = {}
+    with ServidorFixtures() as srv:
+        for nome in args.so or RUNNERS:
+            print(f"== {nome}")
+            resultados[nome] = medir(nome, srv, args)
+    _imprimir(resultados)
+
+    if args.salvar_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+        baseline.update(resultados)
+        args.baseline.write_text(json.dumps(baseline, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Baseline gravado em {args.baseline}")
+        return
+
+    problemas = regressoes(resultados, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerancia)
+    for p in problemas:
+        print("REGRESSÃO:", p)
+    if problemas:
+        sys.exit(1)
+    print("Sem regressões em relação ao baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Servidor HTTP local que serve as fixtures gravadas para os benchmarks.
+
+Cada rota é um (regex do caminho, arquivo da fixture); o trecho "{{ID}}" do
+arquivo é trocado pelo primeiro grupo capturado, para que cada URL gere uma
+página diferente. Caminhos sem rota respondem 404; /static/* responde um
+corpo vazio do tipo certo (para a política de rede ter o que bloquear).
+`paginas_servidas()` conta as páginas HTML entregues (base do páginas/s).
+"""
+import re
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Tuple
+
+PASTA_FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+ROTAS_PADRAO: List[Tuple[str, str]] = [
+    (r"^/venda/caminhoes-usados/[^/]+-json/(\d+)$", "trucadao_detalhe_json.html"),  # dados só no __NEXT_DATA__
+    (r"^/venda/(?:caminhoes-usados|implementos)/[^/]+/(\d+)$", "trucadao_detalhe.html"),
+    (r"^/venda/(?:caminhoes-usados|implementos)$", "trucadao_listagem.html"),
+    (r"^/anuncios/pesquisa-veiculos$", "querotruck_listagem.html"),
+    (r"^/seminovos/cavalo-mecanico$", "vamos_listagem.html"),
+]
+
+TIPOS_ESTATICOS = {".css": "text/css", ".js": "application/javascript", ".jpg": "image/jpeg"}
+
+class _Handler(BaseHTTPRequestHandler):
+    rotas: List[Tuple[re.Pattern, str]] = []
+    cache = {}
+    servidas: Counter = Counter()
+    trava = threading.Lock()
+
+    def log_message(self, *args):  # silencioso
+        pass
+
+    def _responder(self, status: int, corpo: bytes, tipo: str):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        caminho = self.path.split("?", 1)[0]
+        if caminho.startswith("/static/"):
+            tipo = TIPOS_ESTATICOS.get(Path(caminho).suffix, "application/octet-stream")
+            return self._responder(200, b"", tipo)
+        for padrao, arquivo in self.rotas:
+            m = padrao.match(caminho)
+            if not m:
+                continue
+            if arquivo not in self.cache:
+                self.cache[arquivo] = (PASTA_FIXTURES / arquivo).read_text(encoding="utf-8")
+            html = self.cache[arquivo].replace("{{ID}}", m.group(1) if m.groups() else "")
+            with self.trava:
+                self.servidas[arquivo] += 1
+            return self._responder(200, html.encode("utf-8"), "text/html; charset=utf-8")
+        self._responder(404, b"not found", "text/plain")
+
+class ServidorFixtures:
+    """Sobe o servidor numa thread: `with ServidorFixtures() as srv: srv.url("/x")`."""
+
+    def __init__(self, rotas: List[Tuple[str, str]] = ROTAS_PADRAO, porta: int = 0):
+        handler = type("Handler", (_Handler,), {
+            "rotas": [(re.compile(p), arq) for p, arq in rotas],
+            "cache": {},
+            "servidas": Counter(),
+            "trava": threading.Lock(),
+        })
+        self._handler = handler
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), handler)
+        self._servidor.daemon_threads = True
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    @property
+    def base(self) -> str:
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def url(self, caminho: str) -> str:
+        return self.base + caminho
+
+    def paginas_servidas(self, arquivo: str = None) -> int:
+        """Páginas HTML entregues (de uma fixture ou de todas) desde que o servidor subiu."""
+        with self._handler.trava:
+            return self._handler.servidas[arquivo] if arquivo else sum(self._handler.servidas.values())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
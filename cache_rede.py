@@ -0,0 +1,405 @@
+"""Cache de respostas HTTP em disco para gravar e reproduzir runs (context.route).
+
+Ao mexer num seletor, o run de novo não precisa buscar tudo no site outra
+vez: com o cache gravando, cada resposta que passa pelo navegador (HTML,
+scripts, JSON das APIs) vai para o disco; reproduzindo, as páginas saem
+inteiras do disco, sem rede, e a extração roda de novo sobre milhares de
+páginas em minutos.
+
+    CACHE_REDE=gravar python Scraping_Truncadao.py       # usa o que está fresco, grava o resto
+    CACHE_REDE=reproduzir python Links_Truncadao.py      # só disco; o que não está no cache é abortado
+    python cache_rede.py                                 # tamanho e entradas do cache
+    python cache_rede.py --expirados                     # remove o que passou do TTL
+
+Cada requisição é identificada pelo método + URL normalizada (host em
+minúsculas, sem fragmento, query ordenada e sem parâmetros de rastreio) +
+hash do corpo do POST. O índice fica em SQLite e os corpos, comprimidos, em
+arquivos nomeados pelo sha256 do conteúdo: o mesmo script servido em mil
+páginas ocupa o disco uma vez. Passando de `limite_bytes`, as entradas
+acessadas há mais tempo saem primeiro.
+
+    cache = CacheRede("cache_rede", modo="gravar")
+    await cache.aplicar(context)      # antes da PoliticaRede: o que ela bloqueia nem chega aqui
+    cache.aplicar_sync(context)       # playwright.sync_api
+
+Os scrapers ligam o cache pela variável CACHE_REDE (herdada pelos processos
+dos shards); sem ela, nada muda.
+"""
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from time import time
+from typing import Dict, NamedTuple, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+try:
+    import zstandard
+except ImportError:  # dependência opcional: sem ela, gzip
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MODO_GRAVAR = "gravar"          # entrada fresca sai do disco; o resto vai à rede e é gravado
+MODO_REPRODUZIR = "reproduzir"  # só disco, ignorando o TTL; falta no cache é abortada
+MODOS = (MODO_GRAVAR, MODO_REPRODUZIR)
+
+PASTA_PADRAO = "cache_rede"
+TTL_PADRAO = 24 * 3600               # segundos até uma página precisar ser buscada de novo
+TTL_ESTATICOS = 7 * 24 * 3600        # scripts e CSS mudam bem menos que o HTML e o JSON
+TIPOS_ESTATICOS = ("script", "stylesheet")
+LIMITE_BYTES_PADRAO = 2 * 1024 ** 3  # tamanho máximo dos corpos comprimidos em disco
+METODOS_CACHEAVEIS = ("GET", "POST")
+NIVEL_ZSTD = 6
+
+# parâmetros que não mudam o conteúdo da resposta
+PARAMETROS_IGNORADOS = ("gclid", "fbclid", "msclkid", "_")
+PREFIXOS_IGNORADOS = ("utm_",)
+PORTAS_PADRAO = {"http": 80, "https": 443}
+# a resposta de route.fetch() já vem descomprimida e inteira
+CABECALHOS_DESCARTADOS = ("content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive")
+
+class Resposta(NamedTuple):
+    status: int
+    cabecalhos: Dict[str, str]
+    corpo: bytes
+
+def normalizar_url(url: str) -> str:
+    """URL canônica para a chave do cache: a mesma página escrita de outro jeito cai na mesma entrada."""
+    partes = urlsplit(url)
+    esquema = partes.scheme.lower()
+    host = (partes.hostname or "").lower()
+    if partes.port and partes.port != PORTAS_PADRAO.get(esquema):
+        host = f"{host}:{partes.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True)
+        if k not in PARAMETROS_IGNORADOS and not k.lower().startswith(PREFIXOS_IGNORADOS)
+    )
+    return urlunsplit((esquema, host, partes.path or "/", urlencode(query), ""))
+
+def chave_requisicao(url: str, metodo: str = "GET", corpo: Optional[Union[str, bytes]] = None) -> str:
+    h = hashlib.sha1(f"{metodo.upper()} {normalizar_url(url)}".encode("utf-8"))
+    if corpo:
+        h.update(b"\0" + (corpo.encode("utf-8") if isinstance(corpo, str) else corpo))
+    return h.hexdigest()
+
+def _comprimir(dados: bytes) -> tuple:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(dados), "zst"
+    return gzip.compress(dados, compresslevel=6), "gz"
+
+def _descomprimir(dados: bytes, codec: str) -> bytes:
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("objeto em zstd no cache, mas o pacote zstandard não está instalado")
+        return zstandard.ZstdDecompressor().decompress(dados)
+    return gzip.decompress(dados)
+
+class CacheRede:
+    """Índice SQLite (modo WAL) + corpos comprimidos por conteúdo, com TTL e despejo por tamanho.
+
+    - `modo`: MODO_GRAVAR ou MODO_REPRODUZIR.
+    - `ttl` / `ttl_estaticos`: idade máxima (s) de uma entrada no modo gravar.
+    - `limite_bytes`: passando disso, as entradas menos acessadas são removidas.
+    Pode ser dividido entre contextos e entre processos (shards).
+    """
+
+    def __init__(self, pasta: Union[str, Path] = PASTA_PADRAO, modo: str = MODO_GRAVAR,
+                 ttl: float = TTL_PADRAO, ttl_estaticos: float = TTL_ESTATICOS,
+                 limite_bytes: int = LIMITE_BYTES_PADRAO):
+        if modo not in MODOS:
+            raise ValueError(f"modo de cache inválido: {modo!r} (use {' ou '.join(MODOS)})")
+        self.pasta = Path(pasta)
+        self.modo = modo
+        self.ttl = ttl
+        self.ttl_estaticos = ttl_estaticos
+        self.limite_bytes = limite_bytes
+        (self.pasta / "objetos").mkdir(parents=True, exist_ok=True)
+
+        self._trava = threading.Lock()
+        self._con = sqlite3.connect(self.pasta / "indice.sqlite", timeout=30, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute(
+            """CREATE TABLE IF NOT EXISTS entradas (
+                   chave       TEXT PRIMARY KEY,
+                   url         TEXT NOT NULL,
+                   tipo        TEXT NOT NULL,
+                   status      INTEGER NOT NULL,
+                   cabecalhos  TEXT NOT NULL,
+                   objeto      TEXT NOT NULL,
+                   gravado_em  REAL NOT NULL,
+                   acessado_em REAL NOT NULL
+               ) WITHOUT ROWID"""
+        )
+        self._con.execute(
+            """CREATE TABLE IF NOT EXISTS objetos (
+                   hash    TEXT PRIMARY KEY,
+                   codec   TEXT NOT NULL,
+                   tamanho INTEGER NOT NULL
+               ) WITHOUT ROWID"""
+        )
+        self._con.execute("CREATE INDEX IF NOT EXISTS idx_entradas_acesso ON entradas (acessado_em)")
+        self._con.execute("CREATE INDEX IF NOT EXISTS idx_entradas_objeto ON entradas (objeto)")
+        self._con.commit()
+        self._bytes = self._tamanho_total()
+
+        self.acertos = 0
+        self.faltas = 0
+        self.gravadas = 0
+        self.removidas = 0
+        self.bytes_servidos = 0
+
+    # ----------------------------- armazenamento -----------------------------
+
+    def _tamanho_total(self) -> int:
+        return self._con.execute("SELECT COALESCE(SUM(tamanho), 0) FROM objetos").fetchone()[0]
+
+    def _arquivo(self, hash_: str, codec: str) -> Path:
+        return self.pasta / "objetos" / hash_[:2] / f"{hash_}.{codec}"
+
+    def obter(self, url: str, metodo: str = "GET", corpo: Optional[Union[str, bytes]] = None,
+              tipo: str = "") -> Optional[Resposta]:
+        """Resposta guardada para a requisição, ou None (ausente ou, no modo gravar, vencida)."""
+        chave = chave_requisicao(url, metodo, corpo)
+        with self._trava:
+            linha = self._con.execute(
+                "SELECT e.status, e.cabecalhos, e.objeto, e.gravado_em, o.codec FROM entradas e "
+                "JOIN objetos o ON o.hash = e.objeto WHERE e.chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                return None
+            status, cabecalhos, objeto, gravado_em, codec = linha
+            ttl = self.ttl_estaticos if tipo in TIPOS_ESTATICOS else self.ttl
+            if self.modo == MODO_GRAVAR and time() - gravado_em > ttl:
+                return None
+            try:
+                dados = _descomprimir(self._arquivo(objeto, codec).read_bytes(), codec)
+            except (OSError, ValueError) as e:
+                # arquivo sumiu ou corrompeu: a entrada não vale mais
+                logger.debug(f"Cache: objeto ilegível para {url}: {e}")
+                self._con.execute("DELETE FROM entradas WHERE chave = ?", (chave,))
+                self._con.commit()
+                return None
+            self._con.execute("UPDATE entradas SET acessado_em = ? WHERE chave = ?", (time(), chave))
+            self._con.commit()
+        return Resposta(status, json.loads(cabecalhos), dados)
+
+    def guardar(self, url: str, resposta: Resposta, metodo: str = "GET",
+                corpo: Optional[Union[str, bytes]] = None, tipo: str = ""):
+        """Grava a resposta; um corpo já presente no disco (mesmo sha256) não é gravado de novo."""
+        hash_ = hashlib.sha256(resposta.corpo).hexdigest()
+        cabecalhos = {k: v for k, v in resposta.cabecalhos.items() if k.lower() not in CABECALHOS_DESCARTADOS}
+        agora = time()
+        with self._trava:
+            novo = self._con.execute("SELECT 1 FROM objetos WHERE hash = ?", (hash_,)).fetchone() is None
+            if novo:
+                dados, codec = _comprimir(resposta.corpo)
+                arquivo = self._arquivo(hash_, codec)
+                arquivo.parent.mkdir(exist_ok=True)
+                # grava num temporário e troca: outro processo nunca lê um arquivo pela metade
+                temporario = arquivo.with_suffix(f".{os.getpid()}.tmp")
+                temporario.write_bytes(dados)
+                os.replace(temporario, arquivo)
+                self._con.execute("INSERT OR IGNORE INTO objetos (hash, codec, tamanho) VALUES (?, ?, ?)",
+                                  (hash_, codec, len(dados)))
+                self._bytes += len(dados)
+            self._con.execute(
+                "INSERT OR REPLACE INTO entradas (chave, url, tipo, status, cabecalhos, objeto, gravado_em, acessado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (chave_requisicao(url, metodo, corpo), normalizar_url(url), tipo, resposta.status,
+                 json.dumps(cabecalhos, ensure_ascii=False), hash_, agora, agora),
+            )
+            self._con.commit()
+            self.gravadas += 1
+            if self._bytes > self.limite_bytes:
+                self._despejar()
+
+    def _remover_orfaos(self):
+        orfaos = self._con.execute(
+            "SELECT hash, codec FROM objetos WHERE hash NOT IN (SELECT objeto FROM entradas)"
+        ).fetchall()
+        for hash_, codec in orfaos:
+            self._arquivo(hash_, codec).unlink(missing_ok=True)
+        self._con.executemany("DELETE FROM objetos WHERE hash = ?", [(h,) for h, _ in orfaos])
+
+    def _despejar(self):
+        # desce até 90% do limite para não despejar de novo a cada gravação
+        alvo = int(self.limite_bytes * 0.9)
+        self._bytes = self._tamanho_total()
+        while self._bytes > alvo:
+            lote = self._con.execute(
+                "SELECT chave FROM entradas ORDER BY acessado_em LIMIT 500").fetchall()
+            if not lote:
+                break
+            self._con.executemany("DELETE FROM entradas WHERE chave = ?", lote)
+            self.removidas += len(lote)
+            self._remover_orfaos()
+            self._bytes = self._tamanho_total()
+        self._con.commit()
+        logger.info(f"Cache: despejo até {self._bytes / 1e6:.0f} MB ({self.removidas} entradas removidas no run).")
+
+    def remover_expirados(self) -> int:
+        """Apaga as entradas além do TTL (scripts e CSS pelo TTL_ESTATICOS) e os corpos que ficaram sem uso."""
+        agora = time()
+        estaticos = ", ".join("?" * len(TIPOS_ESTATICOS))
+        with self._trava:
+            cursor = self._con.execute(
+                f"DELETE FROM entradas WHERE gravado_em < CASE WHEN tipo IN ({estaticos}) THEN ? ELSE ? END",
+                (*TIPOS_ESTATICOS, agora - self.ttl_estaticos, agora - self.ttl))
+            removidas = cursor.rowcount
+            self._remover_orfaos()
+            self._con.commit()
+            self._bytes = self._tamanho_total()
+        return removidas
+
+    # ----------------------------- rotas do Playwright -----------------------------
+
+    def _cacheavel(self, req) -> bool:
+        return req.method in METODOS_CACHEAVEIS and req.url.startswith(("http://", "https://"))
+
+    def _servida(self, resposta: Resposta):
+        self.acertos += 1
+        self.bytes_servidos += len(resposta.corpo)
+
+    async def _rota(self, route):
+        req = route.request
+        if not self._cacheavel(req):
+            await route.fallback()
+            return
+        corpo = req.post_data_buffer
+        guardada = await asyncio.to_thread(self.obter, req.url, req.method, corpo, req.resource_type)
+        if guardada is not None:
+            self._servida(guardada)
+            await route.fulfill(status=guardada.status, headers=guardada.cabecalhos, body=guardada.corpo)
+            return
+        self.faltas += 1
+        if self.modo == MODO_REPRODUZIR:
+            await route.abort("internetdisconnected")
+            return
+        try:
+            resposta = await route.fetch()
+            dados = await resposta.body()
+        except Exception as e:
+            logger.debug(f"Cache: busca falhou para {req.url}: {e}")
+            await route.fallback()
+            return
+        nova = Resposta(resposta.status, resposta.headers, dados)
+        if resposta.status < 400:
+            await asyncio.to_thread(self.guardar, req.url, nova, req.method, corpo, req.resource_type)
+        await route.fulfill(response=resposta, body=dados)
+
+    def _rota_sync(self, route):
+        req = route.request
+        if not self._cacheavel(req):
+            route.fallback()
+            return
+        corpo = req.post_data_buffer
+        guardada = self.obter(req.url, req.method, corpo, req.resource_type)
+        if guardada is not None:
+            self._servida(guardada)
+            route.fulfill(status=guardada.status, headers=guardada.cabecalhos, body=guardada.corpo)
+            return
+        self.faltas += 1
+        if self.modo == MODO_REPRODUZIR:
+            route.abort("internetdisconnected")
+            return
+        try:
+            resposta = route.fetch()
+            dados = resposta.body()
+        except Exception as e:
+            logger.debug(f"Cache: busca falhou para {req.url}: {e}")
+            route.fallback()
+            return
+        if resposta.status < 400:
+            self.guardar(req.url, Resposta(resposta.status, resposta.headers, dados), req.method, corpo,
+                         req.resource_type)
+        route.fulfill(response=resposta, body=dados)
+
+    async def aplicar(self, context):
+        """Liga o cache num BrowserContext (async_api); aplicar ANTES da PoliticaRede e da CapturaRespostas.
+
+        As rotas do Playwright rodam da última registrada para a primeira: assim
+        o bloqueio e a reescrita de URL da captura acontecem antes do cache.
+        """
+        await context.route("**/*", self._rota)
+
+    def aplicar_sync(self, context):
+        context.route("**/*", self._rota_sync)
+
+    # ----------------------------- relatório -----------------------------
+
+    def relatorio(self) -> Dict[str, object]:
+        with self._trava:
+            entradas = self._con.execute("SELECT COUNT(*) FROM entradas").fetchone()[0]
+            objetos = self._con.execute("SELECT COUNT(*) FROM objetos").fetchone()[0]
+        return {
+            "modo": self.modo,
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "gravadas": self.gravadas,
+            "removidas": self.removidas,
+            "bytes_servidos": self.bytes_servidos,
+            "entradas": entradas,
+            "objetos": objetos,
+            "bytes_em_disco": self._bytes,
+        }
+
+    def resumo(self) -> str:
+        r = self.relatorio()
+        total = r["acertos"] + r["faltas"]
+        taxa = f"{r['acertos'] / total:.0%}" if total else "-"
+        return (
+            f"Cache ({r['modo']}): {r['acertos']} do disco, {r['faltas']} fora do cache (acerto {taxa}), "
+            f"{r['gravadas']} gravadas, {r['bytes_servidos'] / 1e6:.1f} MB servidos; "
+            f"{r['entradas']} entradas / {r['objetos']} objetos, {r['bytes_em_disco'] / 1e6:.1f} MB em disco."
+        )
+
+    def fechar(self):
+        with self._trava:
+            self._con.commit()
+            self._con.close()
+
+_DO_AMBIENTE: Optional[CacheRede] = None
+
+def do_ambiente() -> Optional[CacheRede]:
+    """O cache do processo conforme CACHE_REDE (gravar/reproduzir) e CACHE_REDE_PASTA; None se desligado."""
+    global _DO_AMBIENTE
+    modo = os.environ.get("CACHE_REDE", "").strip().lower()
+    if not modo or modo in ("0", "false", "nao", "não"):
+        return None
+    if _DO_AMBIENTE is None:
+        _DO_AMBIENTE = CacheRede(os.environ.get("CACHE_REDE_PASTA", PASTA_PADRAO), modo=modo)
+        logger.info(f"Cache de rede ligado: modo {modo}, pasta {_DO_AMBIENTE.pasta}.")
+
+        def _encerrar():
+            logger.info(_DO_AMBIENTE.resumo())
+            _DO_AMBIENTE.fechar()
+        atexit.register(_encerrar)
+    return _DO_AMBIENTE
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Situação e limpeza do cache de rede dos scrapers.")
+    parser.add_argument("--pasta", default=os.environ.get("CACHE_REDE_PASTA", PASTA_PADRAO))
+    parser.add_argument("--expirados", action="store_true", help="remove as entradas além do TTL")
+    parser.add_argument("--limite-mb", type=int, help="despeja as entradas menos acessadas até caber neste tamanho")
+    args = parser.parse_args()
+
+    cache = CacheRede(args.pasta)
+    if args.expirados:
+        print(f"{cache.remover_expirados()} entradas expiradas removidas.")
+    if args.limite_mb is not None:
+        cache.limite_bytes = args.limite_mb * 1024 ** 2
+        with cache._trava:
+            cache._despejar()
+    print(cache.resumo())
+    cache.fechar()
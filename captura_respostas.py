@@ -0,0 +1,202 @@
+"""Captura das respostas JSON (XHR/fetch) que alimentam as listagens.
+
+QueroTruck, Vamos e Trucadão renderizam os cards no cliente a partir de uma
+API JSON. Em vez de ler o DOM de volta, `page.on("response")` recebe esses
+payloads, acha neles a lista de anúncios e mapeia cada item para campos
+com os nomes dos nossos registros. Itens repetidos (mesmo id/link) entram
+uma vez só.
+
+    captura = CapturaRespostas(r"/api/", parametros_pagina={"pageSize": 200})
+    await captura.aplicar(context)        # depois da PoliticaRede
+    await page.goto(url)
+    await captura.concluir()              # espera os payloads em processamento
+    for campos in captura.retirar(page):  # {"Marca": ..., "Preço": ..., ...}
+        ...
+
+Quem chama monta o registro do site a partir dos campos e, se nada foi
+capturado (API mudou, resposta não reconhecida), cai para a extração do DOM.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set
+
+from crawler_listagem import url_com_parametro
+
+logger = logging.getLogger(__name__)
+
+# chave do JSON (normalizada: minúsculas, sem acento e só letras) -> campo do registro
+CHAVES_REGISTRO = {
+    "titulo": "Título", "title": "Título", "nome": "Título", "name": "Título",
+    "marca": "Marca", "brand": "Marca", "fabricante": "Marca", "montadora": "Marca",
+    "modelo": "Modelo", "model": "Modelo",
+    "versao": "Versão", "version": "Versão",
+    "preco": "Preço", "price": "Preço", "valor": "Preço", "precovenda": "Preço", "valorvenda": "Preço",
+    "km": "Quilometragem", "quilometragem": "Quilometragem", "kilometragem": "Quilometragem",
+    "odometro": "Quilometragem", "mileage": "Quilometragem",
+    "ano": "Ano", "anomodelo": "Ano", "year": "Ano", "modelyear": "Ano", "anofabricacao": "Ano",
+    "anunciante": "Anunciante", "vendedor": "Anunciante", "revenda": "Anunciante", "loja": "Anunciante",
+    "seller": "Anunciante", "dealer": "Anunciante",
+    "cidade": "Cidade", "city": "Cidade", "municipio": "Cidade",
+    "uf": "UF", "estado": "UF", "state": "UF",
+    "localizacao": "Localização", "local": "Localização", "location": "Localização",
+    "url": "Link", "link": "Link", "href": "Link", "permalink": "Link",
+    "imagem": "Imagem", "image": "Imagem", "foto": "Imagem", "thumbnail": "Imagem", "img": "Imagem",
+    "id": "_id", "codigo": "_id", "anuncioid": "_id", "idanuncio": "_id", "codigoanuncio": "_id",
+}
+
+# campos que não contam para decidir se um objeto é um anúncio
+_CAMPOS_AUXILIARES = {"_id", "Link", "Imagem"}
+
+def _chave(txt: str) -> str:
+    x = unicodedata.normalize("NFKD", str(txt))
+    x = "".join(c for c in x if not unicodedata.combining(c))
+    return re.sub(r"[^a-z]", "", x.lower())
+
+def _escalar(valor: Any) -> str:
+    if isinstance(valor, dict):
+        # ex.: {"nome": "Scania"} ou {"value": 1234}
+        for k in ("nome", "name", "descricao", "label", "sigla", "value", "valor"):
+            if k in valor and not isinstance(valor[k], (dict, list)) and valor[k] is not None:
+                return str(valor[k]).strip()
+        return ""
+    if isinstance(valor, (list, tuple)) or valor is None or isinstance(valor, bool):
+        return ""
+    return str(valor).strip()
+
+def mapear_item(item: Dict[str, Any], chaves: Dict[str, str] = CHAVES_REGISTRO) -> Dict[str, str]:
+    """Campos do registro encontrados no item (e nos objetos logo abaixo dele)."""
+    campos: Dict[str, str] = {}
+    aninhados = []
+    for k, v in item.items():
+        destino = chaves.get(_chave(k))
+        if destino and destino not in campos:
+            texto = _escalar(v)
+            if texto:
+                campos[destino] = texto
+        if isinstance(v, dict):
+            aninhados.append(v)
+    # {"localizacao": {"cidade": ..., "uf": ...}}; o "nome"/"id" de um objeto aninhado é dele, não do anúncio
+    for sub in aninhados:
+        for k, v in sub.items():
+            destino = chaves.get(_chave(k))
+            if destino and destino not in campos and destino not in ("_id", "Título"):
+                texto = _escalar(v)
+                if texto:
+                    campos[destino] = texto
+    return campos
+
+def achar_anuncios(raiz: Any, chaves: Dict[str, str] = CHAVES_REGISTRO, minimo_campos: int = 3) -> List[Dict[str, str]]:
+    """Acha no JSON a lista de objetos que mais parece uma lista de anúncios e a mapeia."""
+    melhor: List[Dict[str, str]] = []
+    pilha = [raiz]
+    while pilha:
+        atual = pilha.pop()
+        if isinstance(atual, dict):
+            pilha.extend(v for v in atual.values() if isinstance(v, (dict, list)))
+        elif isinstance(atual, list):
+            objetos = [x for x in atual if isinstance(x, dict)]
+            mapeados = [mapear_item(x, chaves) for x in objetos]
+            validos = [m for m in mapeados if len(m.keys() - _CAMPOS_AUXILIARES) >= minimo_campos]
+            if len(validos) > len(melhor):
+                melhor = validos
+            pilha.extend(objetos)
+    return melhor
+
+def formatar_brl(valor: str) -> str:
+    """Preço numérico do JSON ("489900", "489900.5") no formato dos registros ("R$ 489.900,00")."""
+    try:
+        v = float(str(valor).strip())
+    except (TypeError, ValueError):
+        return valor  # já veio formatado
+    return f"R$ {v:,.2f}".replace(".", "X").replace(",", ".").replace("X", ",")
+
+def identidade(campos: Dict[str, str]) -> str:
+    """Chave de deduplicação: id do anúncio, senão o link, senão um hash dos campos."""
+    if campos.get("_id"):
+        return f"id:{campos['_id']}"
+    if campos.get("Link"):
+        return f"link:{campos['Link']}"
+    return "hash:" + hashlib.sha1(json.dumps(campos, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+class CapturaRespostas:
+    """Escuta as respostas JSON cujo URL casa com `filtro_url` e guarda os anúncios por página.
+
+    - `parametros_pagina`: parâmetros reescritos nas requisições da API antes
+      de saírem (ex.: {"pageSize": 200}), para vir mais anúncios por ida.
+    - `minimo_campos`: campos de anúncio que um objeto precisa ter para contar.
+    """
+
+    def __init__(self, filtro_url: str, parametros_pagina: Optional[Dict[str, Any]] = None,
+                 chaves: Dict[str, str] = CHAVES_REGISTRO, minimo_campos: int = 3):
+        self.filtro = re.compile(filtro_url)
+        self.parametros_pagina = dict(parametros_pagina or {})
+        self.chaves = chaves
+        self.minimo_campos = minimo_campos
+        self._por_pagina: Dict[object, List[Dict[str, str]]] = defaultdict(list)
+        # dedup por aba e por retirada: o mesmo anúncio em outra página/execução não é descartado
+        self._vistos: Dict[object, Set[str]] = defaultdict(set)
+        self._tarefas: Set[asyncio.Task] = set()
+        self.respostas = 0
+        self.anuncios = 0
+        self.duplicados = 0
+
+    async def _reescrever(self, route):
+        url = route.request.url
+        for nome, valor in self.parametros_pagina.items():
+            url = url_com_parametro(url, nome, valor)
+        await route.fallback(url=url)
+
+    async def aplicar(self, alvo):
+        """Liga a captura num BrowserContext ou Page (async_api)."""
+        if self.parametros_pagina:
+            await alvo.route(self.filtro, self._reescrever)
+        alvo.on("response", self._ao_responder)
+
+    def _ao_responder(self, resposta):
+        if resposta.request.resource_type not in ("xhr", "fetch") or not self.filtro.search(resposta.url):
+            return
+        tarefa = asyncio.ensure_future(self._processar(resposta))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _processar(self, resposta):
+        if resposta.status >= 400 or "json" not in (resposta.headers.get("content-type") or ""):
+            return
+        try:
+            corpo = await resposta.json()
+            pagina = resposta.frame.page
+        except Exception as e:
+            logger.debug(f"Resposta ilegível ({resposta.url}): {e}")
+            return
+        anuncios = achar_anuncios(corpo, self.chaves, self.minimo_campos)
+        if not anuncios:
+            return
+        self.respostas += 1
+        vistos = self._vistos[pagina]
+        for campos in anuncios:
+            chave = identidade(campos)
+            if chave in vistos:
+                self.duplicados += 1
+                continue
+            vistos.add(chave)
+            self.anuncios += 1
+            self._por_pagina[pagina].append(campos)
+
+    async def concluir(self):
+        """Espera os payloads que ainda estão sendo lidos."""
+        while self._tarefas:
+            await asyncio.gather(*list(self._tarefas), return_exceptions=True)
+
+    def retirar(self, pagina) -> List[Dict[str, str]]:
+        """Anúncios capturados na aba desde a última retirada (a aba é reaproveitada entre índices)."""
+        self._vistos.pop(pagina, None)
+        return self._por_pagina.pop(pagina, [])
+
+    def resumo(self) -> str:
+        return (f"Captura: {self.anuncios} anúncios de {self.respostas} respostas JSON "
+                f"({self.duplicados} duplicados descartados).")
@@ -0,0 +1,122 @@
+"""Checkpoint append-only em SQLite (modo WAL) para os scrapers.
+
+Cada registro é gravado assim que chega (INSERT OR REPLACE por chave) e o
+commit — que é onde acontece o fsync — é feito em lotes, por quantidade ou
+por tempo. Retomar um run é uma consulta indexada pela chave (o `Link`),
+sem carregar/regravar a lista inteira.
+
+Cada scraper usa o seu próprio namespace e o seu próprio arquivo: entre um
+lote e outro a conexão segura a transação de escrita aberta, e um segundo
+CheckpointStore no mesmo arquivo (ex.: outra fonte rodando no orquestrador)
+ficaria bloqueado até estourar o timeout com "database is locked".
+
+    with CheckpointStore("detalhes_trucadao") as ck:
+        feitos = ck.chaves()
+        ck.adicionar(link, registro)
+"""
+import json
+import logging
+import sqlite3
+from time import monotonic
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_PADRAO = "checkpoints.sqlite"
+
+class CheckpointStore:
+    def __init__(self, namespace: str, caminho: str = ARQUIVO_PADRAO,
+                 lote: int = 50, intervalo: float = 2.0):
+        self.namespace = namespace
+        self.caminho = caminho
+        self.lote = lote
+        self.intervalo = intervalo
+        self._pendentes = 0
+        self._ultimo_commit = monotonic()
+
+        self._con = sqlite3.connect(caminho, timeout=30, isolation_level="DEFERRED")
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute(
+            """CREATE TABLE IF NOT EXISTS registros (
+                   namespace TEXT NOT NULL,
+                   chave     TEXT NOT NULL,
+                   seq       INTEGER NOT NULL,
+                   dados     TEXT NOT NULL,
+                   PRIMARY KEY (namespace, chave)
+               ) WITHOUT ROWID"""
+        )
+        self._con.execute("CREATE INDEX IF NOT EXISTS idx_registros_seq ON registros (namespace, seq)")
+        self._con.commit()
+        self._seq = self._con.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM registros WHERE namespace = ?", (namespace,)
+        ).fetchone()[0]
+
+    def adicionar(self, chave: str, registro: Dict[str, Any]) -> None:
+        """Grava (ou substitui) o registro da chave; o commit sai no próximo lote."""
+        self._seq += 1
+        self._con.execute(
+            "INSERT OR REPLACE INTO registros (namespace, chave, seq, dados) VALUES (?, ?, ?, ?)",
+            (self.namespace, chave, self._seq, json.dumps(registro, ensure_ascii=False, default=str)),
+        )
+        self._pendentes += 1
+        if self._pendentes >= self.lote or monotonic() - self._ultimo_commit >= self.intervalo:
+            self.commit()
+
+    def adicionar_varios(self, itens: Iterable[tuple]) -> None:
+        for chave, registro in itens:
+            self.adicionar(chave, registro)
+
+    def commit(self) -> None:
+        if self._pendentes:
+            self._con.commit()
+            logger.debug(f"Checkpoint [{self.namespace}]: +{self._pendentes} registros.")
+        self._pendentes = 0
+        self._ultimo_commit = monotonic()
+
+    def contem(self, chave: str) -> bool:
+        return self._con.execute(
+            "SELECT 1 FROM registros WHERE namespace = ? AND chave = ?", (self.namespace, chave)
+        ).fetchone() is not None
+
+    def obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        linha = self._con.execute(
+            "SELECT dados FROM registros WHERE namespace = ? AND chave = ?", (self.namespace, chave)
+        ).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def chaves(self) -> Set[str]:
+        return {c for (c,) in self._con.execute(
+            "SELECT chave FROM registros WHERE namespace = ?", (self.namespace,)
+        )}
+
+    def registros(self) -> Iterator[Dict[str, Any]]:
+        """Todos os registros do namespace, na ordem em que foram gravados."""
+        for (dados,) in self._con.execute(
+            "SELECT dados FROM registros WHERE namespace = ? ORDER BY seq", (self.namespace,)
+        ):
+            yield json.loads(dados)
+
+    def carregar(self) -> List[Dict[str, Any]]:
+        return list(self.registros())
+
+    def __len__(self) -> int:
+        return self._con.execute(
+            "SELECT COUNT(*) FROM registros WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+    def limpar(self) -> None:
+        """Apaga o namespace (ex.: run concluído e exportado)."""
+        self._con.execute("DELETE FROM registros WHERE namespace = ?", (self.namespace,))
+        self._con.commit()
+        self._pendentes = 0
+
+    def fechar(self) -> None:
+        self.commit()
+        self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
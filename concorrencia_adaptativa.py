@@ -0,0 +1,102 @@
+"""Controle adaptativo (AIMD) do número de páginas de detalhe simultâneas.
+
+Os workers pedem uma vaga (`async with controlador.vaga()`) e, a cada
+carregamento, informam latência, status HTTP e se houve timeout. A cada
+janela de amostras o limite:
+
+- cai multiplicativamente (x `fator_reducao`) se houve 429/5xx, se a taxa de
+  timeouts passou de `taxa_timeout_max` ou se o p95 da latência passou de
+  `latencia_alvo_p95`;
+- sobe +1 quando a janela inteira foi saudável.
+
+Sempre dentro de [minimo, maximo]; toda mudança é logada.
+"""
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from time import monotonic
+from typing import Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def percentil(valores, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+class ControladorAIMD:
+    def __init__(self, inicial: int, minimo: int = 2, maximo: int = 32, janela: int = 30,
+                 latencia_alvo_p95: float = 10.0, taxa_timeout_max: float = 0.05,
+                 fator_reducao: float = 0.5, intervalo_min: float = 5.0):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.limite = max(minimo, min(inicial, maximo))
+        self.janela = janela
+        self.latencia_alvo_p95 = latencia_alvo_p95
+        self.taxa_timeout_max = taxa_timeout_max
+        self.fator_reducao = fator_reducao
+        self.intervalo_min = intervalo_min
+
+        # (latência, status, timeout)
+        self._amostras: Deque[Tuple[float, Optional[int], bool]] = deque(maxlen=janela)
+        self._ultima_mudanca = monotonic()
+        self._em_uso = 0
+        self._cond = asyncio.Condition()
+        self.mudancas = 0
+
+    @property
+    def em_uso(self) -> int:
+        return self._em_uso
+
+    async def adquirir(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._em_uso < self.limite)
+            self._em_uso += 1
+
+    async def liberar(self):
+        async with self._cond:
+            self._em_uso -= 1
+            self._cond.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def vaga(self):
+        await self.adquirir()
+        try:
+            yield
+        finally:
+            await self.liberar()
+
+    def registrar(self, latencia: float, status: Optional[int] = None, timeout: bool = False):
+        self._amostras.append((latencia, status, timeout))
+        self._avaliar()
+
+    def _mudar(self, novo: int, motivo: str):
+        novo = max(self.minimo, min(novo, self.maximo))
+        if novo != self.limite:
+            logger.info(f"Concorrência {self.limite} -> {novo} ({motivo})")
+            self.limite = novo
+            self.mudancas += 1
+        self._ultima_mudanca = monotonic()
+        self._amostras.clear()
+
+    def _avaliar(self):
+        n = len(self._amostras)
+        if n < max(5, self.janela // 3) or monotonic() - self._ultima_mudanca < self.intervalo_min:
+            return
+
+        latencias = [lat for lat, _, to in self._amostras if not to]
+        limitados = sum(1 for _, st, _ in self._amostras if st is not None and (st == 429 or st >= 500))
+        taxa_timeout = sum(1 for _, _, to in self._amostras if to) / n
+        p95 = percentil(latencias, 95)
+
+        if limitados:
+            self._mudar(int(self.limite * self.fator_reducao), f"{limitados} respostas 429/5xx")
+        elif taxa_timeout > self.taxa_timeout_max:
+            self._mudar(int(self.limite * self.fator_reducao), f"timeouts {taxa_timeout:.0%}")
+        elif p95 > self.latencia_alvo_p95:
+            self._mudar(int(self.limite * self.fator_reducao), f"p95 {p95:.1f}s > {self.latencia_alvo_p95:.1f}s")
+        elif n >= self.janela and self.limite < self.maximo:
+            self._mudar(self.limite + 1, f"janela saudável, p95 {p95:.1f}s")
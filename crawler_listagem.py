@@ -0,0 +1,242 @@
+"""Pool de páginas para percorrer listagens em paralelo.
+
+- `processar_paginas`: lista fixa de URLs; cada worker tem seu próprio
+  contexto/página e puxa a próxima URL de uma fila.
+- `processar_indices`: paginação endereçável por índice (?page=N); descobre
+  o total na primeira página, abre várias abas e para na última não vazia.
+
+Nos dois casos o resultado volta na ordem das páginas, não na ordem em que
+elas terminam.
+"""
+import asyncio
+import contextlib
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from playwright.async_api import async_playwright
+
+import cache_rede
+import perfil
+from politica_rede import PoliticaRede
+
+logger = logging.getLogger(__name__)
+
+Extrator = Callable[[object], Awaitable[List[Dict]]]
+AoConcluir = Callable[[int, List[Optional[List[Dict]]]], None]
+ContarPaginas = Callable[[object], Awaitable[Optional[int]]]
+PrepararContexto = Callable[[object], Awaitable[None]]
+AoExtrair = Callable[[int, List[Dict]], None]
+
+MAX_PAGINAS_INDICE = 500  # teto quando o site não informa o total de páginas
+TENTATIVAS_PAGINA_VAZIA = 2  # com o total conhecido, página vazia dentro dele é reaberta antes de virar falha
+
+@contextlib.asynccontextmanager
+async def abrir_navegador(navegador=None, headless: bool = True):
+    """Usa o `navegador` recebido (compartilhado: quem o abriu é quem fecha) ou lança um Chromium próprio."""
+    if navegador is not None:
+        yield navegador
+        return
+    async with async_playwright() as p:
+        proprio = await p.chromium.launch(headless=headless)
+        try:
+            yield proprio
+        finally:
+            await proprio.close()
+
+async def _configurar_contexto(contexto, politica: Optional[PoliticaRede],
+                               preparar_contexto: Optional[PrepararContexto]):
+    # o cache (CACHE_REDE) entra primeiro: as rotas registradas depois rodam antes dele
+    cache = cache_rede.do_ambiente()
+    if cache:
+        await cache.aplicar(contexto)
+    if politica:
+        await politica.aplicar(contexto)
+    if preparar_contexto:
+        await preparar_contexto(contexto)
+
+async def _worker(nome: str, navegador, fila: asyncio.Queue, extrair: Extrator,
+                  resultados: List[Optional[List[Dict]]], ao_concluir: Optional[AoConcluir],
+                  timeout_goto: int, politica: Optional[PoliticaRede],
+                  preparar_contexto: Optional[PrepararContexto] = None):
+    contexto = await navegador.new_context()
+    await _configurar_contexto(contexto, politica, preparar_contexto)
+    pagina = await contexto.new_page()
+    try:
+        while True:
+            try:
+                idx, url = fila.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            logger.info(f"[{nome}] ===== Página {idx + 1}/{len(resultados)} =====")
+            try:
+                with perfil.etapa("listagem.goto"):
+                    await pagina.goto(url, timeout=timeout_goto)
+                    await pagina.wait_for_load_state("domcontentloaded")
+                with perfil.etapa("listagem.extrair"):
+                    resultados[idx] = await extrair(pagina)
+            except Exception as e:
+                logger.error(f"[{nome}] Falha na página {idx + 1} ({url}): {e}")
+                continue
+            if ao_concluir:
+                try:
+                    ao_concluir(idx, resultados)
+                except Exception as e:
+                    logger.warning(f"Falha no callback da página {idx + 1}: {e}")
+    finally:
+        await contexto.close()
+
+async def processar_paginas(urls: List[str], extrair: Extrator, concorrencia: int = 4,
+                            headless: bool = True, ao_concluir: Optional[AoConcluir] = None,
+                            timeout_goto: int = 80000,
+                            politica: Optional[PoliticaRede] = None,
+                            preparar_contexto: Optional[PrepararContexto] = None,
+                            navegador=None) -> List[List[Dict]]:
+    """Roda `extrair(pagina)` em cada URL com até `concorrencia` páginas abertas.
+
+    Retorna uma lista por URL, na mesma ordem de `urls`. `ao_concluir(idx, resultados)`
+    é chamado após cada página concluída (as ainda não processadas ou que
+    falharam ficam como None),
+    o que permite salvar checkpoint página a página. Se `politica` for informada,
+    ela é aplicada ao contexto de cada worker; `preparar_contexto(contexto)` roda
+    em seguida (ex.: ligar a captura de respostas JSON). Com `navegador`, os
+    contextos são abertos nele (ex.: o do orquestrador) em vez de num Chromium novo.
+    """
+    resultados: List[Optional[List[Dict]]] = [None] * len(urls)
+    if not urls:
+        return []
+    fila: asyncio.Queue = asyncio.Queue()
+    for item in enumerate(urls):
+        fila.put_nowait(item)
+
+    concorrencia = max(1, min(concorrencia, len(urls) or 1))
+    async with abrir_navegador(navegador, headless) as navegador:
+        await asyncio.gather(*(
+            _worker(f"w{n}", navegador, fila, extrair, resultados, ao_concluir, timeout_goto, politica,
+                    preparar_contexto)
+            for n in range(concorrencia)
+        ))
+
+    return [r or [] for r in resultados]
+
+def concatenar_em_ordem(resultados: List[Optional[List[Dict]]]) -> List[Dict]:
+    """Junta os registros das páginas já concluídas, na ordem das URLs."""
+    return [d for pagina in resultados if pagina for d in pagina]
+
+def url_com_parametro(url: str, nome: str, valor) -> str:
+    """Troca (ou acrescenta) um parâmetro da query string, mantendo os demais."""
+    partes = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True) if k != nome]
+    query.append((nome, str(valor)))
+    return urlunsplit(partes._replace(query=urlencode(query)))
+
+def _avisar(ao_extrair: Optional[AoExtrair], idx: int, registros: List[Dict]):
+    if not ao_extrair:
+        return
+    try:
+        ao_extrair(idx, registros)
+    except Exception as e:
+        logger.warning(f"Falha no callback da página {idx}: {e}")
+
+async def _worker_indice(nome: str, contexto, estado: Dict, url_da_pagina: Callable[[int], str],
+                         extrair: Extrator, resultados: Dict[int, Optional[List[Dict]]], timeout_goto: int,
+                         ao_extrair: Optional[AoExtrair] = None):
+    pagina = await contexto.new_page()
+    try:
+        while True:
+            idx = estado["proximo"]
+            if idx > estado["ultima"]:
+                return
+            estado["proximo"] += 1
+            logger.info(f"[{nome}] ===== Página {idx} =====")
+            # dentro de um total conhecido, vazia é falha (espera dos cards estourou), não o fim
+            tentativas = TENTATIVAS_PAGINA_VAZIA if estado["total_conhecido"] else 1
+            for tentativa in range(1, tentativas + 1):
+                try:
+                    with perfil.etapa("listagem.goto"):
+                        await pagina.goto(url_da_pagina(idx), timeout=timeout_goto, wait_until="domcontentloaded")
+                    with perfil.etapa("listagem.extrair"):
+                        resultados[idx] = await extrair(pagina)
+                except Exception as e:
+                    logger.error(f"[{nome}] Falha na página {idx}: {e}")
+                    resultados[idx] = None
+                    break
+                if resultados[idx] or tentativa == tentativas:
+                    break
+                logger.warning(f"[{nome}] Página {idx} vazia dentro do total; tentando de novo.")
+            if resultados[idx]:
+                _avisar(ao_extrair, idx, resultados[idx])
+            elif resultados[idx] is not None and estado["total_conhecido"]:
+                resultados[idx] = None  # entra na lista de falhas; a paginação segue até o total
+            elif resultados[idx] is not None and idx <= estado["ultima"]:
+                # total desconhecido: página vazia, as seguintes também estão; ninguém pega índice depois desta
+                estado["ultima"] = idx - 1
+                logger.info(f"[{nome}] Página {idx} vazia; última página é a {idx - 1}.")
+    finally:
+        await pagina.close()
+
+async def processar_indices(url_da_pagina: Callable[[int], str], extrair: Extrator,
+                            contar_paginas: Optional[ContarPaginas] = None, concorrencia: int = 4,
+                            headless: bool = True, timeout_goto: int = 80000,
+                            politica: Optional[PoliticaRede] = None,
+                            max_paginas: int = MAX_PAGINAS_INDICE,
+                            preparar_contexto: Optional[PrepararContexto] = None,
+                            navegador=None, ao_extrair: Optional[AoExtrair] = None) -> List[Dict]:
+    """Percorre as páginas 1..N de uma listagem por índice, com até `concorrencia` abas.
+
+    A página 1 é aberta primeiro; `contar_paginas(pagina)` lê dela o total
+    (None se o site não informar, e então o teto é `max_paginas`). As demais
+    são distribuídas entre as abas em ordem crescente. Sem total, a primeira
+    página vazia marca o fim e nenhuma aba abre índice depois dela; com total,
+    uma página vazia dentro dele é reaberta e, se continuar vazia, conta como
+    falha, sem encurtar a paginação. Páginas que falharam são puladas com aviso. `politica` e `preparar_contexto` valem
+    como em `processar_paginas` (um contexto só, compartilhado pelas abas), assim
+    como `navegador`. `ao_extrair(idx, registros)` recebe cada página não vazia
+    assim que ela termina, em ordem de conclusão (ex.: gravar na base em fluxo).
+    Devolve os registros concatenados na ordem das páginas.
+    """
+    resultados: Dict[int, Optional[List[Dict]]] = {}
+    async with abrir_navegador(navegador, headless) as navegador:
+        contexto = await navegador.new_context()
+        try:
+            await _configurar_contexto(contexto, politica, preparar_contexto)
+            primeira = await contexto.new_page()
+            with perfil.etapa("listagem.goto"):
+                await primeira.goto(url_da_pagina(1), timeout=timeout_goto, wait_until="domcontentloaded")
+            with perfil.etapa("listagem.extrair"):
+                resultados[1] = await extrair(primeira)
+            total = None
+            if contar_paginas and resultados[1]:
+                try:
+                    total = await contar_paginas(primeira)
+                except Exception as e:
+                    logger.warning(f"Não consegui ler o total de páginas: {e}")
+            await primeira.close()
+
+            if not resultados[1]:
+                logger.warning("Página 1 sem registros; nada a paginar.")
+                return []
+            _avisar(ao_extrair, 1, resultados[1])
+            ultima = min(total or max_paginas, max_paginas)
+            logger.info(f"Paginação por índice: {f'{total} páginas' if total else 'total desconhecido'}, "
+                        f"{concorrencia} abas.")
+
+            estado = {"proximo": 2, "ultima": ultima, "total_conhecido": bool(total)}
+            abas = max(1, min(concorrencia, ultima - 1))
+            if ultima > 1:
+                await asyncio.gather(*(
+                    _worker_indice(f"aba{n}", contexto, estado, url_da_pagina, extrair, resultados, timeout_goto,
+                                   ao_extrair)
+                    for n in range(abas)
+                ))
+        finally:
+            await contexto.close()
+
+    falhas = [i for i in range(1, estado["ultima"] + 1) if resultados.get(i) is None]
+    if falhas:
+        logger.warning(f"Páginas que falharam: {falhas}")
+    # outra aba já pode ter trazido páginas depois da vazia: ficam no resultado, com aviso
+    alem = sorted(i for i, r in resultados.items() if i > estado["ultima"] and r)
+    if alem:
+        logger.warning(f"Páginas com registros depois da página vazia {estado['ultima'] + 1}: {alem}")
+    return concatenar_em_ordem([resultados[i] for i in sorted(resultados)])
@@ -0,0 +1,287 @@
+"""Resolução de entidades: o mesmo caminhão anunciado em mais de uma fonte.
+
+Em vez de comparar todos os pares (O(n²)), cada registro entra num bloco
+(Marca, Ano_modelo, UF, faixa de km) e o `Modelo` só é comparado, por
+similaridade de tokens, com os registros do mesmo bloco e das faixas de km
+vizinhas. Registros ligados formam um cluster (union-find); o id do cluster
+é a posição do registro mais antigo dele no índice.
+
+    indice = IndiceDuplicados()
+    indice.adicionar(base)                 # histórico
+    ids_novos = indice.adicionar(run_novo) # incremental: só o run novo é comparado
+    df = agrupar(base)                     # cópia com a coluna Cluster
+    deduplicar(df)                         # uma linha por cluster (estatística de preço)
+
+Por padrão só se ligam registros de fontes diferentes (coluna `fonte` da
+base colunar): anúncios iguais na mesma fonte costumam ser caminhões
+diferentes de uma mesma frota. Registro sem marca, ano, UF ou km não entra
+em bloco nenhum e fica sozinho no seu cluster.
+
+    python deduplicacao.py --saida clusters.parquet
+"""
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, FrozenSet, Hashable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+import marcas
+import normalizacao
+
+logger = logging.getLogger(__name__)
+
+COLUNA_CLUSTER = "Cluster"
+COLUNA_FONTE = "fonte"
+LIMIAR_SIMILARIDADE = 0.6  # Jaccard mínimo entre os tokens do Modelo
+FAIXA_KM = 10000            # largura da faixa de km do bloco
+TOLERANCIA_KM = 5000        # diferença máxima de km entre dois anúncios do mesmo caminhão
+NAO_INFORMADO = {"", "NAO INFORMADO", "NAN", "NONE", "<NA>"}
+
+# letras e números viram tokens separados: "R450" e "R 450" dão {"R", "450"}
+# a tração ("6X4") é um token só: partida em {6, X, 4} pesaria contra quem omite a versão
+RE_TOKENS = re.compile(r"\d+X\d+|[A-Z]+|\d+")
+
+Bloco = Tuple[str, int, str, int]
+
+def _sem_acento(txt: str) -> str:
+    x = unicodedata.normalize("NFKD", txt)
+    return "".join(c for c in x if not unicodedata.combining(c)).upper()
+
+def _marca(marca, modelo) -> str:
+    texto = str(marca).strip() if marca is not None and marca == marca else ""
+    if _sem_acento(texto) in NAO_INFORMADO:
+        # QueroTruck deixa a marca dentro do Modelo: sai do título pela trie de marcas
+        if modelo is None or modelo != modelo:
+            texto = ""
+        else:
+            texto = marcas.separar_titulo(str(modelo))[0] or ""
+    else:
+        texto = marcas.canonizar_marca(texto) or _sem_acento(texto)
+    return re.sub(r"[^A-Z0-9]", "", texto)
+
+def _tokens(modelo, marca: str) -> FrozenSet[str]:
+    if modelo is None or modelo != modelo:
+        return frozenset()
+    # a marca repetida no título (por extenso ou apelido) não conta como semelhança de modelo
+    _, nome, versao = marcas.separar_titulo(str(modelo))
+    tokens = set(RE_TOKENS.findall(" ".join(p for p in (nome, versao) if p)))
+    return frozenset(t for t in tokens if t != marca and t not in NAO_INFORMADO)
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    comum = len(a & b)
+    return comum / (len(a) + len(b) - comum)
+
+def _coluna(df: pd.DataFrame, nomes: Sequence[str]) -> Optional[str]:
+    return next((c for c in nomes if c in df.columns), None)
+
+def _preparar(df: pd.DataFrame) -> pd.DataFrame:
+    """Chaves de bloco e tokens do Modelo, calculados em colunas (valores repetidos uma vez só)."""
+    n = len(df)
+    vazio = pd.Series([None] * n, index=df.index, dtype=object)
+
+    col_km = _coluna(df, (normalizacao.COLUNA_KM, "Quilometragem", "Km"))
+    km = vazio if col_km is None else (
+        df[col_km].astype("Int64") if col_km == normalizacao.COLUNA_KM else normalizacao.km(df[col_km]))
+
+    col_ano = _coluna(df, (normalizacao.COLUNA_ANO_MODELO, "Ano"))
+    ano = vazio if col_ano is None else (
+        df[col_ano].astype("Int64") if col_ano == normalizacao.COLUNA_ANO_MODELO
+        else normalizacao.anos(df[col_ano])[normalizacao.COLUNA_ANO_MODELO])
+
+    uf = df["UF"] if "UF" in df.columns else pd.Series(pd.NA, index=df.index, dtype="string")
+    if "Localização" in df.columns:
+        # UF vazia (ou coluna ausente) sai da Localização
+        uf = uf.astype("string").str.strip().replace("", pd.NA).fillna(
+            normalizacao.cidade_uf(df["Localização"])["UF"])
+    uf = uf.astype("string").str.upper()
+
+    marcas_modelos = list(zip(df["Marca"] if "Marca" in df.columns else vazio,
+                              df["Modelo"] if "Modelo" in df.columns else vazio))
+    memo_marca: Dict[tuple, str] = {}
+    memo_tokens: Dict[tuple, FrozenSet[str]] = {}
+    marca_norm, tokens = [], []
+    for par in marcas_modelos:
+        chave = (str(par[0]), str(par[1]))
+        m = memo_marca.get(chave)
+        if m is None:
+            m = memo_marca[chave] = _marca(*par)
+            memo_tokens[chave] = _tokens(par[1], m)
+        marca_norm.append(m)
+        tokens.append(memo_tokens[chave])
+
+    fonte = df[COLUNA_FONTE].astype(str) if COLUNA_FONTE in df.columns else pd.Series("", index=df.index)
+    return pd.DataFrame({
+        "marca": marca_norm,
+        "ano": ano.astype(object).where(ano.notna(), None).to_numpy(),
+        "uf": uf.astype(object).where(uf.notna(), None).to_numpy(),
+        "km": km.astype(object).where(km.notna(), None).to_numpy(),
+        "tokens": tokens,
+        "fonte": fonte.to_numpy(),
+    }, index=df.index)
+
+class IndiceDuplicados:
+    """Índice de blocos + union-find; aceita inserções incrementais.
+
+    - `limiar`: similaridade (Jaccard dos tokens do Modelo) mínima para ligar.
+    - `faixa_km` / `tolerancia_km`: largura da faixa de km do bloco e diferença
+      máxima aceita; as faixas vizinhas também são consultadas, então dois
+      anúncios dos dois lados de uma fronteira ainda se encontram.
+    - `mesma_fonte`: se True, liga também registros da mesma fonte.
+    """
+
+    def __init__(self, limiar: float = LIMIAR_SIMILARIDADE, faixa_km: int = FAIXA_KM,
+                 tolerancia_km: int = TOLERANCIA_KM, mesma_fonte: bool = False):
+        self.limiar = limiar
+        self.faixa_km = faixa_km
+        self.tolerancia_km = tolerancia_km
+        self.mesma_fonte = mesma_fonte
+        self.comparacoes = 0
+        self._pai: List[int] = []
+        self._km: List[Optional[int]] = []
+        self._tokens: List[FrozenSet[str]] = []
+        self._fontes: Dict[int, set] = {}  # raiz -> fontes presentes no cluster
+        # bloco -> fonte -> posições (sem mesma_fonte, a própria fonte nem é percorrida)
+        self._blocos: Dict[Bloco, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+
+    def __len__(self) -> int:
+        return len(self._pai)
+
+    def _raiz(self, pos: int) -> int:
+        pai = self._pai
+        while pai[pos] != pos:
+            pai[pos] = pai[pai[pos]]  # compressão de caminho pela metade
+            pos = pai[pos]
+        return pos
+
+    def _unir(self, a: int, b: int) -> bool:
+        ra, rb = self._raiz(a), self._raiz(b)
+        if ra == rb:
+            return True
+        if not self.mesma_fonte and self._fontes[ra] & self._fontes[rb]:
+            return False
+        # a raiz é sempre a posição mais antiga: o id do cluster não muda quando ele cresce
+        if rb < ra:
+            ra, rb = rb, ra
+        self._pai[rb] = ra
+        self._fontes[ra] |= self._fontes.pop(rb)
+        return True
+
+    def _melhor_candidato(self, bloco: Bloco, km: int, tokens: FrozenSet[str], fonte: str) -> Optional[int]:
+        marca, ano, uf, faixa = bloco
+        melhor, melhor_sim = None, self.limiar
+        for f in (faixa - 1, faixa, faixa + 1):
+            por_fonte = self._blocos.get((marca, ano, uf, f))
+            if not por_fonte:
+                continue
+            for outra_fonte, posicoes in por_fonte.items():
+                if outra_fonte == fonte and not self.mesma_fonte:
+                    continue
+                for outro in posicoes:
+                    if abs(self._km[outro] - km) > self.tolerancia_km:
+                        continue
+                    self.comparacoes += 1
+                    sim = _jaccard(tokens, self._tokens[outro])
+                    if sim < melhor_sim:
+                        continue
+                    if not self.mesma_fonte and fonte in self._fontes[self._raiz(outro)]:
+                        continue  # o cluster do candidato já tem um anúncio desta fonte
+                    melhor, melhor_sim = outro, sim
+        return melhor
+
+    def _inserir(self, prep: pd.DataFrame, comparar: bool) -> List[int]:
+        posicoes = []
+        # listas Python: iterar uma Series (ainda mais as do Arrow) custa caro por elemento
+        colunas = (prep[c].tolist() for c in ("marca", "ano", "uf", "km", "tokens", "fonte"))
+        for marca, ano, uf, km, tokens, fonte in zip(*colunas):
+            pos = len(self._pai)
+            self._pai.append(pos)
+            self._km.append(km)
+            self._tokens.append(tokens)
+            self._fontes[pos] = {fonte}
+            posicoes.append(pos)
+            if not (marca and ano and uf and km is not None and tokens):
+                continue
+            bloco = (marca, int(ano), uf, int(km) // self.faixa_km)
+            if comparar:
+                candidato = self._melhor_candidato(bloco, km, tokens, fonte)
+                if candidato is not None:
+                    self._unir(pos, candidato)
+            self._blocos[bloco][fonte].append(pos)
+        return posicoes
+
+    def adicionar(self, df: pd.DataFrame) -> pd.Series:
+        """Insere os registros de `df` (comparando só com o que já está no índice e entre si).
+
+        Devolve o id de cluster de cada linha, alinhado ao índice de `df`. Ids de
+        linhas antigas podem mudar quando um registro novo une dois clusters;
+        `clusters()` tem a visão atual.
+        """
+        posicoes = self._inserir(_preparar(df), comparar=True)
+        return pd.Series([self._raiz(p) for p in posicoes], index=df.index, name=COLUNA_CLUSTER)
+
+    def clusters(self) -> pd.Series:
+        """Id de cluster de todas as posições do índice, na ordem de inserção."""
+        return pd.Series([self._raiz(p) for p in range(len(self._pai))], name=COLUNA_CLUSTER)
+
+    @classmethod
+    def de_agrupados(cls, df: pd.DataFrame, coluna: str = COLUNA_CLUSTER, **kwargs) -> "IndiceDuplicados":
+        """Reconstrói o índice de uma tabela já agrupada, sem comparar nada de novo.
+
+        Os ids são renumerados pela ordem de `df`; para mantê-los entre runs,
+        guarde a tabela na mesma ordem em que foi agrupada.
+        """
+        indice = cls(**kwargs)
+        posicoes = indice._inserir(_preparar(df), comparar=False)
+        primeiro: Dict[Hashable, int] = {}
+        mesma_fonte, indice.mesma_fonte = indice.mesma_fonte, True  # o agrupamento gravado prevalece
+        for pos, cluster in zip(posicoes, df[coluna]):
+            if cluster in primeiro:
+                indice._unir(pos, primeiro[cluster])
+            else:
+                primeiro[cluster] = pos
+        indice.mesma_fonte = mesma_fonte
+        return indice
+
+def agrupar(df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """Cópia de `df` com a coluna Cluster (argumentos como em IndiceDuplicados)."""
+    indice = IndiceDuplicados(**kwargs)
+    indice.adicionar(df)
+    saida = df.copy()
+    saida[COLUNA_CLUSTER] = indice.clusters().to_numpy()
+    ligados = int(saida[COLUNA_CLUSTER].duplicated().sum())
+    logger.info(f"Deduplicação: {len(saida)} registros, {saida[COLUNA_CLUSTER].nunique()} clusters "
+                f"({ligados} duplicados, {indice.comparacoes} comparações).")
+    return saida
+
+def deduplicar(df: pd.DataFrame, prioridade: Sequence[str] = ("trucadao", "querotruck", "grupovamos")) -> pd.DataFrame:
+    """Uma linha por cluster; entre fontes, vale a primeira de `prioridade`."""
+    if COLUNA_CLUSTER not in df.columns:
+        df = agrupar(df)
+    if COLUNA_FONTE in df.columns:
+        ordem = {f: i for i, f in enumerate(prioridade)}
+        df = df.assign(_ordem=df[COLUNA_FONTE].map(ordem).fillna(len(ordem))).sort_values("_ordem", kind="stable")
+        df = df.drop(columns="_ordem")
+    return df.drop_duplicates(subset=[COLUNA_CLUSTER], keep="first").sort_index()
+
+if __name__ == "__main__":
+    import argparse
+
+    import base_colunar
+    from orquestrador import CHAVES
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Agrupa anúncios repetidos entre as fontes da base.")
+    parser.add_argument("--raiz", default=base_colunar.RAIZ_BASE)
+    parser.add_argument("--saida", required=True, help="Parquet com a base e a coluna Cluster")
+    parser.add_argument("--limiar", type=float, default=LIMIAR_SIMILARIDADE)
+    args = parser.parse_args()
+
+    # cada fonte tem a sua coluna-chave na base
+    partes = [base_colunar.ler(fonte, chave=chave, raiz=args.raiz) for fonte, chave in CHAVES.items()]
+    base = pd.concat([p for p in partes if not p.empty], ignore_index=True)
+    agrupar(base, limiar=args.limiar).to_parquet(args.saida, index=False)
+    logger.info(f"Clusters gravados em {args.saida}")
@@ -0,0 +1,249 @@
+"""Motor HTTP para as páginas de detalhe do Trucadão (sem navegador).
+
+Busca o HTML com um cliente httpx assíncrono (pool de conexões keep-alive) e
+extrai os campos com selectolax: primeiro do JSON embutido (__NEXT_DATA__ /
+application/ld+json), depois do HTML renderizado no servidor. Links que não
+trazem os campos obrigatórios voltam como pendentes para o caminho Playwright.
+
+httpx e selectolax são opcionais: sem eles, DISPONIVEL é False e o chamador
+deve usar só o navegador. Com CACHE_REDE ligado, o HTML sai do mesmo cache
+em disco das páginas do navegador (ver cache_rede.py).
+"""
+import asyncio
+import json
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cache_rede
+import perfil
+from captura_respostas import formatar_brl
+
+try:
+    import httpx
+    try:
+        from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    except ImportError:  # selectolax < 0.3
+        from selectolax.parser import HTMLParser
+    DISPONIVEL = True
+except ImportError:  # dependências opcionais
+    httpx = None
+    HTMLParser = None
+    DISPONIVEL = False
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# chaves do JSON embutido -> campo do registro (comparadas já normalizadas)
+CHAVES_JSON = {
+    "titulo": "Título",
+    "title": "Título",
+    "name": "Título",
+    "preco": "Preço_raw",
+    "price": "Preço_raw",
+    "valor": "Preço_raw",
+    "marca": "Marca",
+    "brand": "Marca",
+    "modelo": "Modelo",
+    "model": "Modelo",
+    "ano": "Ano",
+    "anomodelo": "Ano",
+    "km": "Km",
+    "quilometragem": "Km",
+    "mileage": "Km",
+    "combustivel": "Combustível",
+    "fuel": "Combustível",
+    "cor": "Cor",
+    "color": "Cor",
+    "cidade": "Cidade",
+    "city": "Cidade",
+    "uf": "UF",
+    "estado": "UF",
+}
+
+def _norm(txt: str) -> str:
+    if not txt: return ""
+    x = unicodedata.normalize("NFKD", txt)
+    x = "".join(c for c in x if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", x).strip().lower()
+
+def _texto(no) -> str:
+    return re.sub(r"\s+", " ", no.text(separator=" ") or "").strip() if no is not None else ""
+
+def _escalar(valor: Any) -> str:
+    if isinstance(valor, dict):
+        # ex.: {"name": "Scania"} ou {"value": 1234}
+        for k in ("name", "nome", "label", "value", "valor"):
+            if k in valor and not isinstance(valor[k], (dict, list)):
+                return str(valor[k]).strip()
+        return ""
+    if isinstance(valor, (list, tuple)) or valor is None:
+        return ""
+    return str(valor).strip()
+
+# preço em texto de máquina ("489900", "489900.50"); "489.900" fica de fora (milhar brasileiro)
+RE_PRECO_JSON = re.compile(r"^\d+(?:\.\d{1,2})?$")
+
+def _preco_json(valor: Any, texto: str) -> str:
+    # número cru do JSON vira "R$ 489.900,50"; passado adiante como texto, formatar_preco
+    # leria o "." como milhar (489900.5 -> R$ 4.899.005,00)
+    if isinstance(valor, dict):
+        valor = next((valor[k] for k in ("value", "valor") if k in valor), valor)
+    numerico = isinstance(valor, (int, float)) and not isinstance(valor, bool)
+    return formatar_brl(texto) if numerico or RE_PRECO_JSON.match(texto) else texto
+
+def _melhor_objeto_json(raiz: Any) -> Dict[str, str]:
+    """Procura no JSON o objeto com mais chaves conhecidas e devolve os campos mapeados."""
+    melhor: Dict[str, str] = {}
+    pilha = [raiz]
+    while pilha:
+        atual = pilha.pop()
+        if isinstance(atual, dict):
+            campos: Dict[str, str] = {}
+            for chave, valor in atual.items():
+                destino = CHAVES_JSON.get(re.sub(r"[^a-z]", "", _norm(str(chave))))
+                if destino and destino not in campos:
+                    texto = _escalar(valor)
+                    if texto and destino == "Preço_raw":
+                        texto = _preco_json(valor, texto)
+                    if texto:
+                        campos[destino] = texto
+                if isinstance(valor, (dict, list)):
+                    pilha.append(valor)
+            if len(campos) > len(melhor):
+                melhor = campos
+        elif isinstance(atual, list):
+            pilha.extend(atual)
+    # um objeto com 1-2 chaves genéricas ("name") não é o anúncio
+    return melhor if len(melhor) >= 3 else {}
+
+def _campos_json(arvore) -> Dict[str, str]:
+    for seletor in ("script#__NEXT_DATA__", 'script[type="application/ld+json"]'):
+        for no in arvore.css(seletor):
+            try:
+                campos = _melhor_objeto_json(json.loads(no.text() or "null"))
+            except ValueError:
+                continue
+            if campos:
+                return campos
+    return {}
+
+def _primeiro_css(arvore, seletores: Iterable[str]) -> str:
+    for sel in seletores:
+        if sel.strip().startswith("//"):  # XPath fica para o navegador
+            continue
+        try:
+            no = arvore.css_first(sel)
+        except Exception:
+            continue
+        texto = _texto(no)
+        if texto:
+            return texto
+    return ""
+
+def extrair_campos_html(html: str, seletores_cabecalho: Dict[str, List[str]],
+                        seletores_diretos: Dict[str, List[str]], grid_css: str,
+                        rotulos: Dict[str, str]) -> Dict[str, str]:
+    """Extrai os campos brutos de uma página de detalhe já baixada.
+
+    Retorna só o que encontrou (chaves: Título, Preço_raw, Localização, Cidade,
+    UF e os técnicos de `seletores_diretos`).
+    """
+    arvore = HTMLParser(html)
+    campos = _campos_json(arvore)
+
+    for campo, destino in (("Título", "Título"), ("Preço", "Preço_raw"), ("Localização", "Localização")):
+        if not campos.get(destino):
+            valor = _primeiro_css(arvore, seletores_cabecalho.get(campo, []))
+            if valor:
+                campos[destino] = valor
+
+    # grade técnica por rótulo (primeiro <p> = rótulo, segundo = valor)
+    for linha in arvore.css(grid_css):
+        ps = linha.css("p")
+        if len(ps) < 2:
+            continue
+        rotulo, valor = _norm(_texto(ps[0])), _texto(ps[1])
+        for chave, destino in rotulos.items():
+            if chave in rotulo:
+                if valor and not campos.get(destino):
+                    campos[destino] = valor
+                break
+
+    for campo, sels in seletores_diretos.items():
+        if not campos.get(campo):
+            valor = _primeiro_css(arvore, sels)
+            if valor:
+                campos[campo] = valor
+
+    return campos
+
+async def _buscar(cliente, link: str, sem: asyncio.Semaphore,
+                  cache: Optional[cache_rede.CacheRede] = None) -> Tuple[str, Optional[str]]:
+    if cache:
+        guardada = await asyncio.to_thread(cache.obter, link, tipo="document")
+        if guardada is not None:
+            cache.acertos += 1
+            return link, guardada.corpo.decode("utf-8", errors="replace")
+        cache.faltas += 1
+        if cache.modo == cache_rede.MODO_REPRODUZIR:
+            return link, None
+    async with sem:
+        try:
+            with perfil.etapa("http.buscar"):
+                resp = await cliente.get(link)
+        except Exception as e:
+            logger.warning(f"HTTP falhou para {link}: {e}")
+            return link, None
+    if resp.status_code >= 400:
+        logger.warning(f"HTTP {resp.status_code} para {link}")
+        return link, None
+    if cache:
+        resposta = cache_rede.Resposta(resp.status_code, dict(resp.headers), resp.content)
+        await asyncio.to_thread(cache.guardar, link, resposta, tipo="document")
+    return link, resp.text
+
+async def extrair_detalhes_http(links: List[str], obrigatorios: Iterable[str], concorrencia: int = 24,
+                                timeout: float = 30.0, **config) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+    """Baixa e extrai todos os links; devolve ({link: campos}, pendentes).
+
+    Um link vai para `pendentes` se a requisição falhar ou se faltar algum
+    campo de `obrigatorios`. `config` é repassado para `extrair_campos_html`.
+    """
+    if not DISPONIVEL:
+        return {}, list(links)
+
+    obrigatorios = tuple(obrigatorios)
+    extraidos: Dict[str, Dict[str, str]] = {}
+    pendentes: List[str] = []
+    sem = asyncio.Semaphore(concorrencia)
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+
+    async with httpx.AsyncClient(limits=limites, timeout=timeout, follow_redirects=True,
+                                 headers={"User-Agent": USER_AGENT, "Accept-Language": "pt-BR,pt;q=0.9"}) as cliente:
+        # mesmo cache (CACHE_REDE) das páginas do navegador: a chave é a URL normalizada
+        cache = cache_rede.do_ambiente()
+        for tarefa in asyncio.as_completed([_buscar(cliente, lk, sem, cache) for lk in links]):
+            link, html = await tarefa
+            if not html:
+                pendentes.append(link)
+                continue
+            try:
+                with perfil.etapa("http.interpretar"):
+                    campos = extrair_campos_html(html, **config)
+            except Exception as e:
+                logger.warning(f"Falha ao interpretar {link}: {e}")
+                pendentes.append(link)
+                continue
+            if all(campos.get(c) for c in obrigatorios):
+                extraidos[link] = campos
+            else:
+                pendentes.append(link)
+
+    logger.info(f"HTTP: {len(extraidos)} detalhes completos, {len(pendentes)} para o navegador.")
+    return extraidos, pendentes
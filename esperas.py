@@ -0,0 +1,185 @@
+"""Esperas por eventos da página no lugar de sleeps fixos.
+
+A "assinatura" da listagem é a quantidade de cards + o texto do primeiro
+card. Depois de um clique em "próxima", a página nova está pronta quando a
+assinatura muda e a quantidade de cards fica parada por `estavel_ms`:
+
+    anterior = assinatura_cards_sync(pagina, "//app-offer-card")
+    botao.click()
+    esperar_troca_cards_sync(pagina, "//app-offer-card", anterior, timeout=30000)
+
+A condição roda no navegador a cada frame (wait_for_function), sobrevive a
+navegações completas e tem `timeout` como limite rígido (PlaywrightTimeout).
+Seletores como em extracao_cards: CSS, "css=...", "xpath=..." ou "//...".
+
+Lazy load: `rolar_ate_estavel` rola a listagem de dentro da página e volta
+num await só, quando a quantidade de cards para de crescer:
+
+    await pagina.wait_for_selector(CARD_SELECTOR)
+    total = await rolar_ate_estavel(pagina, CARD_SELECTOR)             # até não vir card novo
+    await rolar_ate_estavel(pagina, CARD_SELECTOR, minimo=idx + 1)     # até existir o card idx
+
+Um MutationObserver reconta os cards quando o DOM muda e um
+IntersectionObserver no último card desce mais uma tela quando ele aparece;
+sem card novo por `estavel_ms` já no fim da página, acabou. `prazo` é o
+limite rígido (ms), contado dentro da página: ao estourar, volta com o que
+carregou, sem exceção.
+"""
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT_PADRAO = 30000
+ESTAVEL_MS = 150
+ROLAGEM_ESTAVEL_MS = 1500  # sem card novo por esse tempo no fim da página = tudo carregado (cobre um XHR lento)
+PRAZO_ROLAGEM = 15000
+
+_JS_CARDS = """
+const cardsDe = (sel) => {
+    let expr = sel.trim();
+    if (expr.startsWith('css=')) return document.querySelectorAll(expr.slice(4));
+    if (expr.startsWith('xpath=') || expr.startsWith('/') || expr.startsWith('(')) {
+        if (expr.startsWith('xpath=')) expr = expr.slice(6);
+        const r = document.evaluate(expr, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nos = [];
+        for (let i = 0; i < r.snapshotLength; i++) nos.push(r.snapshotItem(i));
+        return nos;
+    }
+    return document.querySelectorAll(expr);
+};
+const assinaturaDe = (cards) => cards.length + '|' + (cards.length ? (cards[0].innerText || '').trim() : '');
+"""
+
+JS_ASSINATURA = "(sel) => {" + _JS_CARDS + "return assinaturaDe(cardsDe(sel)); }"
+
+# pronto = há cards, a assinatura é outra que `anterior` e a contagem não muda há `estavelMs`
+JS_CARDS_PRONTOS = "({sel, anterior, estavelMs}) => {" + _JS_CARDS + """
+    const cards = cardsDe(sel);
+    const assinatura = assinaturaDe(cards);
+    if (!cards.length || assinatura === anterior) return false;
+    const agora = performance.now();
+    const estado = window.__esperaCards;
+    if (!estado || estado.assinatura !== assinatura) {
+        window.__esperaCards = {assinatura, desde: agora};
+        return estavelMs <= 0;
+    }
+    return agora - estado.desde >= estavelMs;
+}
+"""
+
+# resolve {cards, motivo, ms}; motivo: "estavel", "minimo" (já há `minimo` cards) ou "prazo"
+JS_ROLAR_ATE_ESTAVEL = "({sel, minimo, estavelMs, prazoMs}) => {" + _JS_CARDS + """
+    return new Promise((resolve) => {
+        const inicio = performance.now();
+        const raiz = document.scrollingElement || document.documentElement;
+        let contagem = cardsDe(sel).length;
+        let encerrado = false, agendado = false, vigiado = null, timerEstavel = null, timerPrazo = null;
+        const noFundo = () => window.innerHeight + window.scrollY >= raiz.scrollHeight - 2;
+        const encerrar = (motivo) => {
+            if (encerrado) return;
+            encerrado = true;
+            mutacoes.disconnect();
+            visiveis.disconnect();
+            clearTimeout(timerEstavel);
+            clearTimeout(timerPrazo);
+            resolve({cards: cardsDe(sel).length, motivo, ms: Math.round(performance.now() - inicio)});
+        };
+        // último card na tela: desce mais uma tela para o site carregar o próximo lote
+        const visiveis = new IntersectionObserver((entradas) => {
+            if (!encerrado && entradas.some(e => e.isIntersecting)) window.scrollBy(0, window.innerHeight);
+        });
+        const vigiarUltimo = () => {
+            const cards = cardsDe(sel);
+            const ultimo = cards[cards.length - 1];
+            if (ultimo && ultimo !== vigiado) {
+                if (vigiado) visiveis.unobserve(vigiado);
+                visiveis.observe(ultimo);
+                vigiado = ultimo;
+            }
+        };
+        // sem card novo por estavelMs: fora do fim da página, vai até o fim e dá mais uma janela
+        const armarEstavel = () => {
+            clearTimeout(timerEstavel);
+            timerEstavel = setTimeout(() => {
+                if (noFundo()) return encerrar('estavel');
+                window.scrollTo(0, raiz.scrollHeight);
+                armarEstavel();
+            }, estavelMs);
+        };
+        const recontar = () => {
+            agendado = false;
+            if (encerrado) return;
+            const n = cardsDe(sel).length;
+            if (minimo > 0 && n >= minimo) return encerrar('minimo');
+            if (n !== contagem) {
+                contagem = n;
+                vigiarUltimo();
+                armarEstavel();
+            }
+        };
+        // várias mutações seguidas viram uma recontagem só (setTimeout, e não rAF: aba de fundo não pinta)
+        const mutacoes = new MutationObserver(() => {
+            if (!agendado) { agendado = true; setTimeout(recontar, 0); }
+        });
+        timerPrazo = setTimeout(() => encerrar('prazo'), prazoMs);
+        if (minimo > 0 && contagem >= minimo) return encerrar('minimo');
+        mutacoes.observe(document.body, {childList: true, subtree: true});
+        vigiarUltimo();
+        window.scrollBy(0, window.innerHeight);
+        armarEstavel();
+    });
+}
+"""
+
+def _arg(seletor: str, anterior: Optional[str], estavel_ms: int) -> Dict[str, Any]:
+    return {"sel": seletor, "anterior": anterior, "estavelMs": estavel_ms}
+
+async def assinatura_cards(pagina, seletor: str) -> str:
+    return await pagina.evaluate(JS_ASSINATURA, seletor)
+
+async def esperar_cards_prontos(pagina, seletor: str, timeout: int = TIMEOUT_PADRAO,
+                                estavel_ms: int = ESTAVEL_MS) -> str:
+    """Espera haver cards e a contagem parar de mudar; devolve a assinatura final."""
+    return await esperar_troca_cards(pagina, seletor, None, timeout, estavel_ms)
+
+async def esperar_troca_cards(pagina, seletor: str, anterior: Optional[str], timeout: int = TIMEOUT_PADRAO,
+                              estavel_ms: int = ESTAVEL_MS) -> str:
+    """Espera a listagem trocar (assinatura diferente de `anterior`) e estabilizar."""
+    await pagina.wait_for_function(JS_CARDS_PRONTOS, arg=_arg(seletor, anterior, estavel_ms), timeout=timeout)
+    return await assinatura_cards(pagina, seletor)
+
+def assinatura_cards_sync(pagina, seletor: str) -> str:
+    """Mesmo que `assinatura_cards`, para páginas do playwright.sync_api."""
+    return pagina.evaluate(JS_ASSINATURA, seletor)
+
+def esperar_cards_prontos_sync(pagina, seletor: str, timeout: int = TIMEOUT_PADRAO,
+                               estavel_ms: int = ESTAVEL_MS) -> str:
+    """Mesmo que `esperar_cards_prontos`, para páginas do playwright.sync_api."""
+    return esperar_troca_cards_sync(pagina, seletor, None, timeout, estavel_ms)
+
+def esperar_troca_cards_sync(pagina, seletor: str, anterior: Optional[str], timeout: int = TIMEOUT_PADRAO,
+                             estavel_ms: int = ESTAVEL_MS) -> str:
+    """Mesmo que `esperar_troca_cards`, para páginas do playwright.sync_api."""
+    pagina.wait_for_function(JS_CARDS_PRONTOS, arg=_arg(seletor, anterior, estavel_ms), timeout=timeout)
+    return assinatura_cards_sync(pagina, seletor)
+
+def _arg_rolagem(seletor: str, minimo: int, prazo: int, estavel_ms: int) -> Dict[str, Any]:
+    return {"sel": seletor, "minimo": minimo, "estavelMs": estavel_ms, "prazoMs": prazo}
+
+def _contagem_rolagem(resultado: Dict[str, Any], seletor: str) -> int:
+    if resultado["motivo"] == "prazo":
+        logger.debug(f"Rolagem de {seletor} parou no prazo ({resultado['ms']} ms, {resultado['cards']} cards).")
+    return resultado["cards"]
+
+async def rolar_ate_estavel(pagina, seletor: str, minimo: int = 0, prazo: int = PRAZO_ROLAGEM,
+                            estavel_ms: int = ROLAGEM_ESTAVEL_MS) -> int:
+    """Rola até a contagem de cards parar de crescer (ou chegar a `minimo`); devolve a contagem."""
+    resultado = await pagina.evaluate(JS_ROLAR_ATE_ESTAVEL, _arg_rolagem(seletor, minimo, prazo, estavel_ms))
+    return _contagem_rolagem(resultado, seletor)
+
+def rolar_ate_estavel_sync(pagina, seletor: str, minimo: int = 0, prazo: int = PRAZO_ROLAGEM,
+                           estavel_ms: int = ROLAGEM_ESTAVEL_MS) -> int:
+    """Mesmo que `rolar_ate_estavel`, para páginas do playwright.sync_api."""
+    resultado = pagina.evaluate(JS_ROLAR_ATE_ESTAVEL, _arg_rolagem(seletor, minimo, prazo, estavel_ms))
+    return _contagem_rolagem(resultado, seletor)
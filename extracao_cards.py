@@ -0,0 +1,99 @@
+"""Extração em lote dos cards de listagem: um único page.evaluate por página.
+
+Os campos são descritos de forma declarativa (campo -> seletores) e todos os
+fallbacks são avaliados dentro do navegador, sem ida e volta por seletor.
+
+    CAMPOS = {
+        "Título": ["div.infoProduct h4", "h4"],
+        "Imagem_src": {"seletores": ["img"], "attr": "src", "padrao": ""},
+    }
+    itens = await extrair_cards(pagina, "div.productCard", CAMPOS)
+
+Seletores aceitam o mesmo formato usado nos scripts: CSS puro, "css=...",
+"xpath=..." ou XPath iniciando com "//" (relativo ao card, como nos locators
+encadeados do Playwright).
+"""
+from typing import Any, Dict, List, Union
+
+Campos = Dict[str, Union[str, List[str], Dict[str, Any]]]
+
+JS_EXTRAIR_CARDS = """
+({seletoresCard, campos, incluirTexto}) => {
+    const limpar = (t) => (t || '').replace(/\\u00a0/g, ' ').trim();
+
+    const todos = (raiz, sel) => {
+        let tipo = 'css', expr = sel.trim();
+        if (expr.startsWith('css=')) {
+            expr = expr.slice(4);
+        } else if (expr.startsWith('xpath=')) {
+            tipo = 'xpath';
+            expr = expr.slice(6);
+        } else if (expr.startsWith('/') || expr.startsWith('./') || expr.startsWith('(')) {
+            tipo = 'xpath';
+        }
+        if (tipo === 'css') return Array.from(raiz.querySelectorAll(expr));
+        if (raiz !== document && expr.startsWith('/')) expr = '.' + expr;
+        const r = document.evaluate(expr, raiz, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nos = [];
+        for (let i = 0; i < r.snapshotLength; i++) nos.push(r.snapshotItem(i));
+        return nos;
+    };
+
+    const primeiro = (raiz, sel) => {
+        try { return todos(raiz, sel)[0] || null; } catch (e) { return null; }
+    };
+
+    let cards = [];
+    for (const sel of seletoresCard) {
+        try { cards = todos(document, sel); } catch (e) { cards = []; }
+        if (cards.length) break;
+    }
+
+    return cards.map(card => {
+        const item = {};
+        for (const campo of campos) {
+            item[campo.nome] = campo.padrao;
+            for (const sel of campo.seletores) {
+                const el = primeiro(card, sel);
+                if (!el) continue;
+                const valor = campo.attr
+                    ? limpar(el.getAttribute(campo.attr))
+                    : limpar(el.innerText !== undefined ? el.innerText : el.textContent);
+                if (valor) { item[campo.nome] = valor; break; }
+            }
+        }
+        if (incluirTexto) item._texto = limpar(card.innerText);
+        return item;
+    });
+}
+"""
+
+def _argumentos(seletor_card: Union[str, List[str]], campos: Campos,
+                padrao: str, incluir_texto: bool) -> Dict[str, Any]:
+    seletores_card = [seletor_card] if isinstance(seletor_card, str) else list(seletor_card)
+    specs = []
+    for nome, spec in campos.items():
+        if isinstance(spec, dict):
+            seletores = spec["seletores"]
+            attr = spec.get("attr")
+            padrao_campo = spec.get("padrao", padrao)
+        else:
+            seletores, attr, padrao_campo = spec, None, padrao
+        if isinstance(seletores, str):
+            seletores = [seletores]
+        specs.append({"nome": nome, "seletores": list(seletores), "attr": attr, "padrao": padrao_campo})
+    return {"seletoresCard": seletores_card, "campos": specs, "incluirTexto": incluir_texto}
+
+async def extrair_cards(pagina, seletor_card: Union[str, List[str]], campos: Campos,
+                        padrao: str = "Não informado", incluir_texto: bool = False) -> List[Dict[str, str]]:
+    """Retorna um dict por card com todos os campos (playwright.async_api).
+
+    `seletor_card` pode ser uma lista; vale o primeiro que encontrar cards.
+    Com `incluir_texto=True` cada item traz também o innerText do card em `_texto`.
+    """
+    return await pagina.evaluate(JS_EXTRAIR_CARDS, _argumentos(seletor_card, campos, padrao, incluir_texto))
+
+def extrair_cards_sync(pagina, seletor_card: Union[str, List[str]], campos: Campos,
+                       padrao: str = "Não informado", incluir_texto: bool = False) -> List[Dict[str, str]]:
+    """Mesmo que `extrair_cards`, para páginas do playwright.sync_api."""
+    return pagina.evaluate(JS_EXTRAIR_CARDS, _argumentos(seletor_card, campos, padrao, incluir_texto))
@@ -0,0 +1,57 @@
+"""Recrawl incremental: só vai ao detalhe o anúncio cujo card mudou.
+
+Cada card da listagem ganha uma impressão (hash de Título, Preço_raw e
+Imagem_src). O registro de detalhe guarda a impressão do card no momento em
+que foi coletado; no run seguinte, anúncios com a mesma impressão são
+carregados da base colunar em vez de visitados de novo.
+
+    novos, mantidos = separar_alterados({link: impressao, ...}, "trucadao")
+"""
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Tuple, Union
+
+import base_colunar
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_IMPRESSAO = ("Título", "Preço_raw", "Imagem_src")
+COLUNA_IMPRESSAO = "Impressão_listagem"
+
+def impressao(card: Mapping[str, Any]) -> str:
+    """Hash curto e estável dos campos do card que indicam mudança no anúncio."""
+    partes = []
+    for campo in CAMPOS_IMPRESSAO:
+        valor = card.get(campo)
+        partes.append("" if valor is None or valor != valor else " ".join(str(valor).split()))
+    return hashlib.sha1("\x1f".join(partes).encode("utf-8")).hexdigest()[:16]
+
+def separar_alterados(listagem: Mapping[str, str], fonte: str, chave: str = "Link",
+                      raiz: Union[str, Path] = base_colunar.RAIZ_BASE) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Divide a listagem atual ({link: impressão}) em (a coletar, registros mantidos).
+
+    Vai para coleta o link novo, o que mudou de impressão, o que não tem
+    impressão e o que está na base sem impressão (coletado antes deste recurso).
+    """
+    links = list(listagem)
+    if not any(listagem.values()):
+        logger.info("Listagem sem impressões; coleta completa.")
+        return links, []
+
+    base = base_colunar.ler(fonte, chave=chave, raiz=raiz)
+    if base.empty or COLUNA_IMPRESSAO not in base.columns:
+        logger.info("Base sem impressões anteriores; coleta completa.")
+        return links, []
+
+    anteriores = dict(zip(base[chave], base[COLUNA_IMPRESSAO]))
+    alterados = [lk for lk in links if not listagem[lk] or anteriores.get(lk) != listagem[lk]]
+    iguais = set(links).difference(alterados)
+
+    mantidos = base[base[chave].isin(iguais)].drop(columns=["fonte", "data"], errors="ignore")
+    # <NA> do pandas vira None para não virar o texto "<NA>" no próximo upsert
+    mantidos = mantidos.astype(object).where(mantidos.notna(), None).to_dict("records")
+
+    novos = sum(lk not in anteriores for lk in alterados)
+    logger.info(f"Incremental: {len(mantidos)} inalterados, {len(alterados) - novos} alterados, {novos} novos.")
+    return alterados, mantidos
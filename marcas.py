@@ -0,0 +1,173 @@
+"""Marca, modelo e versão a partir do título do anúncio.
+
+Os apelidos de cada marca (MARCAS) são compilados numa trie de palavras, e
+as famílias de modelo de cada marca (FAMILIAS) em outra. O título é
+percorrido uma vez: a primeira sequência de palavras que fecha uma marca na
+trie vale (a mais longa, então "MERCEDES BENZ" ganha de "MERCEDES"), e o
+modelo é a família seguinte mais o número dela; o resto é a versão.
+
+    separar_titulo("MB Actros 2651 LS 6x4")     # ("MERCEDES-BENZ", "ACTROS 2651", "LS 6X4")
+    separar_titulo("Scania R450 A 6x2")         # ("SCANIA", "R 450", "A 6X2")
+    separar_titulos(df["Modelo"])               # DataFrame Marca / Modelo / Versão
+    canonizar_marcas(df["Marca"])               # "VW" -> "VOLKSWAGEN", "Mercedes Benz" -> "MERCEDES-BENZ"
+
+Tudo sai em maiúsculas e sem acento. Sem marca no título, uma família
+conhecida ("Actros", "Constellation", "FH") indica a marca; se nem isso,
+a marca é None e o modelo sai do começo do título. Os resultados por título ficam em cache,
+e as versões para Series processam cada valor distinto uma vez.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# marca canônica -> apelidos (o próprio nome já entra na trie)
+MARCAS: Dict[str, Sequence[str]] = {
+    "MERCEDES-BENZ": ("MERCEDES BENZ", "MERCEDES", "MB", "M BENZ", "MBB", "BENZ"),
+    "VOLKSWAGEN": ("VW", "VOLKS", "VW CAMINHOES", "VOLKSWAGEN CAMINHOES", "VWCO"),
+    "SCANIA": (),
+    "VOLVO": (),
+    "IVECO": ("IVECO FIAT", "FIAT IVECO"),
+    "DAF": (),
+    "FORD": (),
+    "MAN": (),
+    "INTERNATIONAL": ("NAVISTAR",),
+    "HYUNDAI": (),
+    "JAC": ("JAC MOTORS",),
+    "FOTON": (),
+    "SINOTRUK": ("SINOTRUCK", "SINO TRUK"),
+    "SHACMAN": (),
+    "AGRALE": (),
+    "CHEVROLET": ("GM",),
+    "RENAULT": (),
+    "KIA": (),
+    # implementos
+    "RANDON": (),
+    "FACCHINI": (),
+    "LIBRELATO": (),
+    "GUERRA": (),
+    "NOMA": (),
+    "ROSSETTI": (),
+    "PASTRE": (),
+    "RODOFORT": (),
+    "TRIVELLATO": (),
+    "BIASI": (),
+}
+
+# famílias de modelo por marca; o número que vem depois ("2651", "24.280") entra no modelo
+FAMILIAS: Dict[str, Sequence[str]] = {
+    "SCANIA": ("R", "G", "P", "S", "T", "L"),
+    "VOLVO": ("FH", "FM", "FMX", "VM", "NH", "NL", "VNL"),
+    "MERCEDES-BENZ": ("ACTROS", "AXOR", "ATEGO", "ACCELO", "ATRON", "AROCS"),
+    "VOLKSWAGEN": ("CONSTELLATION", "METEOR", "DELIVERY", "WORKER", "EXPRESS"),
+    "IVECO": ("STRALIS", "TECTOR", "DAILY", "EUROCARGO", "HI WAY", "S WAY", "HI ROAD", "TRAKKER"),
+    "DAF": ("XF", "CF", "LF"),
+    "FORD": ("CARGO",),
+    "MAN": ("TGX", "TGS"),
+}
+
+# palavras: letras/dígitos, com "-" "." "," "/" só entre dígitos ("17-250", "24.280", "2019/2020");
+# fora disso o hífen separa ("MERCEDES-BENZ")
+RE_PALAVRAS = re.compile(r"[A-Z0-9]+(?:[-.,/][0-9]+)*")
+RE_COLADO = re.compile(r"^([A-Z]+)(\d[\d.]*)$")          # "R450", "FH540"
+RE_NUMERO_MODELO = re.compile(r"^\d{2,}(?:[-.,/]\d+)*(?:[A-Z]\d+)?$")  # "2651", "24.280", "17-250", "240E30"; "3 eixos" não
+RE_TRACAO = re.compile(r"^\d+X\d+$")                     # "6X2" é versão, não modelo
+
+_FIM = ""  # chave do nó que fecha uma entrada na trie
+
+Trie = Dict[str, dict]
+Separacao = Tuple[Optional[str], Optional[str], Optional[str]]
+
+def _palavras(texto: str) -> List[str]:
+    x = unicodedata.normalize("NFKD", texto)
+    x = "".join(c for c in x if not unicodedata.combining(c)).upper()
+    return RE_PALAVRAS.findall(x)
+
+def compilar_trie(entradas: Dict[str, Sequence[str]]) -> Trie:
+    """Trie de palavras: cada nome/apelido vira um caminho que termina no valor canônico."""
+    raiz: Trie = {}
+    for canonico, apelidos in entradas.items():
+        for nome in (canonico, *apelidos):
+            no = raiz
+            for palavra in _palavras(nome):
+                no = no.setdefault(palavra, {})
+            no[_FIM] = canonico
+    return raiz
+
+def _casar(trie: Trie, palavras: List[str], inicio: int) -> Tuple[Optional[str], int]:
+    """Maior entrada da trie começando em `inicio`: (valor, posição seguinte) ou (None, inicio)."""
+    no, achado, fim = trie, None, inicio
+    for i in range(inicio, len(palavras)):
+        no = no.get(palavras[i])
+        if no is None:
+            break
+        if _FIM in no:
+            achado, fim = no[_FIM], i + 1
+    return achado, fim
+
+TRIE_MARCAS = compilar_trie(MARCAS)
+TRIES_FAMILIAS = {marca: compilar_trie({f: () for f in familias}) for marca, familias in FAMILIAS.items()}
+# título sem marca: a família denuncia a marca ("Actros 2651" -> MERCEDES-BENZ); famílias de uma letra
+# ("R", "G", "S") não, porque aparecem soltas em qualquer título
+TRIE_FAMILIA_MARCA = compilar_trie({
+    marca: [f for f in familias if len(f) > 1] for marca, familias in FAMILIAS.items()
+})
+
+def _modelo_e_versao(marca: Optional[str], palavras: List[str]) -> Tuple[Optional[str], Optional[str]]:
+    if not palavras:
+        return None, None
+    primeira = palavras[0]
+    colado = RE_COLADO.match(primeira)
+    if colado:
+        # "R450" -> "R 450": a mesma grafia de "R 450"
+        modelo, resto = f"{colado.group(1)} {colado.group(2)}", palavras[1:]
+    else:
+        familia, fim = _casar(TRIES_FAMILIAS.get(marca, {}), palavras, 0)
+        if familia is None:
+            familia, fim = primeira, 1
+        resto = palavras[fim:]
+        numero = resto[0] if resto else ""
+        if RE_NUMERO_MODELO.match(numero) and not RE_TRACAO.match(numero) and not familia[-1].isdigit():
+            familia, resto = f"{familia} {numero}", resto[1:]
+        modelo = familia
+    return modelo, " ".join(resto) or None
+
+@lru_cache(maxsize=200_000)
+def separar_titulo(titulo: str) -> Separacao:
+    """(marca, modelo, versão) de um título; o que vem antes da marca ("CAVALO MECÂNICO") é descartado."""
+    palavras = _palavras(str(titulo))
+    for i in range(len(palavras)):
+        marca, fim = _casar(TRIE_MARCAS, palavras, i)
+        if marca:
+            return (marca, *_modelo_e_versao(marca, palavras[fim:]))
+    for i, palavra in enumerate(palavras):
+        colado = RE_COLADO.match(palavra)
+        marca, _ = _casar(TRIE_FAMILIA_MARCA, [colado.group(1)] if colado else palavras, 0 if colado else i)
+        if marca:
+            return (marca, *_modelo_e_versao(marca, palavras[i:]))
+    return (None, *_modelo_e_versao(None, palavras))
+
+@lru_cache(maxsize=10_000)
+def canonizar_marca(marca: str) -> Optional[str]:
+    """Nome canônico de uma marca escrita por extenso ou por apelido (o texto inteiro tem que casar)."""
+    palavras = _palavras(str(marca))
+    achado, fim = _casar(TRIE_MARCAS, palavras, 0)
+    return achado if palavras and fim == len(palavras) else None
+
+def _por_valores_distintos(s: pd.Series, func, colunas: List[str]) -> pd.DataFrame:
+    codigos, unicos = pd.factorize(s, use_na_sentinel=True)
+    linhas = [func(v) for v in unicos] + [(None,) * len(colunas)]
+    # código -1 (NA) aponta para a última linha, toda vazia
+    saida = pd.DataFrame(linhas, columns=colunas).iloc[codigos]
+    saida.index = s.index
+    return saida
+
+def separar_titulos(titulos: pd.Series) -> pd.DataFrame:
+    """`separar_titulo` numa coluna inteira: DataFrame com Marca, Modelo e Versão."""
+    return _por_valores_distintos(titulos, separar_titulo, ["Marca", "Modelo", "Versão"])
+
+def canonizar_marcas(marcas: pd.Series) -> pd.Series:
+    """`canonizar_marca` numa coluna inteira (None onde a marca não é reconhecida)."""
+    return _por_valores_distintos(marcas, lambda m: (canonizar_marca(m),), ["Marca"])["Marca"]
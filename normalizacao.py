@@ -0,0 +1,133 @@
+"""Normalização vetorizada das colunas de preço, km, ano e localização.
+
+Trabalha em colunas inteiras do pandas (operações .str sobre strings do
+Arrow, quando o pyarrow está instalado) e devolve tipos de verdade, sem o
+vai e volta por "R$ 1.234,00":
+
+    preco_centavos(df["Preço"])        # Int64: "R$ 489.900,00" -> 48990000
+    km(df["Quilometragem"])            # Int64: "412.350 km" -> 412350
+    anos(df["Ano"])                    # Ano_fabricação / Ano_modelo: "18/19" -> 2018 / 2019
+    cidade_uf(df["Localização"])       # Cidade / UF: "Curitiba - PR" -> "Curitiba", "PR"
+    normalizar(df)                     # acrescenta todas as colunas acima
+
+Valores fora do padrão ("Não informado", "Preço sob consulta", vazio)
+viram <NA>. Cada função processa só os valores distintos da coluna e
+espalha o resultado, o que importa em colunas repetitivas (UF, ano).
+
+    python benchmarks/bench_normalizacao.py --linhas 1000000
+"""
+import re
+from typing import Callable, Optional, Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    # com pyarrow, replace/fullmatch rodam no Arrow (RE2, em C++) em vez de regex Python por célula
+    TIPO_TEXTO = "string[pyarrow]"
+except ImportError:  # dependência opcional
+    TIPO_TEXTO = "string"
+
+# as regex de preço e km são só do subconjunto comum a RE2 e re (sem lookaround)
+# milhar com ponto e decimal com vírgula (BRL); decimal com ponto só com 1-2 casas (número vindo de JSON)
+RE_PRECO_BRL = r"\d{1,3}(?:\.\d{3})*(?:,\d{1,2})?|\d+(?:,\d{1,2})?"
+RE_PRECO_PONTO = r"\d+\.\d{1,2}"
+RE_NAO_PRECO = r"[^\d.,]"
+RE_PRIMEIRO_NUMERO = r"(?s)^\D*?(\d{1,3}(?:\.\d{3})+|\d+).*$"
+RE_ANO = re.compile(r"(?<!\d)(?P<fabricacao>\d{4}|\d{2})(?:\s*/\s*(?P<modelo>\d{4}|\d{2}))?(?!\d)")
+RE_CIDADE_UF = re.compile(r"^\s*(?P<Cidade>.*?\S)\s*[-–/]\s*(?P<UF>[A-Za-z]{2})\s*$")
+
+COLUNA_PRECO = "Preço_centavos"
+COLUNA_KM = "Km_num"
+COLUNA_ANO_FABRICACAO = "Ano_fabricação"
+COLUNA_ANO_MODELO = "Ano_modelo"
+
+def _texto(s: pd.Series) -> pd.Series:
+    return s.astype(TIPO_TEXTO).str.replace("\xa0", " ", regex=False).str.strip()
+
+def _por_valores_unicos(s: pd.Series, func: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """Aplica `func` aos valores distintos de `s` e devolve o resultado alinhado ao índice de `s`."""
+    codigos, unicos = pd.factorize(s, use_na_sentinel=True)
+    resultado = func(pd.Series(unicos))
+    # código -1 (NA na entrada) cai numa linha extra só com <NA>
+    extra = resultado.iloc[:0].reindex([len(resultado)])
+    resultado = pd.concat([resultado.reset_index(drop=True), extra])
+    codigos = codigos.copy()
+    codigos[codigos < 0] = len(resultado) - 1
+    saida = resultado.iloc[codigos]
+    saida.index = s.index
+    return saida
+
+def _inteiro(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(s, errors="coerce").astype("Int64")
+
+def _preco_centavos(unicos: pd.Series) -> pd.Series:
+    texto = _texto(unicos).str.replace(RE_NAO_PRECO, "", regex=True)
+    brl = texto.str.fullmatch(RE_PRECO_BRL).fillna(False).astype(bool)
+    ponto = texto.str.fullmatch(RE_PRECO_PONTO).fillna(False).astype(bool)
+    # "1.234,56" -> "1234.56"; "489900.5" fica como está; o resto vira <NA>
+    numero = texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False).where(brl, texto)
+    valor = pd.to_numeric(numero.where(brl | ponto).astype(object), errors="coerce")
+    return (valor * 100).round().astype("Int64")
+
+def preco_centavos(s: pd.Series) -> pd.Series:
+    """Preço em centavos (Int64) a partir de "R$ 1.234,56", "489.900", "489900.5"..."""
+    return _por_valores_unicos(s, _preco_centavos)
+
+def _km(unicos: pd.Series) -> pd.Series:
+    numero = _texto(unicos).str.replace(RE_PRIMEIRO_NUMERO, r"\1", regex=True).str.replace(".", "", regex=False)
+    return _inteiro(numero.where(numero.str.fullmatch(r"\d+").fillna(False).astype(bool)).astype(object))
+
+def km(s: pd.Series) -> pd.Series:
+    """Quilometragem (Int64): primeiro número do texto, com ponto de milhar."""
+    return _por_valores_unicos(s, _km)
+
+def _quatro_digitos(ano: pd.Series) -> pd.Series:
+    # "18" -> 2018, "95" -> 1995 (mesma regra do converter_ano do Filtro.ipynb)
+    return ano.mask(ano < 50, ano + 2000).mask((ano >= 50) & (ano < 100), ano + 1900)
+
+def _anos(unicos: pd.Series) -> pd.DataFrame:
+    partes = _texto(unicos).str.extract(RE_ANO)
+    fabricacao = _quatro_digitos(_inteiro(partes["fabricacao"]))
+    modelo = _quatro_digitos(_inteiro(partes["modelo"])).fillna(fabricacao)
+    return pd.DataFrame({COLUNA_ANO_FABRICACAO: fabricacao, COLUNA_ANO_MODELO: modelo})
+
+def anos(s: pd.Series) -> pd.DataFrame:
+    """Ano de fabricação e ano-modelo (Int64); sem "/", os dois são o mesmo ano."""
+    return _por_valores_unicos(s, _anos)
+
+def _cidade_uf(unicos: pd.Series) -> pd.DataFrame:
+    texto = _texto(unicos)
+    partes = texto.str.extract(RE_CIDADE_UF)
+    vazio = texto.isna() | (texto == "") | (texto.str.lower() == "não informado")
+    cidade = partes["Cidade"].fillna(texto).mask(vazio)
+    return pd.DataFrame({"Cidade": cidade, "UF": partes["UF"].str.upper()})
+
+def cidade_uf(s: pd.Series) -> pd.DataFrame:
+    """Separa "Cidade - UF" (também "–" e "/") em Cidade e UF; sem UF, o texto todo é a cidade."""
+    return _por_valores_unicos(s, _cidade_uf)
+
+def _primeira(df: pd.DataFrame, candidatas: Sequence[str]) -> Optional[str]:
+    return next((c for c in candidatas if c in df.columns), None)
+
+def normalizar(df: pd.DataFrame, preco: Sequence[str] = ("Preço", "Preço_raw"),
+               quilometragem: Sequence[str] = ("Quilometragem", "Km"), ano: Sequence[str] = ("Ano",),
+               localizacao: Sequence[str] = ("Localização",)) -> pd.DataFrame:
+    """Cópia de `df` com as colunas tipadas; para cada grupo vale a primeira coluna existente.
+
+    Cidade/UF só são criadas se o DataFrame ainda não as tiver.
+    """
+    df = df.copy()
+    coluna = _primeira(df, preco)
+    if coluna:
+        df[COLUNA_PRECO] = preco_centavos(df[coluna])
+    coluna = _primeira(df, quilometragem)
+    if coluna:
+        df[COLUNA_KM] = km(df[coluna])
+    coluna = _primeira(df, ano)
+    if coluna:
+        df[[COLUNA_ANO_FABRICACAO, COLUNA_ANO_MODELO]] = anos(df[coluna])
+    coluna = _primeira(df, localizacao)
+    if coluna and not {"Cidade", "UF"} <= set(df.columns):
+        df[["Cidade", "UF"]] = cidade_uf(df[coluna])
+    return df
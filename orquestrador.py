@@ -0,0 +1,272 @@
+"""Orquestrador: todas as fontes no mesmo event loop, com um navegador só.
+
+    python orquestrador.py                           # todas as fontes
+    python orquestrador.py --so querotruck grupovamos
+    python orquestrador.py --excel                   # no fim, uma planilha por fonte a partir da base
+
+Cada fonte é uma tarefa asyncio com o seu orçamento de páginas abertas
+(ORCAMENTOS) e abre os próprios contextos (política de rede, captura) no
+Chromium compartilhado. Os registros vão para a base colunar à medida que
+as páginas terminam — upsert em lotes, numa thread, já com as colunas de
+`normalizacao` —, então o tempo total fica perto do da fonte mais lenta, e
+não da soma. Uma fonte que falha não derruba as outras.
+
+- trucadao: listagem (Links_Truncadao) -> detalhes (Scraping_Truncadao), incremental
+- implementos: listagem de implementos do Trucadão
+- querotruck: QueroTruck por pageIndex
+- grupovamos: seminovos da Vamos por ?page=N
+
+Os scripts de cada fonte continuam rodando sozinhos como antes.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from pathlib import Path
+from time import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+
+import pandas as pd
+from playwright.async_api import async_playwright
+
+import base_colunar
+import Implementos_Tuncadao as implementos
+import incremental
+import Links_Truncadao as links_trucadao
+import normalizacao
+import perfil
+import QueroTruck as querotruck
+import QueroTruck_GrupoVamos as grupovamos
+import Scraping_Truncadao as detalhes_trucadao
+
+logger = logging.getLogger(__name__)
+
+# páginas abertas ao mesmo tempo por fonte (no trucadao, o teto do AIMD nos detalhes)
+ORCAMENTOS = {
+    "trucadao": 12,
+    "implementos": 4,
+    "querotruck": 4,
+    "grupovamos": 4,
+}
+# coluna-chave do upsert; "Chave" é calculada para fontes sem link no registro
+CHAVES = {
+    "trucadao": "Link",
+    "implementos": "Chave",
+    "querotruck": "Chave",
+    "grupovamos": "Chave",
+}
+COLUNA_CHAVE = "Chave"
+# sem link, o anúncio é identificado pelos campos que não mudam junto com o preço
+CAMPOS_CHAVE = ("Marca", "Modelo", "Ano", "Quilometragem", "Localização", "Anunciante")
+# fontes com link em parte dos registros: a Chave é o link e, sem ele, o hash destes campos
+LINKS_CHAVE = {"implementos": "URL"}
+CAMPOS_CHAVE_FONTE = {"implementos": ("Título", "Imagem_alt", "Imagem_src")}
+LOTE_BASE = 200  # registros acumulados por upsert
+HEADLESS = True
+
+def chave_registro(registro: Dict[str, Any], campos: Iterable[str] = CAMPOS_CHAVE) -> str:
+    partes = {c: registro.get(c) for c in campos}
+    return hashlib.sha1(json.dumps(partes, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+class Gravador:
+    """Recebe os registros de uma fonte enquanto ela roda e faz upsert na base em lotes.
+
+    `receber` é síncrono (serve de callback por página ou por registro); o
+    upsert roda numa thread, um lote de cada vez por fonte. Uma chave já
+    recebida neste run é ignorada, então a fonte pode entregar de novo, no
+    fim, a lista completa (ex.: com o que veio do checkpoint). Com chave
+    "Chave", ela vem de `link` quando o registro tem um e, senão, do hash de
+    `campos_chave`.
+    """
+
+    def __init__(self, fonte: str, chave: str, lote: int = LOTE_BASE,
+                 raiz: Union[str, Path] = base_colunar.RAIZ_BASE,
+                 campos_chave: Iterable[str] = CAMPOS_CHAVE, link: Optional[str] = None):
+        self.fonte = fonte
+        self.chave = chave
+        self.lote = lote
+        self.raiz = raiz
+        self.campos_chave = tuple(campos_chave)
+        self.link = link
+        self.recebidos = 0
+        self.descartados = 0
+        self.falhas = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._vistas: Set[str] = set()
+        self._trava = asyncio.Lock()
+        self._tarefas: Set[asyncio.Task] = set()
+
+    def receber(self, registros: Iterable[Dict[str, Any]]):
+        for registro in registros:
+            if self.chave == COLUNA_CHAVE:
+                link = registro.get(self.link) if self.link else None
+                registro = {**registro, COLUNA_CHAVE: link or chave_registro(registro, self.campos_chave)}
+            valor = registro.get(self.chave)
+            if not valor:
+                self.descartados += 1
+                continue
+            if valor in self._vistas:
+                continue
+            self._vistas.add(valor)
+            self._buffer.append(registro)
+        self.recebidos = len(self._vistas)
+        if len(self._buffer) >= self.lote:
+            self._despachar()
+
+    def receber_um(self, registro: Dict[str, Any]):
+        self.receber([registro])
+
+    def _despachar(self):
+        lote, self._buffer = self._buffer, []
+        tarefa = asyncio.ensure_future(self._gravar(lote))
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _gravar(self, lote: List[Dict[str, Any]]):
+        # a trava (FIFO) mantém um upsert por vez na partição da fonte
+        async with self._trava:
+            try:
+                with perfil.etapa(f"orquestrador.upsert.{self.fonte}"):
+                    await asyncio.to_thread(self._upsert, lote)
+            except Exception as e:
+                self.falhas += 1
+                logger.error(f"[{self.fonte}] Falha ao gravar {len(lote)} registros na base: {e}")
+
+    def _upsert(self, lote: List[Dict[str, Any]]):
+        df = normalizacao.normalizar(pd.DataFrame(lote))
+        base_colunar.upsert(df, self.fonte, chave=self.chave, raiz=self.raiz)
+
+    async def fechar(self):
+        """Grava o que sobrou no buffer e espera os upserts em andamento."""
+        if self._buffer:
+            self._despachar()
+        while self._tarefas:
+            await asyncio.gather(*list(self._tarefas), return_exceptions=True)
+
+# ----------------------------- uma função por fonte -----------------------------
+# cada fonte recebe (navegador, orçamento, gravador) e entrega os registros ao gravador
+
+async def _fonte_trucadao(navegador, orcamento: int, gravador: Gravador):
+    cards = await links_trucadao.processar_todas_as_paginas(
+        concorrencia=min(orcamento, links_trucadao.MAX_PAGINAS_CONCORRENTES), navegador=navegador)
+    # a planilha de links segue sendo a entrada do Scraping_Truncadao rodado sozinho
+    await links_trucadao.salvar_dados(cards)
+
+    listagem: Dict[str, str] = {}
+    for card in cards:
+        if card.get("URL"):
+            listagem.setdefault(card["URL"], card.get("Impressão", ""))
+    links, mantidos = await asyncio.to_thread(incremental.separar_alterados, listagem, gravador.fonte,
+                                              raiz=gravador.raiz)
+    gravador.receber(mantidos)
+
+    dados = await detalhes_trucadao.processar_links(
+        links, arquivo_checkpoint=detalhes_trucadao.ARQUIVO_CHECKPOINT,
+        concorrencia=min(detalhes_trucadao.MAX_CONCURRENT, orcamento), impressoes=listagem,
+        navegador=navegador, limite=orcamento, ao_registro=gravador.receber_um)
+    gravador.receber(dados)
+    await gravador.fechar()
+    if not gravador.falhas:
+        # tudo na base: o checkpoint de detalhes não carrega registros velhos para o próximo run
+        await asyncio.to_thread(detalhes_trucadao.limpar_checkpoints, 1, detalhes_trucadao.ARQUIVO_CHECKPOINT)
+
+async def _fonte_implementos(navegador, orcamento: int, gravador: Gravador):
+    dados = await implementos.processar_todas_as_paginas(concorrencia=orcamento, navegador=navegador,
+                                                         ao_registros=gravador.receber)
+    gravador.receber(dados)
+
+async def _fonte_querotruck(navegador, orcamento: int, gravador: Gravador):
+    dados = await querotruck.coletar_querotruck_async(
+        querotruck.URL_QUEROTRUCK, concorrencia=orcamento, navegador=navegador,
+        ao_extrair=lambda idx, registros: gravador.receber(registros))
+    gravador.receber(dados)
+
+async def _fonte_grupovamos(navegador, orcamento: int, gravador: Gravador):
+    dados = await grupovamos.coletar_dados_async(
+        grupovamos.url_seminovos, grupovamos.xpath_seminovos, concorrencia=orcamento, navegador=navegador,
+        ao_extrair=lambda idx, registros: gravador.receber(registros))
+    gravador.receber(dados)
+
+FONTES: Dict[str, Callable[[Any, int, Gravador], Awaitable[None]]] = {
+    "trucadao": _fonte_trucadao,
+    "implementos": _fonte_implementos,
+    "querotruck": _fonte_querotruck,
+    "grupovamos": _fonte_grupovamos,
+}
+
+async def _rodar_fonte(nome: str, navegador, orcamento: int, gravador: Gravador) -> Dict[str, Any]:
+    inicio = time()
+    erro = None
+    logger.info(f"[{nome}] início (orçamento: {orcamento} páginas).")
+    try:
+        await FONTES[nome](navegador, orcamento, gravador)
+    except Exception as e:
+        erro = str(e)
+        logger.error(f"[{nome}] falhou: {e}", exc_info=True)
+    finally:
+        await gravador.fechar()
+    segundos = time() - inicio
+    if gravador.descartados:
+        logger.warning(f"[{nome}] {gravador.descartados} registros sem {gravador.chave} ficaram fora da base.")
+    logger.info(f"[{nome}] {gravador.recebidos} registros na base em {segundos:.1f}s.")
+    return {"registros": gravador.recebidos, "segundos": round(segundos, 1), "erro": erro}
+
+async def executar(fontes: Optional[List[str]] = None, orcamentos: Optional[Dict[str, int]] = None,
+                   headless: bool = HEADLESS, raiz: Union[str, Path] = base_colunar.RAIZ_BASE,
+                   exportar_excel: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Roda as `fontes` (todas, por padrão) ao mesmo tempo e devolve um resumo por fonte."""
+    fontes = list(fontes or FONTES)
+    orcamentos = {**ORCAMENTOS, **(orcamentos or {})}
+    inicio = time()
+    async with async_playwright() as p:
+        navegador = await p.chromium.launch(headless=headless)
+        try:
+            resumos = await asyncio.gather(*(
+                _rodar_fonte(nome, navegador, orcamentos[nome], Gravador(
+                    nome, CHAVES[nome], raiz=raiz, campos_chave=CAMPOS_CHAVE_FONTE.get(nome, CAMPOS_CHAVE),
+                    link=LINKS_CHAVE.get(nome)))
+                for nome in fontes
+            ))
+        finally:
+            await navegador.close()
+    resumo = dict(zip(fontes, resumos))
+
+    if exportar_excel:
+        for nome in fontes:
+            try:
+                await asyncio.to_thread(base_colunar.exportar_excel, f"{nome}.xlsx", nome, raiz=raiz)
+            except Exception as e:
+                logger.error(f"Erro ao exportar {nome}.xlsx: {e}")
+
+    mais_lenta = max((r["segundos"] for r in resumo.values()), default=0.0)
+    soma = sum(r["segundos"] for r in resumo.values())
+    logger.info(f"Orquestrador: {time() - inicio:.1f}s no total (fonte mais lenta {mais_lenta:.1f}s, "
+                f"soma das fontes {soma:.1f}s).")
+    return resumo
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Roda todas as fontes num só event loop e navegador.")
+    parser.add_argument("--so", nargs="*", choices=list(FONTES), help="roda só estas fontes")
+    parser.add_argument("--orcamento", nargs="*", default=[], metavar="FONTE=N",
+                        help="troca o orçamento de páginas de uma fonte (ex.: trucadao=20)")
+    parser.add_argument("--raiz", default=base_colunar.RAIZ_BASE)
+    parser.add_argument("--excel", action="store_true", help="exporta <fonte>.xlsx a partir da base no fim")
+    parser.add_argument("--janela", action="store_true", help="abre o navegador com janela")
+    args = parser.parse_args()
+
+    orcamentos = {}
+    for item in args.orcamento:
+        nome, _, valor = item.partition("=")
+        if nome not in FONTES or not valor.isdigit() or int(valor) < 1:
+            parser.error(f"--orcamento inválido: {item}")
+        orcamentos[nome] = int(valor)
+
+    resumo = asyncio.run(executar(args.so, orcamentos, headless=not args.janela, raiz=args.raiz,
+                                  exportar_excel=args.excel))
+    for nome, r in resumo.items():
+        print(f"{nome:>12}: {r['registros']:>6} registros em {r['segundos']:>7.1f}s"
+              + (f"  ERRO: {r['erro']}" if r["erro"] else ""))
+    perfil.salvar_relatorio("orquestrador")
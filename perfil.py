@@ -0,0 +1,128 @@
+"""Tempo por etapa dos scrapers: histogramas (p50/p95/p99), contagens e erros.
+
+    with perfil.etapa("detalhe.goto"):
+        await page.goto(link)
+    ...
+    perfil.salvar_relatorio("trucadao")   # perfil/trucadao.json + .html
+
+Funciona igual em código síncrono e assíncrono (mede o tempo de parede do
+bloco, incluindo os awaits). Desligado (PERFIL=0 no ambiente ou
+`perfil.ativar(False)`), `etapa` devolve um context manager vazio
+compartilhado: nenhuma alocação nem leitura de relógio.
+"""
+import contextlib
+import html
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+PASTA_RELATORIOS = "perfil"
+
+ATIVO = os.environ.get("PERFIL", "1").lower() not in ("0", "false", "nao", "não")
+
+_duracoes: Dict[str, List[float]] = defaultdict(list)
+_erros: Dict[str, int] = defaultdict(int)
+_NULO = contextlib.nullcontext()
+
+def ativar(ligado: bool = True):
+    global ATIVO
+    ATIVO = ligado
+
+def limpar():
+    _duracoes.clear()
+    _erros.clear()
+
+def registrar(nome: str, duracao: float, erro: bool = False):
+    _duracoes[nome].append(duracao)
+    if erro:
+        _erros[nome] += 1
+
+class _Etapa:
+    __slots__ = ("nome", "inicio")
+
+    def __init__(self, nome: str):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        registrar(self.nome, perf_counter() - self.inicio, tipo is not None)
+        return False
+
+def etapa(nome: str):
+    """Context manager que cronometra o bloco; exceção no bloco conta como erro da etapa."""
+    return _Etapa(nome) if ATIVO else _NULO
+
+def _percentil(ordenados: List[float], p: float) -> float:
+    k = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+def relatorio() -> Dict[str, Dict[str, Any]]:
+    """{etapa: {n, erros, taxa_erro, total_s, media_s, p50_s, p95_s, p99_s, max_s}}, na ordem de registro."""
+    saida = {}
+    for nome, valores in _duracoes.items():
+        if not valores:
+            continue
+        ordenados = sorted(valores)
+        n = len(ordenados)
+        total = sum(ordenados)
+        saida[nome] = {
+            "n": n,
+            "erros": _erros.get(nome, 0),
+            "taxa_erro": round(_erros.get(nome, 0) / n, 4),
+            "total_s": round(total, 4),
+            "media_s": round(total / n, 4),
+            "p50_s": round(_percentil(ordenados, 50), 4),
+            "p95_s": round(_percentil(ordenados, 95), 4),
+            "p99_s": round(_percentil(ordenados, 99), 4),
+            "max_s": round(ordenados[-1], 4),
+        }
+    return saida
+
+def _html(nome: str, dados: Dict[str, Dict[str, Any]], gerado: str) -> str:
+    maior = max((d["total_s"] for d in dados.values()), default=0) or 1
+    linhas = []
+    for etapa_, d in sorted(dados.items(), key=lambda kv: -kv[1]["total_s"]):
+        barra = int(300 * d["total_s"] / maior)
+        linhas.append(
+            f"<tr><td>{html.escape(etapa_)}</td><td>{d['n']}</td><td>{d['erros']} ({d['taxa_erro']:.1%})</td>"
+            f"<td>{d['total_s']:.2f}</td><td>{d['p50_s']:.3f}</td><td>{d['p95_s']:.3f}</td>"
+            f"<td>{d['p99_s']:.3f}</td><td>{d['max_s']:.3f}</td>"
+            f"<td><div style='background:#4a90d9;height:10px;width:{barra}px'></div></td></tr>"
+        )
+    return (
+        f"<!doctype html><html><head><meta charset='utf-8'><title>Perfil {html.escape(nome)}</title>"
+        "<style>body{font-family:sans-serif}td,th{padding:3px 8px;text-align:right}"
+        "td:first-child,th:first-child{text-align:left}</style></head><body>"
+        f"<h2>Perfil: {html.escape(nome)}</h2><p>Gerado em {gerado}</p>"
+        "<table><tr><th>Etapa</th><th>n</th><th>Erros</th><th>Total (s)</th><th>p50 (s)</th>"
+        "<th>p95 (s)</th><th>p99 (s)</th><th>Máx (s)</th><th></th></tr>"
+        + "".join(linhas) + "</table></body></html>"
+    )
+
+def salvar_relatorio(nome: str, pasta: str = PASTA_RELATORIOS) -> Dict[str, Dict[str, Any]]:
+    """Grava perfil/<nome>.json e perfil/<nome>.html e loga as etapas mais caras."""
+    dados = relatorio()
+    if not ATIVO or not dados:
+        return dados
+    gerado = datetime.now().isoformat(timespec="seconds")
+    destino = Path(pasta)
+    destino.mkdir(parents=True, exist_ok=True)
+    with open(destino / f"{nome}.json", "w", encoding="utf-8") as f:
+        json.dump({"nome": nome, "gerado": gerado, "etapas": dados}, f, ensure_ascii=False, indent=2)
+    (destino / f"{nome}.html").write_text(_html(nome, dados, gerado), encoding="utf-8")
+
+    for etapa_, d in sorted(dados.items(), key=lambda kv: -kv[1]["total_s"])[:5]:
+        logger.info(f"Perfil {etapa_}: n={d['n']} p50={d['p50_s']:.3f}s p95={d['p95_s']:.3f}s "
+                    f"p99={d['p99_s']:.3f}s erros={d['erros']}")
+    logger.info(f"Relatório de perfil: {destino / nome}.json/.html")
+    return dados
@@ -0,0 +1,134 @@
+"""Política de bloqueio de requisições (context.route) para os scrapers.
+
+Nada do que extraímos depende de imagens, fontes, mídia ou scripts de
+analytics/ads (Imagem_src é só atributo do <img>), então essas requisições
+são abortadas antes de sair do navegador.
+
+    politica = PoliticaRede(hosts_permitidos=["trucadao.com.br"])
+    await politica.aplicar(context)          # playwright.async_api
+    politica.aplicar_sync(context)           # playwright.sync_api
+    ...
+    logger.info(politica.resumo())
+"""
+import re
+from collections import Counter
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+# tipos de recurso (request.resource_type) bloqueados em qualquer host
+TIPOS_BLOQUEADOS_PADRAO = ("image", "media", "font")
+
+# analytics, tag managers, ads e afins
+PADROES_RASTREADORES = (
+    r"google-analytics\.com", r"googletagmanager\.com", r"googleadservices\.com",
+    r"doubleclick\.net", r"googlesyndication\.com", r"adservice\.google\.",
+    r"facebook\.(net|com)", r"connect\.facebook", r"hotjar\.(com|io)", r"clarity\.ms",
+    r"tiktok\.com", r"analytics\.", r"criteo\.", r"taboola\.", r"outbrain\.",
+    r"rdstation\.", r"hubspot\.", r"newrelic\.com", r"nr-data\.net", r"onesignal\.com",
+)
+
+# tamanho médio (bytes) usado para estimar a economia de cada requisição bloqueada
+TAMANHO_MEDIO_ESTIMADO = {
+    "image": 120_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "rastreador": 45_000,
+    "terceiros": 30_000,
+}
+
+class PoliticaRede:
+    """Decide quais requisições abortar e contabiliza o que foi economizado.
+
+    - `tipos_bloqueados`: resource types abortados em qualquer host.
+    - `hosts_permitidos`: hosts (e subdomínios) nunca tratados como rastreador/terceiro.
+    - `somente_hosts_permitidos`: se True, aborta tudo que não for de um host permitido.
+    Navegações de documento nunca são bloqueadas.
+    """
+
+    def __init__(self, tipos_bloqueados: Iterable[str] = TIPOS_BLOQUEADOS_PADRAO,
+                 hosts_permitidos: Iterable[str] = (), somente_hosts_permitidos: bool = False,
+                 bloquear_rastreadores: bool = True):
+        self.tipos_bloqueados = set(tipos_bloqueados)
+        self.hosts_permitidos = tuple(h.lower().lstrip(".") for h in hosts_permitidos)
+        self.somente_hosts_permitidos = somente_hosts_permitidos
+        self.bloquear_rastreadores = bloquear_rastreadores
+        self._rastreadores = re.compile("|".join(PADROES_RASTREADORES), re.IGNORECASE)
+
+        self.bloqueadas: Counter = Counter()
+        self.permitidas = 0
+        self.bytes_recebidos = 0
+
+    def _host_permitido(self, host: str) -> bool:
+        return any(host == h or host.endswith("." + h) for h in self.hosts_permitidos)
+
+    def categoria_bloqueio(self, tipo: str, url: str) -> Optional[str]:
+        """Retorna a categoria que bloqueia a requisição, ou None se ela deve passar."""
+        if tipo == "document":
+            return None
+        if tipo in self.tipos_bloqueados:
+            return tipo
+        host = (urlsplit(url).hostname or "").lower()
+        if self._host_permitido(host):
+            return None
+        if self.bloquear_rastreadores and self._rastreadores.search(host):
+            return "rastreador"
+        if self.somente_hosts_permitidos and self.hosts_permitidos and host:
+            return "terceiros"
+        return None
+
+    def _decidir(self, route) -> bool:
+        req = route.request
+        categoria = self.categoria_bloqueio(req.resource_type, req.url)
+        if categoria:
+            self.bloqueadas[categoria] += 1
+            return True
+        self.permitidas += 1
+        return False
+
+    async def _rota(self, route):
+        if self._decidir(route):
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    def _rota_sync(self, route):
+        if self._decidir(route):
+            route.abort("blockedbyclient")
+        else:
+            route.fallback()
+
+    def _contar_resposta(self, resposta):
+        try:
+            self.bytes_recebidos += int(resposta.headers.get("content-length") or 0)
+        except (TypeError, ValueError):
+            pass
+
+    async def aplicar(self, context):
+        await context.route("**/*", self._rota)
+        context.on("response", self._contar_resposta)
+
+    def aplicar_sync(self, context):
+        context.route("**/*", self._rota_sync)
+        context.on("response", self._contar_resposta)
+
+    def relatorio(self) -> Dict[str, object]:
+        bytes_economizados = sum(
+            n * TAMANHO_MEDIO_ESTIMADO.get(cat, 0) for cat, n in self.bloqueadas.items()
+        )
+        return {
+            "requisicoes_bloqueadas": sum(self.bloqueadas.values()),
+            "bloqueadas_por_categoria": dict(self.bloqueadas),
+            "requisicoes_permitidas": self.permitidas,
+            "bytes_economizados_estimados": bytes_economizados,
+            "bytes_recebidos": self.bytes_recebidos,
+        }
+
+    def resumo(self) -> str:
+        r = self.relatorio()
+        categorias = ", ".join(f"{c}={n}" for c, n in sorted(r["bloqueadas_por_categoria"].items())) or "nenhuma"
+        return (
+            f"Rede: {r['requisicoes_bloqueadas']} requisições bloqueadas ({categorias}), "
+            f"~{r['bytes_economizados_estimados'] / 1e6:.1f} MB economizados (estimado), "
+            f"{r['requisicoes_permitidas']} permitidas, {r['bytes_recebidos'] / 1e6:.1f} MB recebidos."
+        )
@@ -0,0 +1,110 @@
+"""Pool de páginas reutilizáveis de um BrowserContext.
+
+Em vez de new_page()/close() por link, as páginas ficam abertas e são
+"limpas" entre um uso e outro (about:blank, rotas da página removidas e os
+handlers registrados via `pool.on` desfeitos). Uma página é descartada e
+recriada depois de `max_usos` usos ou quando o uso terminou em erro.
+
+    pool = PoolPaginas(context, tamanho=12, max_usos=50)
+    await pool.iniciar()
+    async with pool.pagina() as page:
+        pool.on(page, "response", handler)   # removido ao devolver a página
+        await page.goto(link)
+    await pool.fechar()
+"""
+import asyncio
+import contextlib
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class PoolPaginas:
+    def __init__(self, context, tamanho: int, max_usos: int = 50):
+        self.context = context
+        self.tamanho = tamanho
+        self.max_usos = max_usos
+        self._livres: asyncio.Queue = asyncio.Queue()
+        self._usos: Dict[object, int] = {}
+        self._com_erro: set = set()
+        self._todas: List[object] = []
+        self._handlers: Dict[object, List[Tuple[str, Callable]]] = {}
+        self.criadas = 0
+        self.recicladas = 0
+
+    async def _nova(self):
+        page = await self.context.new_page()
+        self._usos[page] = 0
+        self._todas.append(page)
+        self.criadas += 1
+        return page
+
+    async def iniciar(self, quantidade: Optional[int] = None):
+        """Abre `quantidade` (padrão: `tamanho`) páginas de antemão; o resto é criado sob demanda."""
+        for _ in range(min(quantidade or self.tamanho, self.tamanho)):
+            self._livres.put_nowait(await self._nova())
+
+    def on(self, page, evento: str, handler: Callable):
+        """Registra um handler que vale só até a página voltar ao pool."""
+        page.on(evento, handler)
+        self._handlers.setdefault(page, []).append((evento, handler))
+
+    async def _limpar(self, page):
+        for evento, handler in self._handlers.pop(page, []):
+            page.remove_listener(evento, handler)
+        await page.unroute_all(behavior="ignoreErrors")
+        await page.goto("about:blank")
+
+    async def _descartar(self, page):
+        self._usos.pop(page, None)
+        self._handlers.pop(page, None)
+        self._com_erro.discard(page)
+        if page in self._todas:
+            self._todas.remove(page)
+        self.recicladas += 1
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+    def marcar_erro(self, page):
+        """Força a reciclagem da página quando ela voltar ao pool."""
+        self._com_erro.add(page)
+
+    async def _devolver(self, page, erro: bool):
+        self._usos[page] = self._usos.get(page, 0) + 1
+        if erro or page in self._com_erro or page.is_closed() or self._usos[page] >= self.max_usos:
+            await self._descartar(page)
+            page = await self._nova()
+        else:
+            try:
+                await self._limpar(page)
+            except Exception as e:
+                logger.debug(f"Falha ao limpar página, recriando: {e}")
+                await self._descartar(page)
+                page = await self._nova()
+        self._livres.put_nowait(page)
+
+    @contextlib.asynccontextmanager
+    async def pagina(self):
+        if self._livres.empty() and len(self._todas) < self.tamanho:
+            self._livres.put_nowait(await self._nova())
+        page = await self._livres.get()
+        erro = False
+        try:
+            yield page
+        except BaseException:
+            erro = True
+            raise
+        finally:
+            await self._devolver(page, erro)
+
+    async def fechar(self):
+        for page in list(self._todas):
+            try:
+                await page.close()
+            except Exception:
+                pass
+        self._todas.clear()
+        self._usos.clear()
+        logger.info(f"Pool de páginas: {self.criadas} criadas, {self.recicladas} recicladas.")
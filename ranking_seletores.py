@@ -0,0 +1,155 @@
+"""Ranking aprendido de seletores por (site, campo), persistido em JSON.
+
+Cada campo tem uma lista de seletores de fallback. O ranking guarda quantas
+vezes cada seletor acertou ou errou e devolve a lista com o vencedor na
+frente; a sondagem é um único page.evaluate que testa os seletores na ordem
+sem esperar por nenhum elemento. Em regime, uma página custa uma sondagem
+por campo e o primeiro seletor já acerta.
+
+    ranking = RankingSeletores("ranking_seletores.json")
+    texto = await ranking.primeiro_texto(page, "Marca", SELETORES["Marca"])
+    ranking.salvar()
+"""
+import contextlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_PADRAO = "ranking_seletores.json"
+
+# mesmo formato de seletor aceito em extracao_cards: CSS, "css=", "xpath=" ou "//..."
+JS_PRIMEIRO_TEXTO = """
+(seletores) => {
+    for (let i = 0; i < seletores.length; i++) {
+        let expr = seletores[i].trim(), el = null;
+        try {
+            if (expr.startsWith('css=')) {
+                el = document.querySelector(expr.slice(4));
+            } else if (expr.startsWith('xpath=') || expr.startsWith('/') || expr.startsWith('(')) {
+                if (expr.startsWith('xpath=')) expr = expr.slice(6);
+                el = document.evaluate(expr, document, null,
+                                       XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            } else {
+                el = document.querySelector(expr);
+            }
+        } catch (e) { continue; }
+        const texto = el ? (el.textContent || '').trim() : '';
+        if (texto) return [i, texto];
+    }
+    return [-1, ''];
+}
+"""
+
+@contextlib.contextmanager
+def _trava_arquivo(caminho: str):
+    """Trava exclusiva entre processos (arquivo `caminho`.lock) enquanto o bloco roda."""
+    with open(f"{caminho}.lock", "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK desiste depois de ~10 s; outro shard pode segurar mais que isso
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class RankingSeletores:
+    def __init__(self, caminho: Optional[str] = ARQUIVO_PADRAO):
+        self.caminho = caminho
+        # {site: {campo: {seletor: [acertos, erros]}}}
+        self._stats: Dict[str, Dict[str, Dict[str, List[int]]]] = self._ler() if caminho else {}
+        self._novos: Dict[str, Dict[str, Dict[str, List[int]]]] = {}
+
+    def _ler(self) -> Dict[str, Dict[str, Dict[str, List[int]]]]:
+        if not os.path.exists(self.caminho):
+            return {}
+        try:
+            with open(self.caminho, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ranking de seletores ilegível ({self.caminho}), começando do zero: {e}")
+            return {}
+
+    def ordenar(self, site: str, campo: str, seletores: Sequence[str]) -> List[str]:
+        """Seletores do mais para o menos provável; os nunca vistos mantêm a ordem original."""
+        stats = self._stats.get(site, {}).get(campo, {})
+
+        def taxa(sel: str) -> float:
+            acertos, erros = stats.get(sel, (0, 0))
+            return (acertos + 1) / (acertos + erros + 2)  # suavização de Laplace: novo = 0.5
+
+        return sorted(seletores, key=taxa, reverse=True)
+
+    def registrar(self, site: str, campo: str, tentados: Sequence[str], vencedor: Optional[str]):
+        """Os seletores tentados antes do vencedor (ou todos, se nenhum acertou) contam como erro."""
+        for sel in tentados:
+            acerto = sel == vencedor
+            for destino in (self._stats, self._novos):
+                par = destino.setdefault(site, {}).setdefault(campo, {}).setdefault(sel, [0, 0])
+                par[0 if acerto else 1] += 1
+            if acerto:
+                break
+
+    async def primeiro_texto(self, page, campo: str, seletores: Sequence[str],
+                             default: str = "Não informado", site: Optional[str] = None) -> str:
+        site = site or urlparse(page.url).hostname or ""
+        ordem = self.ordenar(site, campo, seletores)
+        try:
+            indice, texto = await page.evaluate(JS_PRIMEIRO_TEXTO, ordem)
+        except Exception as e:
+            logger.debug(f"Sondagem de {campo} falhou: {e}")
+            return default
+        self.registrar(site, campo, ordem, ordem[indice] if indice >= 0 else None)
+        return texto if indice >= 0 else default
+
+    def resumo(self, site: str) -> Dict[str, Tuple[str, float]]:
+        """{campo: (seletor líder, taxa de acerto)} de um site."""
+        saida = {}
+        for campo, stats in self._stats.get(site, {}).items():
+            sel, (acertos, erros) = max(stats.items(), key=lambda kv: (kv[1][0] + 1) / (sum(kv[1]) + 2))
+            saida[campo] = (sel, acertos / max(acertos + erros, 1))
+        return saida
+
+    def salvar(self):
+        """Soma as contagens deste processo às do arquivo (outros shards podem ter gravado).
+
+        Ler, somar e trocar o arquivo acontece sob uma trava entre processos:
+        sem ela, dois shards leriam a mesma versão e um apagaria a soma do outro.
+        """
+        if not self.caminho or not self._novos:
+            return
+        with _trava_arquivo(self.caminho):
+            disco = self._ler()
+            for site, campos in self._novos.items():
+                for campo, stats in campos.items():
+                    for sel, (acertos, erros) in stats.items():
+                        par = disco.setdefault(site, {}).setdefault(campo, {}).setdefault(sel, [0, 0])
+                        par[0] += acertos
+                        par[1] += erros
+            tmp = f"{self.caminho}.tmp.{os.getpid()}"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(disco, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.caminho)
+        self._stats, self._novos = disco, {}